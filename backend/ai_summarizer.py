@@ -1,46 +1,33 @@
 import os
 import json
 import logging
-from typing import Optional, List, Tuple
+import time
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from typing import Optional, List, Tuple, Dict
+import openai
 from openai import OpenAI
 
+from summary_cache import summary_cache, SummaryCache
+from summarizer_metrics import summarizer_metrics
+from tracing import span
+from extractive import prepare_summary_input, extractive_summary, count_tokens
+from config import get_settings
+
 logger = logging.getLogger(__name__)
 
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 
+settings = get_settings()
 
-class AISummarizer:
-    def __init__(self):
-        if not OPENAI_API_KEY:
-            logger.warning("OPENAI_API_KEY not set - AI summaries will be disabled")
-            self.client = None
-        else:
-            self.client = OpenAI(api_key=OPENAI_API_KEY)
-    
-    def generate_summary(
-        self, 
-        title: str, 
-        content: str, 
-        source_name: str,
-        max_content_length: int = 4000
-    ) -> Tuple[Optional[str], Optional[List[str]]]:
-        if not self.client:
-            return None, None
-        
-        if not content or len(content.strip()) < 100:
-            return None, None
-        
-        truncated_content = content[:max_content_length]
-        if len(content) > max_content_length:
-            truncated_content += "..."
-        
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """You are a tech news summarizer. Given an article, provide:
+SUMMARY_MODEL = "gpt-4o-mini"
+
+# Bump these whenever the matching prompt changes so cached summaries
+# produced by the old prompt are no longer served.
+SUMMARY_PROMPT_VERSION = "article-v1"
+TITLE_PROMPT_VERSION = "title-v1"
+
+SUMMARY_SYSTEM_PROMPT = """You are a tech news summarizer. Given an article, provide:
 1. A concise 2-sentence TL;DR summary
 2. 3-5 key points as bullet points
 
@@ -53,93 +40,619 @@ Respond in JSON format:
 Be concise, factual, and focus on the most important information.
 For research papers, highlight the main contribution and findings.
 For news, focus on the key facts and implications."""
-                    },
-                    {
-                        "role": "user",
-                        "content": f"""Article Title: {title}
+
+# The batch prompt asks for exactly the per-article output of SUMMARY_SYSTEM_PROMPT,
+# so both share SUMMARY_PROMPT_VERSION in the summary cache.
+BATCH_SYSTEM_PROMPT = """You are a tech news summarizer. You will receive several articles, each introduced by "### Article <id>". For every article provide:
+1. A concise 2-sentence TL;DR summary
+2. 3-5 key points as bullet points
+
+Return one entry per article in the "results" array, using the article's id.
+Summarize each article independently and never mix facts between articles.
+
+Be concise, factual, and focus on the most important information.
+For research papers, highlight the main contribution and findings.
+For news, focus on the key facts and implications."""
+
+BATCH_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "article_summaries",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "results": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "integer"},
+                            "summary": {"type": "string"},
+                            "key_points": {"type": "array", "items": {"type": "string"}}
+                        },
+                        "required": ["id", "summary", "key_points"],
+                        "additionalProperties": False
+                    }
+                }
+            },
+            "required": ["results"],
+            "additionalProperties": False
+        }
+    }
+}
+
+# Articles whose prepared input is longer than this are summarized on their own
+BATCH_MAX_ARTICLE_TOKENS = 600
+# Input token budget and article cap for one packed request
+BATCH_TOKEN_BUDGET = 3000
+BATCH_MAX_ARTICLES = 8
+
+TITLE_SYSTEM_PROMPT = """Based on the article title and source, provide a brief description of what this article likely covers.
+
+Respond in JSON format:
+{
+  "summary": "Brief one-sentence description based on the title.",
+  "key_points": []
+}
+
+Be concise and don't make up specific details not implied by the title."""
+
+
+def build_summary_request(title: str, prepared_content: str, source_name: str) -> Dict:
+    return {
+        "model": SUMMARY_MODEL,
+        "messages": [
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": f"""Article Title: {title}
 Source: {source_name}
 
 Content:
-{truncated_content}"""
-                    }
-                ],
-                temperature=0.3,
-                max_tokens=500,
-                response_format={"type": "json_object"}
+{prepared_content}"""
+            }
+        ],
+        "temperature": 0.3,
+        "max_tokens": 500,
+        "response_format": {"type": "json_object"}
+    }
+
+
+def build_batch_request(articles: List[Tuple[str, str, str]]) -> Dict:
+    """articles: (title, prepared_content, source_name), numbered from 1 in order."""
+    sections = []
+    for article_id, (title, prepared_content, source_name) in enumerate(articles, start=1):
+        sections.append(f"""### Article {article_id}
+Article Title: {title}
+Source: {source_name}
+
+Content:
+{prepared_content}""")
+    
+    return {
+        "model": SUMMARY_MODEL,
+        "messages": [
+            {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": "\n\n".join(sections)}
+        ],
+        "temperature": 0.3,
+        "max_tokens": 300 * len(articles),
+        "response_format": BATCH_RESPONSE_FORMAT
+    }
+
+
+def title_cache_key(title: str, source_name: str) -> str:
+    # The source is part of the prompt, so same-titled items from different sources don't share a summary
+    return SummaryCache.make_key(SUMMARY_MODEL, TITLE_PROMPT_VERSION, f"{source_name}\n{title}")
+
+
+def build_title_request(title: str, source_name: str) -> Dict:
+    return {
+        "model": SUMMARY_MODEL,
+        "messages": [
+            {"role": "system", "content": TITLE_SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": f"""Article Title: {title}
+Source: {source_name}"""
+            }
+        ],
+        "temperature": 0.3,
+        "max_tokens": 200,
+        "response_format": {"type": "json_object"}
+    }
+
+
+def parse_summary_response(raw: str, title_only: bool = False) -> Tuple[Optional[str], Optional[List[str]]]:
+    result = json.loads(raw)
+    summary = result.get("summary", "")
+    key_points = [] if title_only else result.get("key_points", [])
+    
+    if summary and len(summary) > 10:
+        return summary, key_points
+    
+    return None, None
+
+
+def parse_batch_response(raw: str, expected: int) -> Dict[int, Tuple[str, List[str]]]:
+    """Map article id to (summary, key_points) for every well-formed result.
+    
+    Raises ValueError when the response is not JSON or not {"results": [...]}.
+    """
+    response = json.loads(raw)
+    results = response.get("results", []) if isinstance(response, dict) else None
+    if not isinstance(results, list):
+        raise ValueError(f"Expected an object with a results list, got {type(response).__name__}")
+    
+    parsed = {}
+    for item in results:
+        if not isinstance(item, dict):
+            continue
+        
+        article_id = item.get("id")
+        summary = item.get("summary")
+        key_points = item.get("key_points")
+        
+        if not isinstance(article_id, int) or not 1 <= article_id <= expected or article_id in parsed:
+            continue
+        if not isinstance(summary, str) or len(summary) <= 10:
+            continue
+        if not isinstance(key_points, list) or not all(isinstance(p, str) for p in key_points):
+            continue
+        
+        parsed[article_id] = (summary, key_points)
+    
+    return parsed
+
+
+# Transient failures worth another attempt
+RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+SummaryResult = namedtuple('SummaryResult', ['summary', 'key_points', 'backend'])
+
+# Routing policies, set with SUMMARIZER_POLICY:
+#   llm           OpenAI only
+#   llm_fallback  OpenAI, falling back to the local summarizer on timeout or error
+#   local_first   local summary at ingest, upgraded to OpenAI later by a periodic task
+#   local         local summarizer only
+SUMMARIZER_POLICIES = ('llm', 'llm_fallback', 'local_first', 'local')
+
+
+class SummarizerBackend(ABC):
+    name = None
+    
+    def is_available(self) -> bool:
+        return True
+    
+    @abstractmethod
+    def generate_summary(
+        self,
+        title: str,
+        content: str,
+        source_name: str,
+        content_type: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[List[str]]]:
+        ...
+    
+    @abstractmethod
+    def generate_summary_from_title_only(
+        self,
+        title: str,
+        source_name: str
+    ) -> Tuple[Optional[str], Optional[List[str]]]:
+        ...
+    
+    def summarize(
+        self,
+        title: str,
+        content: Optional[str],
+        source_name: str,
+        content_type: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[List[str]]]:
+        if content and len(content.strip()) > 100:
+            return self.generate_summary(title, content, source_name, content_type)
+        else:
+            return self.generate_summary_from_title_only(title, source_name)
+    
+    def summarize_batch(self, articles: List[Dict]) -> List[Tuple[Optional[str], Optional[List[str]]]]:
+        """articles: dicts with title, content, source_name and content_type."""
+        return [
+            self.summarize(a['title'], a.get('content'), a['source_name'], a.get('content_type'))
+            for a in articles
+        ]
+
+
+class ExtractiveSummarizer(SummarizerBackend):
+    """In-process summarizer built from the article's own sentences. No network."""
+    
+    name = 'local'
+    
+    def generate_summary(
+        self,
+        title: str,
+        content: str,
+        source_name: str,
+        content_type: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[List[str]]]:
+        if not content or len(content.strip()) < 100:
+            return None, None
+        
+        started = time.perf_counter()
+        try:
+            result = extractive_summary(content, title, content_type)
+            summarizer_metrics.record_call('local', 'extractive', (time.perf_counter() - started) * 1000)
+            return result
+        except Exception as e:
+            summarizer_metrics.record_call('local', 'extractive', (time.perf_counter() - started) * 1000, error=True)
+            logger.error(f"Failed to build local summary for '{title[:50]}': {str(e)}")
+            return None, None
+    
+    def generate_summary_from_title_only(
+        self,
+        title: str,
+        source_name: str
+    ) -> Tuple[Optional[str], Optional[List[str]]]:
+        # A title alone gives nothing to extract from
+        return None, None
+
+
+class AISummarizer(SummarizerBackend):
+    name = 'llm'
+    
+    def __init__(self):
+        if not OPENAI_API_KEY:
+            logger.warning("OPENAI_API_KEY not set - AI summaries will be disabled")
+            self.client = None
+        else:
+            self.client = OpenAI(
+                api_key=OPENAI_API_KEY,
+                timeout=settings.summarizer_llm_timeout_seconds,
+                # Retries are done in _complete so they can be counted
+                max_retries=0
             )
+    
+    def is_available(self) -> bool:
+        return self.client is not None
+    
+    def _complete(self, request: Dict, path: str) -> str:
+        """Run one chat completion with retries, recording latency, tokens and retry count."""
+        with span('openai.request', **{'gen_ai.request.model': request['model'], 'summarizer.path': path}) as s:
+            started = time.perf_counter()
+            attempt = 0
+            while True:
+                try:
+                    response = self.client.chat.completions.create(**request)
+                    break
+                except RETRYABLE_ERRORS as e:
+                    if attempt >= settings.summarizer_llm_max_retries:
+                        s.set('summarizer.retries', attempt)
+                        summarizer_metrics.record_call(
+                            path, request['model'], (time.perf_counter() - started) * 1000,
+                            retries=attempt, error=True
+                        )
+                        raise
+                    attempt += 1
+                    logger.warning(f"Summary request failed ({type(e).__name__}), retry {attempt}")
+                    time.sleep(min(0.5 * 2 ** attempt, 8))
+                except Exception:
+                    summarizer_metrics.record_call(
+                        path, request['model'], (time.perf_counter() - started) * 1000,
+                        retries=attempt, error=True
+                    )
+                    raise
             
-            result = json.loads(response.choices[0].message.content)
-            summary = result.get("summary", "")
-            key_points = result.get("key_points", [])
+            usage = response.usage
+            summarizer_metrics.record_call(
+                path,
+                response.model or request['model'],
+                (time.perf_counter() - started) * 1000,
+                prompt_tokens=usage.prompt_tokens if usage else 0,
+                completion_tokens=usage.completion_tokens if usage else 0,
+                retries=attempt
+            )
+            s.set('summarizer.retries', attempt)
+            s.set('gen_ai.usage.input_tokens', usage.prompt_tokens if usage else 0)
+            s.set('gen_ai.usage.output_tokens', usage.completion_tokens if usage else 0)
+            return response.choices[0].message.content
+    
+    def generate_summary(
+        self,
+        title: str,
+        content: str,
+        source_name: str,
+        content_type: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[List[str]]]:
+        if not self.client:
+            return None, None
+        
+        if not content or len(content.strip()) < 100:
+            return None, None
+        
+        prepared_content = prepare_summary_input(content, content_type, title)
+        
+        cache_key = SummaryCache.make_key(SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, prepared_content)
+        cached = summary_cache.get(cache_key)
+        summarizer_metrics.record_cache('full', cached is not None)
+        if cached:
+            logger.info(f"Summary cache hit for: {title[:50]}...")
+            return cached
+        
+        return self._summarize_prepared(title, prepared_content, source_name, cache_key)
+    
+    def _summarize_prepared(
+        self,
+        title: str,
+        prepared_content: str,
+        source_name: str,
+        cache_key: str
+    ) -> Tuple[Optional[str], Optional[List[str]]]:
+        try:
+            raw = self._complete(build_summary_request(title, prepared_content, source_name), 'full')
+            summary, key_points = self._parse(raw, 'full')
             
-            if summary and len(summary) > 10:
+            if summary:
                 logger.info(f"Generated summary for: {title[:50]}...")
+                summary_cache.set(cache_key, summary, key_points)
                 return summary, key_points
             
             return None, None
-            
+        
         except Exception as e:
             logger.error(f"Failed to generate summary for '{title[:50]}': {str(e)}")
             return None, None
     
     def generate_summary_from_title_only(
-        self, 
-        title: str, 
+        self,
+        title: str,
         source_name: str
     ) -> Tuple[Optional[str], Optional[List[str]]]:
         if not self.client:
             return None, None
         
+        cache_key = title_cache_key(title, source_name)
+        cached = summary_cache.get(cache_key)
+        summarizer_metrics.record_cache('title', cached is not None)
+        if cached:
+            return cached
+        
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """Based on the article title and source, provide a brief description of what this article likely covers.
-
-Respond in JSON format:
-{
-  "summary": "Brief one-sentence description based on the title.",
-  "key_points": []
-}
-
-Be concise and don't make up specific details not implied by the title."""
-                    },
-                    {
-                        "role": "user",
-                        "content": f"""Article Title: {title}
-Source: {source_name}"""
-                    }
-                ],
-                temperature=0.3,
-                max_tokens=200,
-                response_format={"type": "json_object"}
-            )
-            
-            result = json.loads(response.choices[0].message.content)
-            summary = result.get("summary", "")
+            raw = self._complete(build_title_request(title, source_name), 'title')
+            summary, key_points = self._parse(raw, 'title', title_only=True)
             
-            if summary and len(summary) > 10:
+            if summary:
+                summary_cache.set(cache_key, summary, [])
                 return summary, []
             
             return None, None
-            
+        
         except Exception as e:
             logger.error(f"Failed to generate title-based summary: {str(e)}")
             return None, None
+    
+    def summarize_batch(self, articles: List[Dict]) -> List[Tuple[Optional[str], Optional[List[str]]]]:
+        """Pack short articles into shared requests; everything else goes one by one.
+        
+        Items missing or invalid in a packed response are retried individually.
+        """
+        results = [(None, None)] * len(articles)
+        if not self.client:
+            return results
+        
+        packable = []
+        for i, article in enumerate(articles):
+            title = article['title']
+            content = article.get('content')
+            source_name = article['source_name']
+            
+            if not content or len(content.strip()) <= 100:
+                results[i] = self.generate_summary_from_title_only(title, source_name)
+                continue
+            
+            prepared_content = prepare_summary_input(content, article.get('content_type'), title)
+            cache_key = SummaryCache.make_key(SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, prepared_content)
+            cached = summary_cache.get(cache_key)
+            summarizer_metrics.record_cache('full', cached is not None)
+            if cached:
+                results[i] = cached
+                continue
+            
+            tokens = count_tokens(prepared_content)
+            if tokens > BATCH_MAX_ARTICLE_TOKENS:
+                results[i] = self._summarize_prepared(title, prepared_content, source_name, cache_key)
+                continue
+            
+            packable.append((i, title, prepared_content, source_name, cache_key, tokens))
+        
+        for group in self._pack(packable):
+            if len(group) == 1:
+                i, title, prepared_content, source_name, cache_key, _ = group[0]
+                results[i] = self._summarize_prepared(title, prepared_content, source_name, cache_key)
+                continue
+            
+            try:
+                raw = self._complete(
+                    build_batch_request([(title, prepared, source) for _, title, prepared, source, _, _ in group]),
+                    'batch'
+                )
+                parsed = parse_batch_response(raw, len(group))
+            except ValueError as e:
+                summarizer_metrics.record_parse_failure('batch', len(group))
+                logger.warning(f"Unparseable batch summary response, retrying {len(group)} articles individually: {str(e)}")
+                parsed = {}
+            except Exception as e:
+                # Transport-level failure: retrying each article would only fail again
+                logger.error(f"Failed to generate batch summary for {len(group)} articles: {str(e)}")
+                continue
+            
+            if len(parsed) < len(group):
+                summarizer_metrics.record_parse_failure('batch', len(group) - len(parsed))
+            
+            for article_id, (i, title, prepared_content, source_name, cache_key, _) in enumerate(group, start=1):
+                if article_id in parsed:
+                    summary, key_points = parsed[article_id]
+                    summary_cache.set(cache_key, summary, key_points)
+                    results[i] = (summary, key_points)
+                else:
+                    results[i] = self._summarize_prepared(title, prepared_content, source_name, cache_key)
+            
+            logger.info(f"Generated batch summary for {len(parsed)} of {len(group)} articles")
+        
+        return results
+    
+    @staticmethod
+    def _parse(raw: str, path: str, title_only: bool = False) -> Tuple[Optional[str], Optional[List[str]]]:
+        try:
+            return parse_summary_response(raw, title_only=title_only)
+        except (ValueError, TypeError, AttributeError) as e:
+            summarizer_metrics.record_parse_failure(path)
+            logger.warning(f"Unparseable summary response: {str(e)}")
+            return None, None
+    
+    @staticmethod
+    def _pack(packable: List[Tuple]) -> List[List[Tuple]]:
+        groups = []
+        current = []
+        current_tokens = 0
+        for entry in packable:
+            tokens = entry[-1]
+            if current and (current_tokens + tokens > BATCH_TOKEN_BUDGET or len(current) >= BATCH_MAX_ARTICLES):
+                groups.append(current)
+                current = []
+                current_tokens = 0
+            current.append(entry)
+            current_tokens += tokens
+        if current:
+            groups.append(current)
+        return groups
+
+
+class SummaryRouter:
+    def __init__(self, llm: SummarizerBackend, local: SummarizerBackend, policy: str):
+        if policy not in SUMMARIZER_POLICIES:
+            logger.warning(f"Unknown SUMMARIZER_POLICY '{policy}', using llm_fallback")
+            policy = 'llm_fallback'
+        self.llm = llm
+        self.local = local
+        self.policy = policy
+    
+    def backends(self) -> List[SummarizerBackend]:
+        if self.policy == 'llm':
+            return [self.llm]
+        if self.policy == 'llm_fallback':
+            return [self.llm, self.local]
+        return [self.local]
+    
+    def summarize(
+        self,
+        title: str,
+        content: Optional[str],
+        source_name: str,
+        content_type: Optional[str] = None
+    ) -> SummaryResult:
+        for backend in self.backends():
+            if not backend.is_available():
+                continue
+            
+            summary, key_points = backend.summarize(title, content, source_name, content_type)
+            if summary:
+                return SummaryResult(summary, key_points, backend.name)
+        
+        return SummaryResult(None, None, None)
+    
+    def summarize_batch(self, articles: List[Dict]) -> List[SummaryResult]:
+        results = [SummaryResult(None, None, None)] * len(articles)
+        remaining = list(range(len(articles)))
+        
+        for backend in self.backends():
+            if not remaining or not backend.is_available():
+                continue
+            
+            outputs = backend.summarize_batch([articles[i] for i in remaining])
+            still_missing = []
+            for i, (summary, key_points) in zip(remaining, outputs):
+                if summary:
+                    results[i] = SummaryResult(summary, key_points, backend.name)
+                else:
+                    still_missing.append(i)
+            remaining = still_missing
+        
+        return results
 
 
 summarizer = AISummarizer()
+local_summarizer = ExtractiveSummarizer()
+router = SummaryRouter(summarizer, local_summarizer, settings.summarizer_policy)
+
+
+def summarize_article(
+    title: str,
+    content: Optional[str],
+    source_name: str,
+    content_type: Optional[str] = None
+) -> SummaryResult:
+    return router.summarize(title, content, source_name, content_type)
+
+
+def summarize_articles(articles: List[Dict]) -> List[SummaryResult]:
+    """Summarize many articles at once, packing short ones into shared LLM requests.
+    
+    articles: dicts with title, content, source_name and content_type.
+    """
+    return router.summarize_batch(articles)
 
 
 def generate_article_summary(
-    title: str, 
-    content: Optional[str], 
-    source_name: str
+    title: str,
+    content: Optional[str],
+    source_name: str,
+    content_type: Optional[str] = None
 ) -> Tuple[Optional[str], Optional[List[str]]]:
-    if content and len(content.strip()) > 100:
-        return summarizer.generate_summary(title, content, source_name)
-    else:
-        return summarizer.generate_summary_from_title_only(title, source_name)
+    result = summarize_article(title, content, source_name, content_type)
+    return result.summary, result.key_points
+
 
+def upgrade_local_summaries(limit: int = 50) -> Dict:
+    """Replace locally generated summaries with LLM ones, newest first."""
+    from sqlalchemy.orm import joinedload
+    from database import SessionLocal
+    from models import Content
+    
+    if not summarizer.is_available():
+        return {"checked": 0, "upgraded": 0}
+    
+    db = SessionLocal()
+    try:
+        articles = db.query(Content).options(joinedload(Content.body)).filter(
+            Content.is_active == True,
+            Content.ai_summary_backend == local_summarizer.name
+        ).order_by(Content.published_date.desc()).limit(limit).all()
+        
+        upgraded = 0
+        for article in articles:
+            summary, key_points = summarizer.summarize(
+                article.title,
+                article.reader_mode_content or article.full_content,
+                article.source_name,
+                article.content_type
+            )
+            if summary:
+                article.ai_summary = summary
+                article.ai_key_points = key_points
+                article.ai_summary_backend = summarizer.name
+                upgraded += 1
+        
+        db.commit()
+        logger.info(f"Upgraded {upgraded} of {len(articles)} local summaries")
+        return {"checked": len(articles), "upgraded": upgraded}
+    except Exception as e:
+        logger.error(f"Failed to upgrade local summaries: {str(e)}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Cold storage for article bodies.
+
+Once a published month is older than ARCHIVE_AFTER_MONTHS, its content_body
+rows are written to one compressed JSONL file in ARCHIVE_DIR and deleted from
+the database. Metadata (title, summary, tags) stays in content, so feed and
+search are unaffected; the article endpoint reads archived bodies back one
+frame at a time. With ARCHIVE_TABLESPACE set, the month's content partition is
+also moved to that tablespace.
+
+    python archive.py status
+    python archive.py run [--older-than-months 12] [--dry-run]
+    python archive.py month 2024-01
+    python archive.py restore 2024-01
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import bisect
+import gzip
+import heapq
+import json
+import logging
+import tempfile
+import time
+from datetime import date, datetime
+from typing import Optional, List, Dict, Iterator, Tuple, Callable
+
+from sqlalchemy import select, update, delete, exists, func
+from sqlalchemy.orm import Session
+
+from config import get_settings
+from models import Content, ContentBody, ContentArchive
+from partitions import month_start, add_months, partition_month, list_partitions, move_to_tablespace
+
+logger = logging.getLogger(__name__)
+
+BODY_FIELDS = ('full_content', 'reader_mode_content', 'ai_key_points')
+
+# Rows per compressed frame; reading one archived article decompresses one frame
+FRAME_ROWS = 64
+READ_BATCH = 500
+
+
+def month_key(month: date) -> str:
+    return f"{month:%Y-%m}"
+
+
+def parse_month(value: str) -> date:
+    return datetime.strptime(value, '%Y-%m').date()
+
+
+def codec_functions(codec: str) -> Tuple[str, Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    """(file suffix, compress, decompress); frames are independent, so a file is also a plain .zst/.gz stream."""
+    if codec == 'zstd':
+        import zstandard
+        return (
+            'zst',
+            lambda data: zstandard.ZstdCompressor(level=10).compress(data),
+            lambda data: zstandard.ZstdDecompressor().decompress(data),
+        )
+    if codec == 'gzip':
+        return 'gz', gzip.compress, gzip.decompress
+    raise ValueError(f"Unknown archive codec {codec}")
+
+
+def merge_fields(row: Dict, archived: Dict) -> Dict:
+    """Fill the body fields row leaves empty from archived, in place.
+
+    A backfill that writes one field of an archived article creates a body
+    row with only that field set; the other fields still live in the archive.
+    """
+    for field in BODY_FIELDS:
+        if row.get(field) is None:
+            row[field] = archived.get(field)
+    return row
+
+
+class BodyArchive:
+    """Monthly body archives: a file of compressed frames, indexed by the frames column of content_archives."""
+    
+    def __init__(self, directory: str, codec: str):
+        self.directory = directory
+        self.codec = codec
+    
+    def _write_codec(self) -> str:
+        if self.codec == 'zstd':
+            try:
+                import zstandard  # noqa: F401
+            except ImportError:
+                logger.warning("ARCHIVE_CODEC=zstd but zstandard is not installed; archiving with gzip")
+                return 'gzip'
+        return self.codec
+    
+    def read_frame(self, record: ContentArchive, frame: List[int]) -> List[Dict]:
+        _, _, decompress = codec_functions(record.codec)
+        with open(os.path.join(self.directory, record.filename), 'rb') as f:
+            f.seek(frame[2])
+            data = decompress(f.read(frame[3]))
+        return [json.loads(line) for line in data.splitlines()]
+    
+    def iter_archived(self, record: ContentArchive) -> Iterator[Dict]:
+        for frame in record.frames:
+            yield from self.read_frame(record, frame)
+    
+    def load(self, db: Session, content: Content) -> Optional[Dict]:
+        """Archived body fields of content, or None if its month holds no archived body for it."""
+        record = db.get(ContentArchive, month_key(month_start(content.published_date)))
+        for attempt in range(2):
+            if record is None:
+                return None
+            frames = record.frames
+            index = bisect.bisect_left([frame[1] for frame in frames], content.id)
+            if index == len(frames) or frames[index][0] > content.id:
+                return None
+            try:
+                rows = self.read_frame(record, frames[index])
+            except FileNotFoundError:
+                # Re-archived since the record was read; the new record names the new file
+                db.expire(record)
+                record = db.get(ContentArchive, record.month)
+                continue
+            for row in rows:
+                if row['content_id'] == content.id:
+                    return {field: row.get(field) for field in BODY_FIELDS}
+            return None
+        return None
+    
+    @staticmethod
+    def _db_bodies(db: Session, start: date, end: date) -> Iterator[Dict]:
+        last_id = 0
+        while True:
+            rows = db.execute(
+                select(ContentBody.content_id, *(getattr(ContentBody, field) for field in BODY_FIELDS))
+                .join(Content, Content.id == ContentBody.content_id)
+                .where(Content.published_date >= start, Content.published_date < end, ContentBody.content_id > last_id)
+                .order_by(ContentBody.content_id)
+                .limit(READ_BATCH)
+            ).all()
+            if not rows:
+                return
+            for row in rows:
+                yield row._asdict()
+            last_id = rows[-1].content_id
+    
+    def archive_month(self, db: Session, month: date) -> Dict:
+        """Move month's bodies into its archive file, merging with what an earlier run archived.
+
+        The new file and record are committed before any body is deleted, so
+        an interrupted run loses nothing and the next run picks up the rest.
+        """
+        key = month_key(month)
+        started = time.perf_counter()
+        record = db.get(ContentArchive, key)
+        codec = self._write_codec()
+        suffix, compress, _ = codec_functions(codec)
+        
+        # Rows still in content_body sort before an archived copy of the same id
+        merged = heapq.merge(
+            ((row['content_id'], 0, row) for row in self._db_bodies(db, month, add_months(month, 1))),
+            ((row['content_id'], 1, row) for row in (self.iter_archived(record) if record else ())),
+        )
+        os.makedirs(self.directory, exist_ok=True)
+        fd, staging = tempfile.mkstemp(prefix='.archive-', dir=self.directory)
+        frames: List[List[int]] = []
+        moved: List[int] = []
+        pending: List[Dict] = []
+        offset = rows = 0
+        with os.fdopen(fd, 'wb') as f:
+            def write_frame():
+                nonlocal offset, rows
+                data = compress(b''.join(json.dumps(row).encode('utf-8') + b'\n' for row in pending))
+                f.write(data)
+                frames.append([pending[0]['content_id'], pending[-1]['content_id'], offset, len(data)])
+                offset += len(data)
+                rows += len(pending)
+                pending.clear()
+            
+            current = None
+            for content_id, source, row in merged:
+                if current is not None and content_id == current['content_id']:
+                    merge_fields(current, row)
+                    continue
+                if current is not None:
+                    pending.append(current)
+                    if len(pending) == FRAME_ROWS:
+                        write_frame()
+                current = dict(row)
+                if source == 0:
+                    moved.append(content_id)
+            if current is not None:
+                pending.append(current)
+            if pending:
+                write_frame()
+            f.flush()
+            os.fsync(f.fileno())
+        
+        if not moved:
+            os.remove(staging)
+            return {'month': key, 'moved': 0, 'rows': record.rows if record else 0}
+        
+        filename = f"content_body-{key}-{int(time.time())}.jsonl.{suffix}"
+        os.chmod(staging, 0o644)
+        os.replace(staging, os.path.join(self.directory, filename))
+        old_filename = record.filename if record else None
+        if record is None:
+            record = ContentArchive(month=key)
+            db.add(record)
+        record.filename = filename
+        record.codec = codec
+        record.rows = rows
+        record.bytes = offset
+        record.frames = frames
+        record.archived_at = datetime.now()
+        db.commit()
+        
+        for start in range(0, len(moved), READ_BATCH):
+            db.execute(delete(ContentBody).where(ContentBody.content_id.in_(moved[start:start + READ_BATCH])))
+            db.commit()
+        if old_filename and old_filename != filename:
+            try:
+                os.remove(os.path.join(self.directory, old_filename))
+            except OSError:
+                pass
+        
+        logger.info(f"Archived {len(moved)} bodies of {key} ({offset / 1e6:.1f} MB) in {time.perf_counter() - started:.1f}s")
+        return {'month': key, 'moved': len(moved), 'rows': rows, 'bytes': offset}
+    
+    def restore_month(self, db: Session, month: date) -> int:
+        """Put an archived month's bodies back into content_body and delete its archive."""
+        record = db.get(ContentArchive, month_key(month))
+        if record is None:
+            return 0
+        restored = 0
+        batch: List[Dict] = []
+        
+        def insert_batch():
+            nonlocal restored
+            ids = [row['content_id'] for row in batch]
+            live = set(db.execute(select(Content.id).where(Content.id.in_(ids))).scalars())
+            present = {
+                row.content_id: row._asdict()
+                for row in db.execute(
+                    select(ContentBody.content_id, *(getattr(ContentBody, field) for field in BODY_FIELDS))
+                    .where(ContentBody.content_id.in_(ids))
+                )
+            }
+            new_rows = [row for row in batch if row['content_id'] in live and row['content_id'] not in present]
+            if new_rows:
+                db.connection().execute(ContentBody.__table__.insert(), new_rows)
+            for row in batch:
+                if row['content_id'] in present:
+                    merged = merge_fields(present[row['content_id']], row)
+                    db.execute(
+                        update(ContentBody).where(ContentBody.content_id == row['content_id'])
+                        .values({field: merged[field] for field in BODY_FIELDS})
+                    )
+            db.commit()
+            restored += len(new_rows)
+            batch.clear()
+        
+        for row in self.iter_archived(record):
+            batch.append({'content_id': row['content_id'], **{field: row.get(field) for field in BODY_FIELDS}})
+            if len(batch) == READ_BATCH:
+                insert_batch()
+        if batch:
+            insert_batch()
+        
+        filename = record.filename
+        db.delete(record)
+        db.commit()
+        try:
+            os.remove(os.path.join(self.directory, filename))
+        except OSError:
+            pass
+        logger.info(f"Restored {restored} bodies of {month_key(month)}")
+        return restored
+    
+    @staticmethod
+    def has_bodies(db: Session, month: date) -> bool:
+        return db.execute(
+            select(Content.id).where(
+                Content.published_date >= month,
+                Content.published_date < add_months(month, 1),
+                exists().where(ContentBody.content_id == Content.id)
+            ).limit(1)
+        ).first() is not None
+    
+    def run_policy(self, db: Session, older_than_months: Optional[int] = None, dry_run: bool = False) -> Dict:
+        """Archive every month older than the cutoff that still has bodies in the database.
+
+        Months archived earlier are revisited too, so bodies written to them
+        since (a re-extraction, a late old-dated article) join their archive.
+        """
+        settings = get_settings()
+        months = settings.archive_after_months if older_than_months is None else older_than_months
+        if months <= 0:
+            return {'status': 'disabled'}
+        cutoff = add_months(month_start(datetime.now()), -months)
+        oldest = db.execute(select(func.min(Content.published_date))).scalar()
+        
+        results = []
+        month = month_start(oldest) if oldest else cutoff
+        while month < cutoff:
+            if self.has_bodies(db, month):
+                results.append({'month': month_key(month), 'status': 'eligible'} if dry_run else self.archive_month(db, month))
+            month = add_months(month, 1)
+        
+        moved_partitions = []
+        if settings.archive_tablespace and not dry_run:
+            conn = db.connection()
+            for partition in list_partitions(conn):
+                month = partition_month(partition['name'])
+                if month and month < cutoff and partition['tablespace'] != settings.archive_tablespace:
+                    move_to_tablespace(conn, partition['name'], settings.archive_tablespace)
+                    db.commit()
+                    conn = db.connection()
+                    moved_partitions.append(partition['name'])
+        return {'status': 'completed', 'cutoff': month_key(cutoff), 'months': results, 'moved_partitions': moved_partitions}
+    
+    def status(self, db: Session) -> List[Dict]:
+        return [
+            {
+                'month': record.month,
+                'rows': record.rows,
+                'bytes': record.bytes,
+                'codec': record.codec,
+                'file': record.filename,
+                'archived_at': record.archived_at,
+            }
+            for record in db.execute(select(ContentArchive).order_by(ContentArchive.month)).scalars()
+        ]
+
+
+_settings = get_settings()
+
+body_archive = BodyArchive(_settings.archive_dir, _settings.archive_codec)
+
+
+def main():
+    from database import SessionLocal
+    
+    parser = argparse.ArgumentParser(description="Move old article bodies to compressed cold storage")
+    sub = parser.add_subparsers(dest='command', required=True)
+    
+    sub.add_parser('status', help="List archived months")
+    
+    run_parser = sub.add_parser('run', help="Archive every month past the cutoff")
+    run_parser.add_argument('--older-than-months', type=int, help="Defaults to ARCHIVE_AFTER_MONTHS")
+    run_parser.add_argument('--dry-run', action='store_true', help="Only list the months that would be archived")
+    
+    month_parser = sub.add_parser('month', help="Archive one month (YYYY-MM)")
+    month_parser.add_argument('month', type=parse_month)
+    
+    restore_parser = sub.add_parser('restore', help="Move one month's bodies back into the database")
+    restore_parser.add_argument('month', type=parse_month)
+    
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        if args.command == 'status':
+            for entry in body_archive.status(db):
+                print(f"{entry['month']}  {entry['rows']:>8} rows  {entry['bytes'] / 1e6:>8.1f} MB  "
+                      f"{entry['codec']:<5} {entry['file']}")
+        elif args.command == 'run':
+            result = body_archive.run_policy(db, args.older_than_months, args.dry_run)
+            print(json.dumps(result, indent=2, default=str))
+        elif args.command == 'month':
+            print(body_archive.archive_month(db, args.month))
+        elif args.command == 'restore':
+            print(f"Restored {body_archive.restore_month(db, args.month)} bodies")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
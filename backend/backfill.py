@@ -0,0 +1,576 @@
+#!/usr/bin/env python3
+"""
+Generic backfill runner for re-processing the content corpus.
+
+A task (see backfill_tasks.py) names the rows it wants (a predicate), the
+columns it needs, and a per-row transform that returns column updates or
+DELETE. A run splits the matching id range into shards; each shard is
+processed in keyset chunks by a local process pool or by Celery workers.
+Results are bulk-written and the shard's resume point is committed in the
+same transaction, so an interrupted or cancelled run resumes where it stopped.
+
+    python backfill.py list
+    python backfill.py run summaries --shards 4 --workers 4
+    python backfill.py run language --dry-run
+    python backfill.py status [RUN_ID]
+    python backfill.py cancel RUN_ID
+    python backfill.py resume RUN_ID --workers 4
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import logging
+import math
+import multiprocessing
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Sequence, Any
+
+from sqlalchemy import select, update, bindparam, func
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import Content, ContentBody, BackfillRun, BackfillShard
+from maintenance import iter_chunks, bulk_delete, ensure_bodies
+
+logger = logging.getLogger(__name__)
+
+# Returned by a transform to delete the row
+DELETE = object()
+
+TASKS: Dict[str, type] = {}
+
+ACTIVE_STATUSES = ('pending', 'running')
+
+
+class BackfillTask(ABC):
+    """Base class for backfill plugins.
+
+    Subclasses set name and columns, and implement where() and transform_batch().
+    Tasks that handle one row at a time subclass RowTask and implement transform().
+    """
+    
+    name: str = ''
+    description: str = ''
+    columns: Sequence = ()
+    chunk_size: int = 500
+    # Tasks whose writes can conflict across id ranges (e.g. unique columns) set this to 1
+    max_shards: Optional[int] = None
+    
+    def __init__(self, **params: Any):
+        self.params = params
+    
+    def where(self) -> List:
+        return []
+    
+    @abstractmethod
+    def transform_batch(self, db: Session, rows: List) -> List[Any]:
+        """Transform a chunk; a returned Exception counts as an error for that row only."""
+
+
+class RowTask(BackfillTask):
+    """A task that transforms each row on its own."""
+    
+    # Threads per chunk for network-bound transforms; outbound limits still apply per host
+    concurrency: int = 1
+    
+    @abstractmethod
+    def transform(self, row) -> Any:
+        """Return a dict of column updates, DELETE, or None to leave the row alone."""
+    
+    def transform_batch(self, db: Session, rows: List) -> List[Any]:
+        if self.concurrency > 1 and len(rows) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(rows))) as pool:
+                return list(pool.map(self._transform_or_error, rows))
+        return [self._transform_or_error(row) for row in rows]
+    
+    def _transform_or_error(self, row) -> Any:
+        try:
+            return self.transform(row)
+        except Exception as e:
+            return e
+
+
+def register(task_cls: type) -> type:
+    TASKS[task_cls.name] = task_cls
+    return task_cls
+
+
+def load_tasks() -> Dict[str, type]:
+    import backfill_tasks  # noqa: F401 - registers the built-in tasks
+    return TASKS
+
+
+def get_task(name: str) -> type:
+    load_tasks()
+    if name not in TASKS:
+        raise ValueError(f"Unknown backfill task '{name}'. Known tasks: {', '.join(sorted(TASKS))}")
+    return TASKS[name]
+
+
+BODY_COLUMNS = frozenset(c.name for c in ContentBody.__table__.columns if c.name != 'content_id')
+
+
+def apply_updates(db: Session, updates: List[Dict]) -> int:
+    """Bulk-write {'id': ..., column: value} dicts, one executemany per table and column set.
+
+    Body columns (full_content, reader_mode_content, ai_key_points) go to content_body.
+    """
+    by_columns: Dict[tuple, List[Dict]] = {}
+    for values in updates:
+        columns = tuple(sorted(k for k in values if k != 'id'))
+        by_columns.setdefault(columns, []).append(values)
+    
+    for columns, group in by_columns.items():
+        for table, key, table_columns in (
+            (Content.__table__, 'id', [c for c in columns if c not in BODY_COLUMNS]),
+            (ContentBody.__table__, 'content_id', [c for c in columns if c in BODY_COLUMNS]),
+        ):
+            if not table_columns:
+                continue
+            if table is ContentBody.__table__:
+                ensure_bodies(db, [values['id'] for values in group])
+            stmt = update(table).where(table.c[key] == bindparam('b_id')).values(
+                {column: bindparam(f'b_{column}') for column in table_columns}
+            )
+            db.connection().execute(stmt, [
+                {'b_id': values['id'], **{f'b_{column}': values[column] for column in table_columns}}
+                for values in group
+            ])
+    return len(updates)
+
+
+def create_run(
+    db: Session,
+    task_name: str,
+    shards: int = 1,
+    chunk_size: Optional[int] = None,
+    limit: Optional[int] = None,
+    dry_run: bool = False,
+    params: Optional[Dict] = None
+) -> BackfillRun:
+    task_cls = get_task(task_name)
+    task = task_cls(**(params or {}))
+    if task_cls.max_shards:
+        shards = min(shards, task_cls.max_shards)
+    
+    min_id, max_id = db.execute(
+        select(func.min(Content.id), func.max(Content.id)).where(*task.where())
+    ).one()
+    
+    run = BackfillRun(
+        task=task_name,
+        status='pending',
+        params=params or {},
+        chunk_size=chunk_size or task_cls.chunk_size,
+        dry_run=dry_run,
+    )
+    db.add(run)
+    db.flush()
+    
+    if min_id is not None:
+        shards = max(1, min(shards, max_id - min_id + 1))
+        span = math.ceil((max_id - min_id + 1) / shards)
+        row_limit = math.ceil(limit / shards) if limit else None
+        for i in range(shards):
+            start_id = min_id + i * span
+            db.add(BackfillShard(
+                run_id=run.id,
+                shard=i,
+                start_id=start_id,
+                end_id=min(start_id + span - 1, max_id),
+                last_id=start_id - 1,
+                row_limit=row_limit,
+                status='pending',
+            ))
+    
+    db.commit()
+    logger.info(f"Created backfill run {run.id} ({task_name}) over ids {min_id}..{max_id} in {shards} shard(s)")
+    return run
+
+
+def run_shard(run_id: int, shard_index: int) -> Dict:
+    """Process one shard until it is done, cancelled or hits its row limit.
+
+    Top-level so it can run in a process pool or a Celery task.
+    """
+    db = SessionLocal()
+    try:
+        run = db.get(BackfillRun, run_id)
+        shard = db.get(BackfillShard, (run_id, shard_index))
+        if run is None or shard is None:
+            raise ValueError(f"No shard {shard_index} in backfill run {run_id}")
+        if shard.status == 'completed':
+            return shard_summary(shard)
+        
+        task = get_task(run.task)(**(run.params or {}))
+        shard.status = 'running'
+        db.commit()
+        
+        where = [*task.where(), Content.id <= shard.end_id]
+        for rows in iter_chunks(db, task.columns, run.chunk_size, shard.last_id, where):
+            db.refresh(run, ['status'])
+            if run.status == 'cancelled':
+                shard.status = 'cancelled'
+                db.commit()
+                logger.info(f"Backfill run {run_id} shard {shard_index} cancelled at id {shard.last_id}")
+                return shard_summary(shard)
+            
+            if shard.row_limit is not None:
+                rows = rows[:max(shard.row_limit - shard.processed, 0)]
+                if not rows:
+                    break
+            
+            try:
+                results = task.transform_batch(db, rows)
+            except Exception as e:
+                logger.error(f"Backfill {run.task} chunk after id {shard.last_id} failed: {str(e)}")
+                db.rollback()
+                results = [None] * len(rows)
+                shard.errors += len(rows)
+                shard.last_error = str(e)[:2000]
+            
+            updates = []
+            deletes = []
+            for row, result in zip(rows, results):
+                if result is DELETE:
+                    deletes.append(row.id)
+                elif isinstance(result, Exception):
+                    shard.errors += 1
+                    shard.last_error = f"{row.id}: {str(result)}"[:2000]
+                elif result:
+                    updates.append({'id': row.id, **result})
+            
+            if not run.dry_run:
+                apply_updates(db, updates)
+                bulk_delete(db, deletes)
+            
+            shard.last_id = rows[-1].id
+            shard.processed += len(rows)
+            shard.updated += len(updates)
+            shard.deleted += len(deletes)
+            db.commit()
+        
+        shard.status = 'completed'
+        db.commit()
+        return shard_summary(shard)
+    except Exception as e:
+        db.rollback()
+        shard = db.get(BackfillShard, (run_id, shard_index))
+        if shard is not None:
+            shard.status = 'failed'
+            shard.last_error = str(e)[:2000]
+            db.commit()
+        logger.error(f"Backfill run {run_id} shard {shard_index} failed: {str(e)}")
+        raise
+    finally:
+        finish_run_if_done(db, run_id)
+        db.close()
+
+
+def shard_progress(shard: BackfillShard) -> float:
+    if shard.status == 'completed':
+        return 1.0
+    if shard.row_limit:
+        return min((shard.processed or 0) / shard.row_limit, 1.0)
+    # Ids are not dense, so this is an estimate from how far the keyset has moved
+    return max(shard.last_id - shard.start_id + 1, 0) / (shard.end_id - shard.start_id + 1)
+
+
+def shard_summary(shard: BackfillShard) -> Dict:
+    return {
+        'shard': shard.shard,
+        'status': shard.status,
+        'progress': round(shard_progress(shard), 3),
+        'start_id': shard.start_id,
+        'end_id': shard.end_id,
+        'last_id': shard.last_id,
+        'processed': shard.processed,
+        'updated': shard.updated,
+        'deleted': shard.deleted,
+        'errors': shard.errors,
+        'last_error': shard.last_error,
+    }
+
+
+def finish_run_if_done(db: Session, run_id: int):
+    run = db.get(BackfillRun, run_id)
+    if run is None or run.status not in ACTIVE_STATUSES:
+        return
+    statuses = [s for (s,) in db.execute(select(BackfillShard.status).where(BackfillShard.run_id == run_id))]
+    if any(s in ACTIVE_STATUSES for s in statuses):
+        return
+    run.status = 'failed' if 'failed' in statuses else 'completed'
+    run.finished_at = datetime.now()
+    db.commit()
+
+
+def execute_run(run_id: int, workers: int = 1, use_celery: bool = False) -> Dict:
+    """Run every unfinished shard of a run, in this process, a process pool, or on Celery."""
+    db = SessionLocal()
+    try:
+        run = db.get(BackfillRun, run_id)
+        if run is None:
+            raise ValueError(f"No backfill run {run_id}")
+        shards = [
+            s for (s,) in db.execute(
+                select(BackfillShard.shard).where(
+                    BackfillShard.run_id == run_id,
+                    BackfillShard.status != 'completed'
+                ).order_by(BackfillShard.shard)
+            )
+        ]
+        run.status = 'running'
+        run.finished_at = None
+        db.execute(
+            update(BackfillShard)
+            .where(BackfillShard.run_id == run_id, BackfillShard.status != 'completed')
+            .values(status='pending')
+        )
+        db.commit()
+    finally:
+        db.close()
+    
+    if use_celery:
+        from celery_app import celery_app
+        for shard in shards:
+            celery_app.send_task('celery_app.backfill_shard_task', args=[run_id, shard])
+        logger.info(f"Dispatched {len(shards)} shard(s) of backfill run {run_id} to Celery")
+    elif workers > 1 and len(shards) > 1:
+        # spawn, so children open their own database connections
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards)), mp_context=context) as pool:
+            for future in [pool.submit(run_shard, run_id, shard) for shard in shards]:
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"Backfill shard failed: {str(e)}")
+    else:
+        for shard in shards:
+            try:
+                run_shard(run_id, shard)
+            except Exception as e:
+                logger.error(f"Backfill shard failed: {str(e)}")
+    
+    db = SessionLocal()
+    try:
+        if not shards:
+            finish_run_if_done(db, run_id)
+        return run_status(db, run_id)
+    finally:
+        db.close()
+
+
+def start_run(
+    task_name: str,
+    shards: int = 1,
+    workers: int = 1,
+    use_celery: bool = False,
+    chunk_size: Optional[int] = None,
+    limit: Optional[int] = None,
+    dry_run: bool = False,
+    params: Optional[Dict] = None
+) -> Dict:
+    db = SessionLocal()
+    try:
+        run_id = create_run(db, task_name, shards, chunk_size, limit, dry_run, params).id
+    finally:
+        db.close()
+    return execute_run(run_id, workers, use_celery)
+
+
+def cancel_run(db: Session, run_id: int) -> Dict:
+    """Shards stop before their next chunk; resume_run picks up from there."""
+    run = db.get(BackfillRun, run_id)
+    if run is None:
+        raise ValueError(f"No backfill run {run_id}")
+    if run.status in ACTIVE_STATUSES:
+        run.status = 'cancelled'
+        run.finished_at = datetime.now()
+        db.execute(
+            update(BackfillShard)
+            .where(BackfillShard.run_id == run_id, BackfillShard.status == 'pending')
+            .values(status='cancelled')
+        )
+        db.commit()
+    return run_status(db, run_id)
+
+
+def active_run(db: Session, task_name: str) -> Optional[int]:
+    """Id of a pending or running (non dry-run) run of task_name, if any."""
+    return db.execute(
+        select(BackfillRun.id)
+        .where(
+            BackfillRun.task == task_name,
+            BackfillRun.dry_run == False,
+            BackfillRun.status.in_(ACTIVE_STATUSES)
+        )
+        .order_by(BackfillRun.id.desc())
+        .limit(1)
+    ).scalar()
+
+
+def claim_stale_run(db: Session, run_id: int, lease_seconds: int) -> bool:
+    """Take over an active run none of whose shards has committed a chunk in lease_seconds.
+
+    Shards move updated_at with every chunk commit, so a run whose process went
+    away (an API restart under the local executor, a lost Celery task) stops
+    moving. The claim bumps the heartbeats itself, so only one caller wins it.
+    """
+    run = db.get(BackfillRun, run_id)
+    if run is None or run.status not in ACTIVE_STATUSES:
+        return False
+    # The database clock, which also sets updated_at and created_at; Postgres returns it in the
+    # session time zone, the one those naive columns were stored in
+    now = db.execute(select(func.now())).scalar().replace(tzinfo=None)
+    cutoff = now - timedelta(seconds=lease_seconds)
+    active = db.execute(
+        select(func.count()).select_from(BackfillShard).where(
+            BackfillShard.run_id == run_id,
+            BackfillShard.status.in_(ACTIVE_STATUSES)
+        )
+    ).scalar()
+    if not active:
+        # Stopped before its shards were dispatched or before it was marked finished
+        return run.created_at is not None and run.created_at < cutoff
+    
+    claimed = db.execute(
+        update(BackfillShard).where(
+            BackfillShard.run_id == run_id,
+            BackfillShard.status.in_(ACTIVE_STATUSES),
+            BackfillShard.updated_at < cutoff
+        ).values(updated_at=func.now())
+    ).rowcount
+    if claimed < active:
+        db.rollback()
+        return False
+    db.commit()
+    logger.info(f"Backfill run {run_id} made no progress in {lease_seconds}s; taking it over")
+    return True
+
+
+def latest_unfinished_run(db: Session, task_name: str, dry_run: bool = False) -> Optional[int]:
+    return db.execute(
+        select(BackfillRun.id)
+        .where(
+            BackfillRun.task == task_name,
+            BackfillRun.dry_run == dry_run,
+            BackfillRun.status.in_(('cancelled', 'failed', 'running', 'pending'))
+        )
+        .order_by(BackfillRun.id.desc())
+        .limit(1)
+    ).scalar()
+
+
+def run_status(db: Session, run_id: int) -> Dict:
+    run = db.get(BackfillRun, run_id)
+    if run is None:
+        raise ValueError(f"No backfill run {run_id}")
+    db.refresh(run)
+    shards = db.execute(
+        select(BackfillShard).where(BackfillShard.run_id == run_id).order_by(BackfillShard.shard)
+    ).scalars().all()
+    summaries = [shard_summary(s) for s in shards]
+    return {
+        'id': run.id,
+        'task': run.task,
+        'status': run.status,
+        'dry_run': run.dry_run,
+        'params': run.params,
+        'created_at': run.created_at.isoformat() if run.created_at else None,
+        'finished_at': run.finished_at.isoformat() if run.finished_at else None,
+        'progress': round(sum(s['progress'] for s in summaries) / len(summaries), 3) if summaries else 1.0,
+        'processed': sum(s['processed'] for s in summaries),
+        'updated': sum(s['updated'] for s in summaries),
+        'deleted': sum(s['deleted'] for s in summaries),
+        'errors': sum(s['errors'] for s in summaries),
+        'shards': summaries,
+    }
+
+
+def list_runs(db: Session, limit: int = 20) -> List[Dict]:
+    runs = db.execute(select(BackfillRun).order_by(BackfillRun.id.desc()).limit(limit)).scalars().all()
+    return [{'id': r.id, 'task': r.task, 'status': r.status, 'dry_run': r.dry_run} for r in runs]
+
+
+def add_run_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--shards', type=int, default=1, help="Split the id range into this many shards")
+    parser.add_argument('--workers', type=int, default=1, help="Local worker processes")
+    parser.add_argument('--celery', action='store_true', help="Dispatch shards to Celery workers instead")
+    parser.add_argument('--chunk-size', type=int, help="Rows per chunk (default: per task)")
+    parser.add_argument('--limit', type=int, help="Stop after this many rows")
+    parser.add_argument('--dry-run', action='store_true', help="Run transforms without writing anything")
+
+
+def print_status(status: Dict):
+    print(f"Run {status['id']} [{status['task']}] {status['status']}{' (dry run)' if status['dry_run'] else ''} "
+          f"{status['progress']:.0%}: {status['processed']} processed, {status['updated']} updated, "
+          f"{status['deleted']} deleted, {status['errors']} errors")
+    for s in status['shards']:
+        print(f"  shard {s['shard']}: ids {s['start_id']}..{s['end_id']} at {s['last_id']} "
+              f"{s['status']} ({s['processed']} processed)"
+              + (f" last error: {s['last_error'][:100]}" if s['last_error'] else ''))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-process the content corpus with a backfill task")
+    sub = parser.add_subparsers(dest='command', required=True)
+    
+    sub.add_parser('list', help="List tasks and recent runs")
+    
+    run_parser = sub.add_parser('run', help="Start a new run")
+    run_parser.add_argument('task')
+    add_run_arguments(run_parser)
+    
+    status_parser = sub.add_parser('status', help="Show a run's progress")
+    status_parser.add_argument('run_id', type=int, nargs='?')
+    
+    cancel_parser = sub.add_parser('cancel', help="Stop a run before its next chunk")
+    cancel_parser.add_argument('run_id', type=int)
+    
+    resume_parser = sub.add_parser('resume', help="Continue a cancelled, failed or interrupted run")
+    resume_parser.add_argument('run_id', type=int)
+    resume_parser.add_argument('--workers', type=int, default=1)
+    resume_parser.add_argument('--celery', action='store_true')
+    
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    
+    if args.command == 'run':
+        print_status(start_run(
+            args.task, args.shards, args.workers, args.celery, args.chunk_size, args.limit, args.dry_run
+        ))
+        return
+    if args.command == 'resume':
+        print_status(execute_run(args.run_id, args.workers, args.celery))
+        return
+    
+    db = SessionLocal()
+    try:
+        if args.command == 'list':
+            for name, task_cls in sorted(load_tasks().items()):
+                print(f"{name:<20} {task_cls.description}")
+            print()
+            for run in list_runs(db):
+                print(f"run {run['id']:<6} {run['task']:<20} {run['status']}{' (dry run)' if run['dry_run'] else ''}")
+        elif args.command == 'status':
+            if args.run_id is None:
+                for run in list_runs(db):
+                    print_status(run_status(db, run['id']))
+            else:
+                print_status(run_status(db, args.run_id))
+        elif args.command == 'cancel':
+            print_status(cancel_run(db, args.run_id))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    # Run through the importable module so tasks, TASKS and run_shard (pickled
+    # for worker processes) are the same objects the plugins register with
+    from backfill import main as backfill_main
+    backfill_main()
@@ -0,0 +1,166 @@
+"""Built-in backfill tasks. Importing this module registers them with backfill.TASKS."""
+import logging
+from typing import List, Any
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from backfill import BackfillTask, RowTask, register
+from models import Content, ContentBody
+
+# The cleanup scripts define their own tasks; importing them registers those too
+import cleanup_duplicates  # noqa: F401
+import cleanup_non_english  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+
+@register
+class ThumbnailTask(BackfillTask):
+    name = 'thumbnails'
+    description = "Find thumbnails for active articles that have none"
+    columns = (Content.url,)
+    chunk_size = 50
+    
+    def where(self) -> List:
+        return [Content.thumbnail_url == None, Content.is_active == True]
+    
+    def transform_batch(self, db: Session, rows: List) -> List[Any]:
+        from thumbnails import thumbnail_resolver
+        thumbnails = thumbnail_resolver.resolve_many([row.url for row in rows])
+        return [{'thumbnail_url': thumbnails[row.url]} if thumbnails.get(row.url) else None for row in rows]
+
+
+@register
+class ArxivThumbnailTask(BackfillTask):
+    name = 'arxiv_thumbnails'
+    description = "Re-extract ArXiv thumbnails from the HTML version of each paper"
+    columns = (Content.url, Content.thumbnail_url)
+    chunk_size = 50
+    
+    def where(self) -> List:
+        return [Content.is_active == True, Content.url.contains('arxiv.org')]
+    
+    def transform_batch(self, db: Session, rows: List) -> List[Any]:
+        from thumbnails import thumbnail_resolver
+        # A refresh, so the cache is skipped; the resolver probes the HTML version of each paper
+        thumbnails = thumbnail_resolver.resolve_many([row.url for row in rows], scan_body=True, use_cache=False)
+        return [
+            {'thumbnail_url': thumbnails[row.url]}
+            if thumbnails.get(row.url) and thumbnails[row.url] != row.thumbnail_url else None
+            for row in rows
+        ]
+
+
+@register
+class ArxivContentTask(RowTask):
+    name = 'arxiv_content'
+    description = "Re-extract full text, reader-mode text and thumbnail of ArXiv papers"
+    columns = (Content.url,)
+    chunk_size = 20
+    concurrency = 4
+    
+    def where(self) -> List:
+        return [Content.is_active == True, Content.url.contains('arxiv.org')]
+    
+    def transform(self, row) -> Any:
+        from content_fetcher import ReaderModeExtractor
+        full_content, reader_content, thumbnail = ReaderModeExtractor.extract(row.url)
+        
+        values = {}
+        if full_content:
+            values['full_content'] = full_content
+        if reader_content:
+            values['reader_mode_content'] = reader_content
+        if thumbnail:
+            values['thumbnail_url'] = thumbnail[:2048]
+        return values or None
+
+
+@register
+class SummaryTask(BackfillTask):
+    """Params: include_local=True also replaces summaries from the local summarizer."""
+    
+    name = 'summaries'
+    description = "Generate AI summaries for active articles that have none"
+    columns = (Content.title, ContentBody.reader_mode_content, ContentBody.full_content, Content.source_name, Content.content_type)
+    # Matches the ingest path, so short articles share packed LLM requests
+    chunk_size = 16
+    
+    def where(self) -> List:
+        missing = Content.ai_summary == None
+        if self.params.get('include_local'):
+            missing = or_(missing, Content.ai_summary_backend == 'local')
+        return [Content.is_active == True, missing]
+    
+    def transform_batch(self, db: Session, rows: List) -> List[Any]:
+        from ai_summarizer import summarize_articles
+        results = summarize_articles([
+            {
+                'title': row.title,
+                'content': row.reader_mode_content or row.full_content,
+                'source_name': row.source_name,
+                'content_type': row.content_type,
+            }
+            for row in rows
+        ])
+        return [
+            {
+                'ai_summary': result.summary,
+                'ai_key_points': result.key_points,
+                'ai_summary_backend': result.backend,
+            } if result.summary else None
+            for result in results
+        ]
+
+
+@register
+class ThumbnailVariantTask(RowTask):
+    name = 'thumbnail_variants'
+    description = "Render proxy thumbnail variants and store their size and blurhash"
+    columns = (Content.thumbnail_url,)
+    chunk_size = 50
+    concurrency = 4
+    
+    def where(self) -> List:
+        return [Content.is_active == True, Content.thumbnail_url != None, Content.thumbnail_key == None]
+    
+    def transform(self, row) -> Any:
+        from image_proxy import image_proxy
+        meta = image_proxy.prepare(row.thumbnail_url)
+        return {
+            'thumbnail_key': meta['key'],
+            'thumbnail_width': meta['width'],
+            'thumbnail_height': meta['height'],
+            'thumbnail_blurhash': meta['blurhash'],
+        }
+
+
+@register
+class ClassifyTask(RowTask):
+    name = 'classify'
+    description = "Re-run ContentClassifier and update changed content types"
+    columns = (Content.title, Content.source_name, Content.tags, Content.content_type)
+    chunk_size = 1000
+    
+    def transform(self, row) -> Any:
+        from content_fetcher import ContentClassifier
+        content_type = ContentClassifier.classify(row.title, row.source_name, row.tags)
+        if content_type != row.content_type:
+            return {'content_type': content_type}
+        return None
+
+
+@register
+class URLHashTask(RowTask):
+    name = 'url_hash'
+    description = "Fill content.url_hash for rows stored before the column existed"
+    columns = (Content.url,)
+    chunk_size = 5000
+    
+    def where(self) -> List:
+        return [Content.url_hash == None]
+    
+    def transform(self, row) -> Any:
+        from url_keys import url_hash
+        return {'url_hash': url_hash(row.url)}
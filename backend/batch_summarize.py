@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+Backfill AI summaries for existing content through the OpenAI Batch API.
+
+Every step is resumable; progress lives in <batch-dir>/manifest.json.
+
+  prepare  stream rows missing ai_summary (or, with --include-local, holding
+           a local extractive summary) into JSONL request files
+  submit   upload prepared files and create batches
+  poll     check submitted batches and download finished output
+  apply    bulk-write downloaded results back to the content table
+  run      all of the above, polling until every chunk is applied
+
+Pass --local to run against LocalBatchClient instead of OpenAI.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import json
+import logging
+import re
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Optional, List, Dict, Callable
+
+from sqlalchemy import update, bindparam, or_, select, exists
+
+from database import SessionLocal
+from models import Content, ContentBody
+from ai_summarizer import (
+    SUMMARY_MODEL, SUMMARY_PROMPT_VERSION,
+    build_summary_request, build_title_request, parse_summary_response, title_cache_key
+)
+from extractive import prepare_summary_input
+from maintenance import ensure_bodies
+from summary_cache import summary_cache, SummaryCache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CHAT_COMPLETIONS_ENDPOINT = "/v1/chat/completions"
+APPLY_FLUSH_SIZE = 500
+
+
+class BatchManifest:
+    def __init__(self, batch_dir: str):
+        self.batch_dir = batch_dir
+        self.path = os.path.join(batch_dir, 'manifest.json')
+        self.data = {'last_prepared_id': 0, 'chunks': []}
+        
+        os.makedirs(batch_dir, exist_ok=True)
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.data = json.load(f)
+    
+    @property
+    def chunks(self) -> List[Dict]:
+        return self.data['chunks']
+    
+    def chunk_path(self, chunk: Dict, suffix: str) -> str:
+        return os.path.join(self.batch_dir, f"{chunk['name']}.{suffix}")
+    
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+def apply_summaries(db, updates: List[Dict]) -> int:
+    """Bulk-write LLM summaries, never overwriting another LLM summary that landed meanwhile."""
+    if not updates:
+        return 0
+    
+    table = Content.__table__
+    replaceable = or_(table.c.ai_summary.is_(None), table.c.ai_summary_backend == 'local')
+    # Key points first, while the guard still sees the row's current summary
+    ensure_bodies(db, [u['b_id'] for u in updates])
+    body = ContentBody.__table__
+    db.execute(
+        update(body).where(
+            body.c.content_id == bindparam('b_id'),
+            exists(select(table.c.id).where(table.c.id == bindparam('b_id'), replaceable))
+        ).values(ai_key_points=bindparam('b_key_points')),
+        [{'b_id': u['b_id'], 'b_key_points': u['b_key_points']} for u in updates]
+    )
+    db.execute(
+        update(table).where(table.c.id == bindparam('b_id'), replaceable).values(
+            ai_summary=bindparam('b_summary'),
+            ai_summary_backend='llm'
+        ),
+        [{'b_id': u['b_id'], 'b_summary': u['b_summary']} for u in updates]
+    )
+    db.commit()
+    return len(updates)
+
+
+def prepare(manifest: BatchManifest, chunk_size: int, limit: Optional[int] = None, include_local: bool = False):
+    db = SessionLocal()
+    prepared = 0
+    
+    needs_summary = Content.ai_summary == None
+    if include_local:
+        needs_summary = or_(needs_summary, Content.ai_summary_backend == 'local')
+    
+    try:
+        while limit is None or prepared < limit:
+            last_id = manifest.data['last_prepared_id']
+            batch_limit = chunk_size if limit is None else min(chunk_size, limit - prepared)
+            
+            rows = db.query(
+                Content.id,
+                Content.title,
+                Content.source_name,
+                Content.content_type,
+                ContentBody.reader_mode_content,
+                ContentBody.full_content
+            ).outerjoin(Content.body).filter(
+                Content.is_active == True,
+                needs_summary,
+                Content.id > last_id
+            ).order_by(Content.id).limit(batch_limit).yield_per(200)
+            
+            chunk = {'name': f"chunk-{len(manifest.chunks):05d}", 'status': 'prepared', 'requests': 0}
+            keys = {}
+            cached_updates = []
+            max_id = None
+            
+            with open(manifest.chunk_path(chunk, 'jsonl'), 'w') as requests_file:
+                for row in rows:
+                    max_id = row.id
+                    prepared += 1
+                    
+                    text = row.reader_mode_content or row.full_content
+                    if text and len(text.strip()) > 100:
+                        prepared_text = prepare_summary_input(text, row.content_type, row.title)
+                        body = build_summary_request(row.title, prepared_text, row.source_name)
+                        cache_key = SummaryCache.make_key(SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, prepared_text)
+                        mode = 'full'
+                    else:
+                        body = build_title_request(row.title, row.source_name)
+                        cache_key = title_cache_key(row.title, row.source_name)
+                        mode = 'title'
+                    
+                    cached = summary_cache.get(cache_key)
+                    if cached:
+                        cached_updates.append({'b_id': row.id, 'b_summary': cached[0], 'b_key_points': cached[1]})
+                        continue
+                    
+                    custom_id = f"content-{row.id}"
+                    keys[custom_id] = {'cache_key': cache_key, 'mode': mode}
+                    requests_file.write(json.dumps({
+                        'custom_id': custom_id,
+                        'method': 'POST',
+                        'url': CHAT_COMPLETIONS_ENDPOINT,
+                        'body': body
+                    }) + '\n')
+            
+            if max_id is None:
+                os.remove(manifest.chunk_path(chunk, 'jsonl'))
+                break
+            
+            with open(manifest.chunk_path(chunk, 'keys.json'), 'w') as f:
+                json.dump(keys, f)
+            
+            apply_summaries(db, cached_updates)
+            
+            chunk['requests'] = len(keys)
+            chunk['first_id'] = last_id + 1
+            chunk['last_id'] = max_id
+            chunk['cache_hits'] = len(cached_updates)
+            if not keys:
+                chunk['status'] = 'applied'
+            
+            manifest.chunks.append(chunk)
+            manifest.data['last_prepared_id'] = max_id
+            manifest.save()
+            logger.info(
+                f"Prepared {chunk['name']}: {chunk['requests']} requests, "
+                f"{chunk['cache_hits']} served from cache"
+            )
+    finally:
+        db.close()
+
+
+def find_submitted_batch(client, chunk: Dict):
+    """The batch an interrupted submit already created for this chunk's input file, if any."""
+    # Batches are listed newest first; anything created before the attempt started can't be ours
+    since = chunk['submit_started_at'] - 60
+    for batch in client.batches.list(limit=100):
+        if batch.created_at < since:
+            break
+        if batch.input_file_id == chunk['input_file_id']:
+            return batch
+    return None
+
+
+def submit(manifest: BatchManifest, client):
+    for chunk in manifest.chunks:
+        if chunk['status'] not in ('prepared', 'submitting'):
+            continue
+        
+        if not chunk.get('input_file_id'):
+            with open(manifest.chunk_path(chunk, 'jsonl'), 'rb') as f:
+                uploaded = client.files.create(file=f, purpose='batch')
+            chunk['input_file_id'] = uploaded.id
+            manifest.save()
+        
+        batch = find_submitted_batch(client, chunk) if chunk['status'] == 'submitting' else None
+        if batch is not None:
+            logger.info(f"Found batch {batch.id} from an interrupted submit of {chunk['name']}")
+        else:
+            # Saved before creating, so a crash before the batch id is recorded is reconciled on the next run
+            chunk['status'] = 'submitting'
+            chunk['submit_started_at'] = int(time.time())
+            manifest.save()
+            batch = client.batches.create(
+                input_file_id=chunk['input_file_id'],
+                endpoint=CHAT_COMPLETIONS_ENDPOINT,
+                completion_window='24h',
+                metadata={'chunk': chunk['name']}
+            )
+        chunk['batch_id'] = batch.id
+        chunk['status'] = 'submitted'
+        manifest.save()
+        logger.info(f"Submitted {chunk['name']} as batch {batch.id}")
+
+
+def poll(manifest: BatchManifest, client):
+    for chunk in manifest.chunks:
+        if chunk['status'] != 'submitted':
+            continue
+        
+        batch = client.batches.retrieve(chunk['batch_id'])
+        if batch.status not in ('completed', 'failed', 'expired', 'cancelled'):
+            logger.info(f"{chunk['name']}: batch {batch.id} is {batch.status}")
+            continue
+        
+        # Expired and cancelled batches still return output for the requests that finished
+        if batch.output_file_id:
+            output = client.files.content(batch.output_file_id).text
+            with open(manifest.chunk_path(chunk, 'output.jsonl'), 'w') as f:
+                f.write(output)
+            chunk['status'] = 'completed'
+        else:
+            chunk['status'] = 'failed'
+        
+        chunk['batch_status'] = batch.status
+        manifest.save()
+        logger.info(f"{chunk['name']}: batch {batch.id} finished with status {batch.status}")
+
+
+def apply(manifest: BatchManifest):
+    db = SessionLocal()
+    try:
+        for chunk in manifest.chunks:
+            if chunk['status'] != 'completed':
+                continue
+            
+            with open(manifest.chunk_path(chunk, 'keys.json')) as f:
+                keys = json.load(f)
+            
+            applied = 0
+            failed = 0
+            updates = []
+            with open(manifest.chunk_path(chunk, 'output.jsonl')) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    
+                    result = json.loads(line)
+                    custom_id = result.get('custom_id')
+                    response = result.get('response') or {}
+                    meta = keys.get(custom_id)
+                    
+                    try:
+                        if not meta or response.get('status_code') != 200:
+                            raise ValueError(f"status {response.get('status_code')}")
+                        
+                        raw = response['body']['choices'][0]['message']['content']
+                        summary, key_points = parse_summary_response(raw, title_only=meta['mode'] == 'title')
+                        if not summary:
+                            raise ValueError("empty summary")
+                    except (ValueError, KeyError, IndexError, TypeError) as e:
+                        logger.warning(f"Skipping result {custom_id}: {str(e)}")
+                        failed += 1
+                        continue
+                    
+                    summary_cache.set(meta['cache_key'], summary, key_points)
+                    updates.append({
+                        'b_id': int(custom_id.split('-', 1)[1]),
+                        'b_summary': summary,
+                        'b_key_points': key_points
+                    })
+                    
+                    if len(updates) >= APPLY_FLUSH_SIZE:
+                        applied += apply_summaries(db, updates)
+                        updates = []
+            
+            applied += apply_summaries(db, updates)
+            
+            chunk['status'] = 'applied'
+            chunk['applied'] = applied
+            chunk['failed'] = failed
+            manifest.save()
+            logger.info(f"Applied {chunk['name']}: {applied} summaries written, {failed} failed")
+    finally:
+        db.close()
+
+
+def default_local_responder(body: Dict) -> Dict:
+    """Deterministic summary built from the leading sentences of the prompt."""
+    user_message = body['messages'][-1]['content']
+    text = user_message.split('Content:\n', 1)[-1]
+    sentences = [s.strip() for s in re.split(r'(?<=[.!?])\s+', text) if len(s.strip()) > 20]
+    
+    if 'Content:\n' in user_message and sentences:
+        return {'summary': ' '.join(sentences[:2]), 'key_points': sentences[2:5]}
+    
+    title = user_message.split('\n', 1)[0].replace('Article Title: ', '')
+    return {'summary': f"An article about {title}.", 'key_points': []}
+
+
+class LocalBatchClient:
+    """Offline stand-in for the OpenAI files and batches endpoints.
+
+    Batches move to in_progress when created and complete on the first
+    retrieve, so callers exercise the same submit/poll/apply path.
+    """
+    
+    def __init__(self, root: str, responder: Callable[[Dict], Dict] = default_local_responder):
+        self.root = root
+        self.responder = responder
+        os.makedirs(root, exist_ok=True)
+        self.files = SimpleNamespace(create=self._create_file, content=self._file_content)
+        self.batches = SimpleNamespace(create=self._create_batch, retrieve=self._retrieve_batch, list=self._list_batches)
+    
+    def _path(self, object_id: str) -> str:
+        return os.path.join(self.root, object_id)
+    
+    def _write_json(self, object_id: str, data: Dict):
+        with open(self._path(object_id), 'w') as f:
+            json.dump(data, f)
+    
+    def _read_json(self, object_id: str) -> Dict:
+        with open(self._path(object_id)) as f:
+            return json.load(f)
+    
+    def _create_file(self, file, purpose: str):
+        file_id = f"file-{uuid.uuid4().hex}"
+        with open(self._path(file_id), 'wb') as f:
+            f.write(file.read())
+        return SimpleNamespace(id=file_id, purpose=purpose)
+    
+    def _file_content(self, file_id: str):
+        with open(self._path(file_id)) as f:
+            return SimpleNamespace(text=f.read())
+    
+    def _create_batch(self, input_file_id: str, endpoint: str, completion_window: str, metadata: Optional[Dict] = None):
+        batch = {
+            'id': f"batch-{uuid.uuid4().hex}",
+            'status': 'in_progress',
+            'input_file_id': input_file_id,
+            'endpoint': endpoint,
+            'output_file_id': None,
+            'created_at': int(time.time()),
+            'metadata': metadata
+        }
+        self._write_json(batch['id'], batch)
+        return SimpleNamespace(**batch)
+    
+    def _list_batches(self, limit: int = 20):
+        batches = [self._read_json(name) for name in os.listdir(self.root) if name.startswith('batch-')]
+        batches.sort(key=lambda b: b.get('created_at', 0), reverse=True)
+        return [SimpleNamespace(**{'created_at': 0, **batch}) for batch in batches]
+    
+    def _retrieve_batch(self, batch_id: str):
+        batch = self._read_json(batch_id)
+        if batch['status'] == 'in_progress':
+            output_id = f"file-{uuid.uuid4().hex}"
+            with open(self._path(batch['input_file_id'])) as src, open(self._path(output_id), 'w') as dst:
+                for line in src:
+                    request = json.loads(line)
+                    content = json.dumps(self.responder(request['body']))
+                    dst.write(json.dumps({
+                        'id': f"batch_req_{uuid.uuid4().hex}",
+                        'custom_id': request['custom_id'],
+                        'response': {
+                            'status_code': 200,
+                            'body': {'choices': [{'message': {'role': 'assistant', 'content': content}}]}
+                        },
+                        'error': None
+                    }) + '\n')
+            batch['status'] = 'completed'
+            batch['output_file_id'] = output_id
+            self._write_json(batch_id, batch)
+        return SimpleNamespace(**batch)
+
+
+def get_client(args):
+    if args.local:
+        return LocalBatchClient(os.path.join(args.batch_dir, 'local_endpoint'))
+    
+    from ai_summarizer import summarizer
+    if not summarizer.client:
+        logger.error("OPENAI_API_KEY not set - use --local for an offline run")
+        sys.exit(1)
+    return summarizer.client
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill AI summaries through the OpenAI Batch API")
+    parser.add_argument('step', choices=['prepare', 'submit', 'poll', 'apply', 'run'])
+    parser.add_argument('--batch-dir', default='batch_backfill')
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--limit', type=int, default=None, help="Maximum rows to prepare")
+    parser.add_argument('--from-start', action='store_true', help="Rescan from the first id to retry leftovers")
+    parser.add_argument('--include-local', action='store_true', help="Also upgrade local extractive summaries")
+    parser.add_argument('--poll-interval', type=int, default=60)
+    parser.add_argument('--local', action='store_true', help="Use the offline LocalBatchClient")
+    args = parser.parse_args()
+    
+    manifest = BatchManifest(args.batch_dir)
+    if args.from_start:
+        manifest.data['last_prepared_id'] = 0
+        manifest.save()
+    
+    if args.step in ('prepare', 'run'):
+        prepare(manifest, args.chunk_size, args.limit, args.include_local)
+    
+    if args.step in ('submit', 'poll', 'run'):
+        client = get_client(args)
+        if args.step in ('submit', 'run'):
+            submit(manifest, client)
+        if args.step == 'poll':
+            poll(manifest, client)
+    
+    if args.step == 'run':
+        while any(chunk['status'] == 'submitted' for chunk in manifest.chunks):
+            poll(manifest, client)
+            apply(manifest)
+            if any(chunk['status'] == 'submitted' for chunk in manifest.chunks):
+                time.sleep(args.poll_interval)
+    
+    if args.step in ('apply', 'run'):
+        apply(manifest)
+    
+    statuses = {}
+    for chunk in manifest.chunks:
+        statuses[chunk['status']] = statuses.get(chunk['status'], 0) + 1
+    logger.info(f"Chunks by status: {statuses}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Offline evaluation of summarizer input preparation.
+
+Compares the old 4000-character truncation with token-budgeted extractive
+compression over a fixture corpus. For each document it reports input
+tokens and how much of the reference summary survives in the input
+(ROUGE-1/ROUGE-2 recall). With --with-llm it also summarizes both inputs
+and scores the generated summaries against the reference.
+
+    python benchmarks/evaluate_compression.py
+    python benchmarks/evaluate_compression.py --json results.json
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import re
+from collections import Counter
+from typing import List, Dict
+
+from extractive import STOPWORDS, count_tokens, prepare_summary_input
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'summarizer_corpus.jsonl')
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9.\-']*[a-z0-9]|[a-z0-9]")
+
+
+def terms(text: str) -> List[str]:
+    return [w for w in _WORD.findall(text.lower()) if w not in STOPWORDS]
+
+
+def ngrams(words: List[str], n: int) -> Counter:
+    return Counter(tuple(words[i:i + n]) for i in range(len(words) - n + 1))
+
+
+def overlap(reference: str, candidate: str, n: int) -> Dict[str, float]:
+    ref = ngrams(terms(reference), n)
+    cand = ngrams(terms(candidate), n)
+    matched = sum((ref & cand).values())
+    recall = matched / max(sum(ref.values()), 1)
+    precision = matched / max(sum(cand.values()), 1)
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {'recall': recall, 'precision': precision, 'f1': f1}
+
+
+def baseline_input(text: str, max_content_length: int = 4000) -> str:
+    truncated = text[:max_content_length]
+    if len(text) > max_content_length:
+        truncated += "..."
+    return truncated
+
+
+def evaluate(corpus_path: str, with_llm: bool = False) -> Dict:
+    with open(corpus_path) as f:
+        docs = [json.loads(line) for line in f if line.strip()]
+    
+    if with_llm:
+        from ai_summarizer import summarizer, build_summary_request
+        if not summarizer.client:
+            raise SystemExit("OPENAI_API_KEY not set - cannot run --with-llm")
+    
+    rows = []
+    for doc in docs:
+        inputs = {
+            'truncate': baseline_input(doc['text']),
+            'budgeted': prepare_summary_input(doc['text'], doc['content_type'], doc['title']),
+        }
+        
+        row = {'id': doc['id'], 'content_type': doc['content_type'], 'source_tokens': count_tokens(doc['text'])}
+        for name, text in inputs.items():
+            row[f'{name}_tokens'] = count_tokens(text)
+            row[f'{name}_rouge1_recall'] = overlap(doc['reference_summary'], text, 1)['recall']
+            row[f'{name}_rouge2_recall'] = overlap(doc['reference_summary'], text, 2)['recall']
+            
+            if with_llm:
+                # Bypass the summary cache so both variants really hit the model
+                response = summarizer.client.chat.completions.create(
+                    **build_summary_request(doc['title'], text, doc['source_name'])
+                )
+                generated = json.loads(response.choices[0].message.content).get('summary', '')
+                row[f'{name}_summary_rouge1_f1'] = overlap(doc['reference_summary'], generated, 1)['f1']
+                row[f'{name}_summary_rouge2_f1'] = overlap(doc['reference_summary'], generated, 2)['f1']
+        
+        rows.append(row)
+    
+    totals = {}
+    for key in rows[0]:
+        if key in ('id', 'content_type'):
+            continue
+        values = [row[key] for row in rows]
+        totals[key] = sum(values) if key.endswith('tokens') else sum(values) / len(values)
+    
+    return {'corpus': corpus_path, 'documents': rows, 'totals': totals}
+
+
+def print_report(results: Dict):
+    header = f"{'document':<30} {'type':<9} {'source':>7} {'trunc':>7} {'budget':>7} {'R1 trunc':>9} {'R1 budget':>10} {'R2 trunc':>9} {'R2 budget':>10}"
+    print(header)
+    print('-' * len(header))
+    for row in results['documents'] + [dict(results['totals'], id='TOTAL / MEAN', content_type='')]:
+        print(
+            f"{row['id'][:30]:<30} {row['content_type']:<9} {row['source_tokens']:>7.0f} "
+            f"{row['truncate_tokens']:>7.0f} {row['budgeted_tokens']:>7.0f} "
+            f"{row['truncate_rouge1_recall']:>9.3f} {row['budgeted_rouge1_recall']:>10.3f} "
+            f"{row['truncate_rouge2_recall']:>9.3f} {row['budgeted_rouge2_recall']:>10.3f}"
+        )
+    
+    totals = results['totals']
+    saved = 1 - totals['budgeted_tokens'] / totals['truncate_tokens']
+    print(f"\nInput tokens saved vs truncation: {saved:.1%}")
+    if 'budgeted_summary_rouge1_f1' in totals:
+        print(
+            f"Summary ROUGE-1 F1: truncate {totals['truncate_summary_rouge1_f1']:.3f}, "
+            f"budgeted {totals['budgeted_summary_rouge1_f1']:.3f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate summarizer input compression")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    parser.add_argument('--with-llm', action='store_true', help="Also generate and score summaries (uses the OpenAI API)")
+    parser.add_argument('--json', help="Write the full results to this file")
+    args = parser.parse_args()
+    
+    results = evaluate(args.corpus, args.with_llm)
+    print_report(results)
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
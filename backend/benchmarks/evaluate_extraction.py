@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Offline throughput, latency and memory of the ingest extraction path.
+
+Replays a checked-in corpus of feeds and article pages (news, arXiv HTML,
+Dev.to, a personal blog) through ReaderModeExtractor, ImageExtractor,
+RSSFetcher / DevToFetcher parsing, LanguageFilter and URLNormalizer, with
+http_client swapped for a replay client so nothing touches the network.
+Each component runs in a fresh process and reports docs/s, p50/p95 latency
+per call and peak RSS.
+
+Outputs are compared against fixtures/extraction_snapshots.json, so a
+speedup that changes what gets extracted fails the run. Pass --compare with
+an earlier --json file to flag throughput, latency or memory regressions.
+
+    python benchmarks/evaluate_extraction.py
+    python benchmarks/evaluate_extraction.py --json after.json --compare before.json
+    python benchmarks/evaluate_extraction.py --update-snapshots   # after an intended output change
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import resource
+import statistics
+import subprocess
+import time
+from typing import List, Dict, Callable, Optional, Tuple
+
+import requests
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+DEFAULT_CORPUS = os.path.join(FIXTURES, 'extraction_corpus')
+DEFAULT_SNAPSHOTS = os.path.join(FIXTURES, 'extraction_snapshots.json')
+
+COMPONENTS = ['reader_mode', 'image_from_html', 'rss_parse', 'devto_parse', 'language_filter', 'url_normalize']
+
+# Appended to corpus URLs so normalization has tracking parameters to strip
+TRACKING_SUFFIXES = ['', '?utm_source=rss&utm_medium=feed', '?ref=hn', '?page=2&fbclid=abc123#comments', '/']
+
+
+class ReplayClient:
+    """Stands in for http_client.get, serving corpus files by normalized URL; anything else is a 404."""
+    
+    def __init__(self, pages: Dict[str, bytes]):
+        from content_fetcher import URLNormalizer
+        self._normalize = URLNormalizer.normalize
+        self.pages = {self._normalize(url): body for url, body in pages.items()}
+    
+    def get(self, url: str, timeout: float = 10, params: Optional[Dict] = None, **kwargs) -> requests.Response:
+        response = requests.Response()
+        response.url = url
+        response.encoding = 'utf-8'
+        body = self.pages.get(self._normalize(url))
+        response.status_code = 200 if body is not None else 404
+        response._content = body if body is not None else b''
+        # Lets iter_content serve the body to streaming callers (thumbnails.ThumbnailResolver)
+        response._content_consumed = True
+        return response
+
+
+def load_corpus(corpus_dir: str) -> Dict:
+    with open(os.path.join(corpus_dir, 'manifest.json')) as f:
+        manifest = json.load(f)
+    
+    def read(name: str) -> bytes:
+        with open(os.path.join(corpus_dir, name), 'rb') as f:
+            return f.read()
+    
+    pages = {page['url']: read(page['file']) for page in manifest['pages']}
+    for feed in manifest['feeds']:
+        pages[feed['url']] = read(feed['file'])
+    return {'manifest': manifest, 'pages': pages}
+
+
+def digest(text: Optional[str]) -> Optional[Dict]:
+    if text is None:
+        return None
+    return {'sha256': hashlib.sha256(text.encode('utf-8')).hexdigest()[:16], 'chars': len(text)}
+
+
+def build_calls(component: str, corpus: Dict) -> List[Tuple[str, Callable[[], object], int]]:
+    """(snapshot key, call, documents handled) for every call the component makes over the corpus."""
+    import content_fetcher
+    import http_client
+    from content_fetcher import ReaderModeExtractor, ImageExtractor, RSSFetcher, DevToFetcher, LanguageFilter, URLNormalizer
+    
+    manifest = corpus['manifest']
+    content_fetcher.http_client = http_client.http_client = ReplayClient(corpus['pages'])
+    
+    if component == 'reader_mode':
+        def extract(url: str):
+            html, text, image = ReaderModeExtractor.extract(url)
+            return {'html': digest(html), 'text': digest(text), 'image': image}
+        return [(url, lambda url=url: extract(url), 1) for url in manifest['articles']]
+    
+    if component == 'image_from_html':
+        return [
+            (page['url'], lambda body=corpus['pages'][page['url']]: ImageExtractor.extract_from_html(body.decode('utf-8')), 1)
+            for page in manifest['pages']
+        ]
+    
+    if component in ('rss_parse', 'devto_parse'):
+        kind = 'rss' if component == 'rss_parse' else 'devto_api'
+        
+        def parse(feed: Dict) -> List[Dict]:
+            items = RSSFetcher.fetch(feed['url'], feed['source_name']) if kind == 'rss' else DevToFetcher.fetch()
+            # published_date falls back to now() for undated entries, so it is left out
+            return [
+                {'title': item['title'], 'url': item['url'], 'thumbnail_url': item['thumbnail_url'],
+                 'author': item['author'], 'tags': item['tags']}
+                for item in items
+            ]
+        return [
+            (feed['id'], lambda feed=feed: parse(feed), len(_feed_entries(corpus, feed['id'])))
+            for feed in manifest['feeds'] if feed['kind'] == kind
+        ]
+    
+    if component == 'language_filter':
+        calls = []
+        for feed in manifest['feeds']:
+            entries = _feed_entries(corpus, feed['id'])
+            calls.append((feed['id'], lambda entries=entries: LanguageFilter.filter_batch(entries), len(entries)))
+        return calls
+    
+    if component == 'url_normalize':
+        urls = [url.rstrip('/') + suffix for url in corpus['pages'] for suffix in TRACKING_SUFFIXES]
+        return [(url, lambda url=url: URLNormalizer.normalize(url), 1) for url in urls]
+    
+    raise ValueError(f"Unknown component {component}")
+
+
+def _feed_entries(corpus: Dict, feed_id: str) -> List[Tuple[str, str]]:
+    """(title, summary) pairs of a feed, as LanguageFilter sees them."""
+    import feedparser
+    
+    feed = next(f for f in corpus['manifest']['feeds'] if f['id'] == feed_id)
+    body = corpus['pages'][feed['url']]
+    if feed['kind'] == 'devto_api':
+        return [(a.get('title') or '', a.get('description') or '') for a in json.loads(body)]
+    parsed = feedparser.parse(body)
+    return [(e.get('title', ''), e.get('summary', '')) for e in parsed.entries]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_component(component: str, corpus_dir: str, repeat: int) -> Dict:
+    """Warm up once (recording outputs for the snapshot), then time repeat passes over the corpus."""
+    import logging
+    logging.disable(logging.CRITICAL)
+    
+    corpus = load_corpus(corpus_dir)
+    calls = build_calls(component, corpus)
+    outputs = {key: call() for key, call, _ in calls}
+    baseline_rss = peak_rss_mb()
+    
+    timings = []
+    docs = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for _, call, count in calls:
+            call_started = time.perf_counter()
+            call()
+            timings.append((time.perf_counter() - call_started) * 1000)
+            docs += count
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    
+    return {
+        'component': component,
+        'calls': len(timings),
+        'docs': docs,
+        'docs_per_second': docs / elapsed,
+        'mean_ms': statistics.mean(timings),
+        'p50_ms': timings[len(timings) // 2],
+        'p95_ms': timings[int(len(timings) * 0.95)],
+        'rss_after_warmup_mb': round(baseline_rss, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'outputs': json.loads(json.dumps(outputs, default=str)),
+    }
+
+
+def run_isolated(component: str, corpus_dir: str, repeat: int) -> Dict:
+    # A fresh process per component keeps peak RSS attributable to that component
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        return pool.apply(run_component, (component, corpus_dir, repeat))
+
+
+def check_snapshots(results: List[Dict], path: str) -> List[str]:
+    if not os.path.exists(path):
+        return [f"No snapshot file at {path}; run with --update-snapshots to create it"]
+    with open(path) as f:
+        snapshots = json.load(f)
+    
+    mismatches = []
+    for r in results:
+        expected = snapshots.get(r['component'], {})
+        for key in sorted(set(expected) | set(r['outputs'])):
+            if expected.get(key) != r['outputs'].get(key):
+                mismatches.append(f"{r['component']}: {key}")
+    return mismatches
+
+
+def write_snapshots(results: List[Dict], path: str):
+    snapshots = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            snapshots = json.load(f)
+    for r in results:
+        snapshots[r['component']] = r['outputs']
+    with open(path, 'w') as f:
+        json.dump(snapshots, f, indent=1, sort_keys=True, ensure_ascii=False)
+        f.write('\n')
+
+
+def compare(results: List[Dict], baseline_path: str, tolerance: float) -> List[str]:
+    with open(baseline_path) as f:
+        baseline = {r['component']: r for r in json.load(f)['results']}
+    
+    regressions = []
+    print(f"\nAgainst {baseline_path} (tolerance {tolerance:.0%}):")
+    print(f"{'component':<16} {'docs/s':>9} {'p95 ms':>9} {'peak MB':>9}")
+    for r in results:
+        old = baseline.get(r['component'])
+        if old is None:
+            continue
+        changes = {
+            'docs/s': r['docs_per_second'] / old['docs_per_second'] - 1,
+            'p95': r['p95_ms'] / old['p95_ms'] - 1 if old['p95_ms'] else 0.0,
+            'peak RSS': r['peak_rss_mb'] / old['peak_rss_mb'] - 1 if old['peak_rss_mb'] else 0.0,
+        }
+        print(f"{r['component']:<16} {changes['docs/s']:>+9.1%} {changes['p95']:>+9.1%} {changes['peak RSS']:>+9.1%}")
+        if changes['docs/s'] < -tolerance:
+            regressions.append(f"{r['component']}: docs/s down {-changes['docs/s']:.0%}")
+        for metric in ('p95', 'peak RSS'):
+            if changes[metric] > tolerance:
+                regressions.append(f"{r['component']}: {metric} up {changes[metric]:.0%}")
+    return regressions
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def print_report(report: Dict):
+    print(f"{report['corpus']} at {report['revision'] or 'unknown revision'}, {report['repeat']} passes\n")
+    header = f"{'component':<16} {'calls':>6} {'docs':>6} {'docs/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'peak MB':>8}"
+    print(header)
+    print('-' * len(header))
+    for r in report['results']:
+        print(f"{r['component']:<16} {r['calls']:>6} {r['docs']:>6} {r['docs_per_second']:>9.1f} "
+              f"{r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['peak_rss_mb']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extraction components on a recorded corpus")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    parser.add_argument('--snapshots', default=DEFAULT_SNAPSHOTS)
+    parser.add_argument('--component', action='append', choices=COMPONENTS, help="Run only these (repeatable)")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed passes over the corpus per component")
+    parser.add_argument('--json', help="Write the results to this file")
+    parser.add_argument('--compare', help="Results file from an earlier run to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed relative slowdown before --compare fails")
+    parser.add_argument('--update-snapshots', action='store_true', help="Accept the current outputs as the expected ones")
+    args = parser.parse_args()
+    
+    results = [run_isolated(component, args.corpus, args.repeat) for component in (args.component or COMPONENTS)]
+    report = {
+        'corpus': os.path.relpath(args.corpus, os.path.dirname(FIXTURES)),
+        'revision': git_revision(),
+        'repeat': args.repeat,
+        'results': [{k: v for k, v in r.items() if k != 'outputs'} for r in results],
+    }
+    print_report(report)
+    
+    failures = []
+    if args.update_snapshots:
+        write_snapshots(results, args.snapshots)
+        print(f"\nSnapshots written to {args.snapshots}")
+    else:
+        mismatches = check_snapshots(results, args.snapshots)
+        if mismatches:
+            print(f"\nOutputs differ from {args.snapshots}:")
+            for m in mismatches:
+                print(f"  {m}")
+        failures += mismatches
+    
+    if args.compare:
+        regressions = compare(report['results'], args.compare, args.tolerance)
+        for r in regressions:
+            print(f"  REGRESSION {r}")
+        failures += regressions
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Accuracy and throughput of language_id against langdetect.
+
+Runs both classifiers over a labelled fixture set of tech headlines and
+reports exact-language accuracy, English/non-English accuracy (the decision
+LanguageFilter actually makes), texts per second, and whether repeated runs
+agree. langdetect is measured with and without a fixed seed.
+
+    python benchmarks/evaluate_language_id.py
+    python benchmarks/evaluate_language_id.py --repeat 50 --json results.json
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import time
+from typing import List, Dict, Callable
+
+from langdetect import DetectorFactory, detect, LangDetectException
+
+from language_id import get_model, detect_batch
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'language_corpus.jsonl')
+
+
+def langdetect_batch(texts: List[str]) -> List[str]:
+    results = []
+    for text in texts:
+        try:
+            results.append(detect(text))
+        except LangDetectException:
+            results.append(None)
+    return results
+
+
+def measure(name: str, classify: Callable[[List[str]], List[str]], docs: List[Dict], repeat: int) -> Dict:
+    texts = [doc['text'] for doc in docs]
+    
+    runs = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        runs.append(classify(texts))
+    elapsed = time.perf_counter() - started
+    
+    predictions = runs[0]
+    labels = [doc['language'] for doc in docs]
+    correct = sum(p == l for p, l in zip(predictions, labels))
+    english_correct = sum((p == 'en') == (l == 'en') for p, l in zip(predictions, labels))
+    
+    return {
+        'classifier': name,
+        'accuracy': correct / len(docs),
+        'english_accuracy': english_correct / len(docs),
+        'texts_per_second': len(docs) * repeat / elapsed,
+        'deterministic': all(run == predictions for run in runs),
+        'errors': [
+            {'id': doc['id'], 'expected': doc['language'], 'predicted': p}
+            for doc, p in zip(docs, predictions) if p != doc['language']
+        ],
+    }
+
+
+def evaluate(corpus_path: str, repeat: int) -> Dict:
+    with open(corpus_path, encoding='utf-8') as f:
+        docs = [json.loads(line) for line in f if line.strip()]
+    
+    started = time.perf_counter()
+    get_model()
+    load_seconds = time.perf_counter() - started
+    
+    results = [measure('language_id', detect_batch, docs, repeat)]
+    results.append(measure('langdetect (unseeded)', langdetect_batch, docs, repeat))
+    DetectorFactory.seed = 0
+    results.append(measure('langdetect (seed=0)', langdetect_batch, docs, repeat))
+    
+    return {'corpus': corpus_path, 'documents': len(docs), 'repeat': repeat,
+            'language_id_load_seconds': load_seconds, 'results': results}
+
+
+def print_report(report: Dict):
+    print(f"{report['documents']} documents x {report['repeat']} runs; "
+          f"language_id profile load {report['language_id_load_seconds']:.2f}s\n")
+    header = f"{'classifier':<24} {'accuracy':>9} {'en/non-en':>10} {'texts/s':>10} {'deterministic':>14}"
+    print(header)
+    print('-' * len(header))
+    for r in report['results']:
+        print(f"{r['classifier']:<24} {r['accuracy']:>9.3f} {r['english_accuracy']:>10.3f} "
+              f"{r['texts_per_second']:>10.0f} {str(r['deterministic']):>14}")
+    
+    for r in report['results']:
+        if r['errors']:
+            print(f"\n{r['classifier']} misclassified:")
+            for e in r['errors']:
+                print(f"  {e['id']:<10} expected {e['expected']:<6} got {e['predicted']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark language identification")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    parser.add_argument('--repeat', type=int, default=20, help="Passes over the corpus per classifier")
+    parser.add_argument('--json', help="Write the full results to this file")
+    args = parser.parse_args()
+    
+    report = evaluate(args.corpus, args.repeat)
+    print_report(report)
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Index size and lookup latency of the url_hash key against the full-URL index.
+
+Fills two scratch tables with the same synthetic article URLs, one keyed by a
+unique index on the URL string and one by a unique index on url_keys.url_hash,
+then reports each index's size and the latency of single-URL probes (hits and
+misses) and of batched IN lookups like the ones ingest runs.
+
+    python benchmarks/evaluate_url_index.py
+    python benchmarks/evaluate_url_index.py --rows 500000 --database-url postgresql://...
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from typing import List, Dict, Callable
+
+from sqlalchemy import create_engine, text, bindparam
+from sqlalchemy.engine import Engine
+
+from url_keys import url_hash, LOOKUP_BATCH_SIZE
+
+HOSTS = ['techcrunch.com', 'arxiv.org', 'dev.to', 'news.ycombinator.com', 'engineering.example.com', 'blog.example.org']
+WORDS = ['scaling', 'postgres', 'rust', 'python', 'latency', 'kernel', 'compilers', 'gpu', 'llm', 'caching', 'release', 'notes']
+
+
+def make_urls(count: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    urls = set()
+    while len(urls) < count:
+        slug = '-'.join(rng.choice(WORDS) for _ in range(rng.randint(3, 12)))
+        urls.add(f"https://{rng.choice(HOSTS)}/{rng.randint(2015, 2026)}/{rng.randint(1, 12):02d}/{slug}-{rng.getrandbits(40):x}")
+    return list(urls)
+
+
+def index_size(engine: Engine, index: str) -> int:
+    with engine.connect() as conn:
+        if engine.dialect.name == 'postgresql':
+            return conn.execute(text("SELECT pg_relation_size(:name)"), {'name': index}).scalar()
+        if engine.dialect.name == 'sqlite':
+            return conn.execute(text("SELECT SUM(pgsize) FROM dbstat WHERE name = :name"), {'name': index}).scalar()
+    raise ValueError(f"Index size is not implemented for {engine.dialect.name}")
+
+
+def build_tables(engine: Engine, urls: List[str]):
+    with engine.begin() as conn:
+        for table in ('bench_url_string', 'bench_url_hash'):
+            conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        conn.execute(text("CREATE TABLE bench_url_string (id INTEGER PRIMARY KEY, url VARCHAR(2048) NOT NULL)"))
+        conn.execute(text("CREATE TABLE bench_url_hash (id INTEGER PRIMARY KEY, url VARCHAR(2048) NOT NULL, url_hash BIGINT NOT NULL)"))
+        conn.execute(
+            text("INSERT INTO bench_url_string (id, url) VALUES (:id, :url)"),
+            [{'id': i, 'url': url} for i, url in enumerate(urls, 1)]
+        )
+        conn.execute(
+            text("INSERT INTO bench_url_hash (id, url, url_hash) VALUES (:id, :url, :url_hash)"),
+            [{'id': i, 'url': url, 'url_hash': url_hash(url)} for i, url in enumerate(urls, 1)]
+        )
+        conn.execute(text("CREATE UNIQUE INDEX bench_idx_url ON bench_url_string (url)"))
+        conn.execute(text("CREATE UNIQUE INDEX bench_idx_url_hash ON bench_url_hash (url_hash)"))
+        if engine.dialect.name == 'postgresql':
+            conn.execute(text("ANALYZE bench_url_string"))
+            conn.execute(text("ANALYZE bench_url_hash"))
+
+
+def drop_tables(engine: Engine):
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS bench_url_string"))
+        conn.execute(text("DROP TABLE IF EXISTS bench_url_hash"))
+
+
+def time_calls(call: Callable, args: List) -> Dict:
+    timings = []
+    for arg in args:
+        started = time.perf_counter()
+        call(arg)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'calls': len(timings),
+        'mean_ms': statistics.mean(timings),
+        'p50_ms': timings[len(timings) // 2],
+        'p95_ms': timings[int(len(timings) * 0.95)],
+    }
+
+
+def measure_lookups(engine: Engine, hits: List[str], misses: List[str], batches: List[List[str]]) -> Dict:
+    results = {}
+    with engine.connect() as conn:
+        by_url = text("SELECT id FROM bench_url_string WHERE url = :url")
+        by_hash = text("SELECT id, url FROM bench_url_hash WHERE url_hash = :url_hash")
+        batch_by_url = text("SELECT id, url FROM bench_url_string WHERE url IN :urls").bindparams(bindparam('urls', expanding=True))
+        batch_by_hash = text("SELECT id, url FROM bench_url_hash WHERE url_hash IN :hashes").bindparams(bindparam('hashes', expanding=True))
+        
+        def probe_hash(url: str):
+            # Same work as url_keys.find_existing: hash, probe, confirm the URL
+            return [row for row in conn.execute(by_hash, {'url_hash': url_hash(url)}) if row.url == url]
+        
+        def batch_hash(urls: List[str]):
+            wanted = set(urls)
+            return [row for row in conn.execute(batch_by_hash, {'hashes': [url_hash(u) for u in urls]}) if row.url in wanted]
+        
+        results['url_index'] = {
+            'hit': time_calls(lambda url: conn.execute(by_url, {'url': url}).all(), hits),
+            'miss': time_calls(lambda url: conn.execute(by_url, {'url': url}).all(), misses),
+            'batch': time_calls(lambda urls: conn.execute(batch_by_url, {'urls': urls}).all(), batches),
+        }
+        results['url_hash_index'] = {
+            'hit': time_calls(probe_hash, hits),
+            'miss': time_calls(probe_hash, misses),
+            'batch': time_calls(batch_hash, batches),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the url_hash index with the full-URL index")
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--probes', type=int, default=5000)
+    parser.add_argument('--batches', type=int, default=50)
+    parser.add_argument('--database-url', help="Database to benchmark in (default: a temporary SQLite file)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args()
+    
+    scratch = None
+    database_url = args.database_url
+    if not database_url:
+        scratch = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        scratch.close()
+        database_url = f"sqlite:///{scratch.name}"
+    engine = create_engine(database_url)
+    
+    urls = make_urls(args.rows + args.probes, args.seed)
+    stored, absent = urls[:args.rows], urls[args.rows:]
+    rng = random.Random(args.seed)
+    hits = rng.sample(stored, min(args.probes, len(stored)))
+    batches = [
+        rng.sample(stored, LOOKUP_BATCH_SIZE // 2) + rng.sample(absent, LOOKUP_BATCH_SIZE // 2)
+        for _ in range(args.batches)
+    ]
+    
+    try:
+        started = time.perf_counter()
+        build_tables(engine, stored)
+        print(f"Loaded {len(stored)} URLs (avg {statistics.mean(map(len, stored)):.0f} chars) in {time.perf_counter() - started:.1f}s")
+        
+        results = {
+            'dialect': engine.dialect.name,
+            'rows': len(stored),
+            'index_bytes': {
+                'url_index': index_size(engine, 'bench_idx_url'),
+                'url_hash_index': index_size(engine, 'bench_idx_url_hash'),
+            },
+            'lookups': measure_lookups(engine, hits, absent, batches),
+        }
+    finally:
+        drop_tables(engine)
+        engine.dispose()
+        if scratch:
+            os.unlink(scratch.name)
+    
+    sizes = results['index_bytes']
+    print(f"\nIndex size: url {sizes['url_index'] / 1e6:.1f} MB, "
+          f"url_hash {sizes['url_hash_index'] / 1e6:.1f} MB "
+          f"({sizes['url_index'] / sizes['url_hash_index']:.1f}x smaller)")
+    print(f"\n{'index':<16} {'lookup':<6} {'calls':>6} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for index, lookups in results['lookups'].items():
+        for kind, stats in lookups.items():
+            print(f"{index:<16} {kind:<6} {stats['calls']:>6} {stats['mean_ms']:>9.3f} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f}")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
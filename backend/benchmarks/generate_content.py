@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Bulk-load synthetic Content rows for API load testing.
+
+Rows look like ingested articles: titles and bodies drawn from a tech
+vocabulary (so /api/search terms have realistic selectivity), unique URLs
+with their url_hash, publish dates skewed towards recent days, lognormal
+body sizes, Zipf-skewed sources and weighted content types. A fraction is
+stored inactive as near-duplicates, and most rows carry an AI summary.
+
+Postgres is loaded with COPY; other databases fall back to batched inserts.
+The content table must be empty unless --append is given.
+
+    python benchmarks/generate_content.py --database-url postgresql://localhost/loadtest --rows 1000000
+    python benchmarks/generate_content.py --database-url sqlite:////tmp/load.db --rows 50000 --body-median-chars 1500
+    python benchmarks/generate_content.py ... --type-weights news=60,paper=30,post=10 --source-skew 1.4
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import csv
+import io
+import json
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from typing import List, Dict, Iterator, Tuple
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+
+DEFAULT_TYPE_WEIGHTS = 'news=40,article=22,post=15,paper=9,tutorial=7,research=4,essay=3'
+
+SOURCES = [
+    ('Hacker News', 'news.ycombinator.com'), ('TechCrunch', 'techcrunch.com'), ('Dev.to', 'dev.to'),
+    ('arXiv cs.LG', 'arxiv.org'), ('Ars Technica', 'arstechnica.com'), ('The Verge', 'www.theverge.com'),
+    ('Wired', 'www.wired.com'), ('Medium Engineering', 'medium.com'), ('Hashnode', 'hashnode.com'),
+    ('Papers with Code', 'paperswithcode.com'), ('Substack Tech', 'substack.com'), ('Reddit Programming', 'www.reddit.com'),
+    ('Google Research', 'research.google'), ('Netflix Tech Blog', 'netflixtechblog.com'), ('Cloudflare Blog', 'blog.cloudflare.com'),
+    ('GitHub Blog', 'github.blog'), ('AWS Blog', 'aws.amazon.com'), ('Rust Blog', 'blog.rust-lang.org'),
+    ('Python Insider', 'pythoninsider.blogspot.com'), ('Julia Evans', 'jvns.ca'),
+]
+
+# Common words appear in many titles, rare ones in few, like real search terms
+COMMON_WORDS = ('ai model data open source new release python rust database cloud security performance '
+                'api web linux llm kubernetes javascript startup funding gpu').split()
+RARE_WORDS = ('webassembly ebpf crdt raft paxos simd vectorization zig ocaml erlang elixir haskell clojure '
+              'kafka flink spark duckdb clickhouse sqlite postgres redis memcached nginx envoy istio wasm '
+              'quantization distillation diffusion transformer attention tokenizer embeddings retrieval '
+              'compiler allocator scheduler kernel firmware riscv arm cuda triton jax pytorch tensorflow').split()
+FILLER_WORDS = ('the a of to and in for with on is that by as from at this we our it are be which can an '
+                'their more than how why what when building scaling running shipping debugging testing').split()
+TAGS = ['ai', 'python', 'rust', 'javascript', 'webdev', 'devops', 'security', 'databases', 'cloud', 'ml',
+        'opensource', 'programming', 'tutorial', 'career', 'linux', 'go', 'kubernetes', 'performance']
+
+# Ids are assigned here so body rows can reference them; the sequence is moved past them after loading
+CONTENT_COLUMNS = ['id', 'url', 'url_hash', 'title', 'source_name', 'content_type', 'published_date',
+                   'fetched_date', 'thumbnail_url', 'author', 'tags', 'ai_summary', 'ai_summary_backend',
+                   'duplicate_of_id', 'is_active']
+BODY_COLUMNS = ['content_id', 'full_content', 'reader_mode_content', 'ai_key_points']
+JSON_COLUMNS = ('tags', 'ai_key_points')
+
+TEXT_POOL_CHARS = 4_000_000
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    weights = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def zipf_weights(count: int, exponent: float) -> List[float]:
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+class RowFactory:
+    """Generates Content rows; bodies are slices of one pre-built text pool so large loads stay fast."""
+    
+    def __init__(self, args, rng: random.Random):
+        from url_keys import url_hash
+        self.url_hash = url_hash
+        self.rng = rng
+        self.args = args
+        self.sources = SOURCES[:args.sources] + [
+            (f'Blog {n}', f'blog{n}.example.com') for n in range(max(args.sources - len(SOURCES), 0))
+        ]
+        self.source_weights = zipf_weights(len(self.sources), args.source_skew)
+        type_weights = parse_weights(args.type_weights)
+        self.types = list(type_weights)
+        self.type_weights = list(type_weights.values())
+        self.now = datetime.now()
+        self.pool = self._text_pool()
+    
+    def _text_pool(self) -> str:
+        words = COMMON_WORDS + RARE_WORDS + FILLER_WORDS * 6
+        sentences = []
+        size = 0
+        while size < TEXT_POOL_CHARS:
+            sentence = ' '.join(self.rng.choice(words) for _ in range(self.rng.randint(8, 26))).capitalize() + '. '
+            sentences.append(sentence)
+            size += len(sentence)
+        return ''.join(sentences)
+    
+    def body(self) -> str:
+        chars = int(self.rng.lognormvariate(math.log(self.args.body_median_chars), self.args.body_sigma))
+        chars = min(max(chars, 200), min(self.args.body_max_chars, len(self.pool) - 1))
+        start = self.rng.randrange(0, len(self.pool) - chars)
+        return self.pool[start:start + chars]
+    
+    def summary(self) -> str:
+        start = self.rng.randrange(0, len(self.pool) - 300)
+        return self.pool[start:start + 280].strip()
+    
+    def title(self) -> str:
+        words = [self.rng.choice(FILLER_WORDS) for _ in range(self.rng.randint(3, 7))]
+        words += [self.rng.choice(COMMON_WORDS) for _ in range(self.rng.randint(1, 3))]
+        if self.rng.random() < 0.4:
+            words.append(self.rng.choice(RARE_WORDS))
+        self.rng.shuffle(words)
+        return ' '.join(words).capitalize()[:500]
+    
+    def row(self, n: int) -> Dict:
+        source_name, host = self.rng.choices(self.sources, self.source_weights)[0]
+        content_type = self.rng.choices(self.types, self.type_weights)[0]
+        # Exponential age: most content is recent, like a feed that keeps growing
+        age = min(self.rng.expovariate(1 / (self.args.days / 4)), self.args.days)
+        published = self.now - timedelta(days=age, seconds=self.rng.randrange(86400))
+        title = self.title()
+        url = f"https://{host}/{published:%Y/%m}/{'-'.join(title.lower().split()[:8])}-{n:x}"
+        
+        reader = self.body()
+        paragraphs = [reader[i:i + 600] for i in range(0, len(reader), 600)]
+        full = ''.join(f'<p>{p}</p>' for p in paragraphs)
+        
+        summarized = self.rng.random() < self.args.summary_fraction
+        duplicate = self.rng.random() < self.args.inactive_fraction and n > 1
+        return {
+            'id': n,
+            'content_id': n,
+            'url': url,
+            'url_hash': self.url_hash(url),
+            'title': title,
+            'source_name': source_name,
+            'content_type': content_type,
+            'published_date': published.replace(microsecond=0),
+            'fetched_date': (published + timedelta(minutes=self.rng.randint(1, 180))).replace(microsecond=0),
+            'thumbnail_url': f"https://{host}/images/{n:x}.jpg" if self.rng.random() < 0.7 else None,
+            'author': f"Author {self.rng.randint(1, 5000)}" if self.rng.random() < 0.8 else None,
+            'tags': self.rng.sample(TAGS, self.rng.randint(0, 4)),
+            'full_content': full,
+            'reader_mode_content': reader,
+            'ai_summary': self.summary() if summarized else None,
+            'ai_key_points': [self.title() for _ in range(3)] if summarized else None,
+            'ai_summary_backend': 'llm' if summarized else None,
+            'duplicate_of_id': self.rng.randint(1, n - 1) if duplicate else None,
+            'is_active': not duplicate,
+        }
+    
+    def batches(self, start: int, rows: int, batch_size: int) -> Iterator[List[Dict]]:
+        for offset in range(0, rows, batch_size):
+            yield [self.row(start + offset + i) for i in range(min(batch_size, rows - offset))]
+
+
+def copy_batch(engine: Engine, batch: List[Dict]):
+    """COPY one batch into content and content_body through the DBAPI connection (psycopg2 or psycopg 3)."""
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        for table, columns in (('content', CONTENT_COLUMNS), ('content_body', BODY_COLUMNS)):
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in batch:
+                writer.writerow([
+                    json.dumps(row[c]) if c in JSON_COLUMNS and row[c] is not None
+                    else ('\\N' if row[c] is None else row[c])
+                    for c in columns
+                ])
+            buffer.seek(0)
+            statement = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+            if hasattr(cursor, 'copy_expert'):
+                cursor.copy_expert(statement, buffer)
+            else:
+                with cursor.copy(statement) as copy:
+                    copy.write(buffer.read())
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def insert_batch(engine: Engine, batch: List[Dict]):
+    from models import Content, ContentBody
+    with engine.begin() as conn:
+        conn.execute(Content.__table__.insert(), [{c: row[c] for c in CONTENT_COLUMNS} for row in batch])
+        conn.execute(ContentBody.__table__.insert(), [{c: row[c] for c in BODY_COLUMNS} for row in batch])
+
+
+def existing_rows(engine: Engine) -> Tuple[int, int]:
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM content")).one()
+    return row[0], row[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load synthetic content rows")
+    parser.add_argument('--database-url', required=True, help="Database to load; use a scratch database")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--append', action='store_true', help="Allow loading into a non-empty content table")
+    parser.add_argument('--days', type=int, default=730, help="Publish dates span this many days back")
+    parser.add_argument('--body-median-chars', type=int, default=4000, help="Median reader-mode body size")
+    parser.add_argument('--body-sigma', type=float, default=0.8, help="Lognormal sigma of body sizes")
+    parser.add_argument('--body-max-chars', type=int, default=200_000)
+    parser.add_argument('--sources', type=int, default=40, help="Distinct sources")
+    parser.add_argument('--source-skew', type=float, default=1.1, help="Zipf exponent over sources; 0 is uniform")
+    parser.add_argument('--type-weights', default=DEFAULT_TYPE_WEIGHTS)
+    parser.add_argument('--summary-fraction', type=float, default=0.85)
+    parser.add_argument('--inactive-fraction', type=float, default=0.03, help="Rows stored as inactive near-duplicates")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    os.environ['DATABASE_URL'] = args.database_url
+    from database import init_db
+    
+    init_db()
+    engine = create_engine(args.database_url)
+    count, max_id = existing_rows(engine)
+    if count and not args.append:
+        print(f"content already has {count} rows; pass --append to add to it")
+        sys.exit(1)
+    
+    load = copy_batch if engine.dialect.name == 'postgresql' else insert_batch
+    factory = RowFactory(args, random.Random(args.seed))
+    print(f"Loading {args.rows} rows into {engine.dialect.name} with {'COPY' if load is copy_batch else 'batched inserts'}")
+    
+    started = time.perf_counter()
+    loaded = 0
+    for batch in factory.batches(max_id + 1, args.rows, args.batch_size):
+        load(engine, batch)
+        loaded += len(batch)
+        elapsed = time.perf_counter() - started
+        print(f"\r  {loaded}/{args.rows} rows, {loaded / elapsed:.0f} rows/s", end='', flush=True)
+    print()
+    
+    with engine.begin() as conn:
+        if engine.dialect.name == 'postgresql':
+            conn.execute(text("SELECT setval(pg_get_serial_sequence('content', 'id'), (SELECT MAX(id) FROM content))"))
+            conn.execute(text("ANALYZE content"))
+            conn.execute(text("ANALYZE content_body"))
+        else:
+            conn.execute(text("ANALYZE"))
+    print(f"Loaded {loaded} rows in {time.perf_counter() - started:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
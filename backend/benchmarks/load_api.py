@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Async load driver for the public read API.
+
+Keeps --concurrency requests in flight against /api/feed, /api/search and
+/api/article/{id} in the proportions given by --mix, for --duration
+seconds after a --warmup period that is not measured. Reports throughput
+and p50/p90/p95/p99 latency per endpoint. Save a run with --json and pass
+it back with --compare to check a change against that baseline.
+
+Feed offsets favour the first pages like real readers, search terms mix
+common and rare words (see generate_content.py), and article ids are drawn
+from the id range the feed reports, so a few requests land on inactive or
+missing rows and return 404.
+
+    python benchmarks/load_api.py --base-url http://localhost:8000 --concurrency 32 --duration 60 --json baseline.json
+    python benchmarks/load_api.py --mix feed=1 --concurrency 64 --compare baseline.json
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from typing import List, Dict, Tuple
+
+import aiohttp
+
+from benchmarks.generate_content import COMMON_WORDS, RARE_WORDS, parse_weights
+
+DEFAULT_MIX = 'feed=50,article=35,search=15'
+FEED_PAGE_SIZE = 50
+
+
+class RequestPicker:
+    def __init__(self, mix: Dict[str, float], max_id: int, rng: random.Random):
+        self.endpoints = list(mix)
+        self.weights = list(mix.values())
+        self.max_id = max_id
+        self.rng = rng
+    
+    def pick(self) -> Tuple[str, str, Dict]:
+        endpoint = self.rng.choices(self.endpoints, self.weights)[0]
+        if endpoint == 'feed':
+            # Most readers stay on the first few pages; a few page deep
+            page = min(int(self.rng.expovariate(0.5)), 200)
+            return endpoint, '/api/feed', {'limit': FEED_PAGE_SIZE, 'offset': page * FEED_PAGE_SIZE}
+        if endpoint == 'search':
+            words = COMMON_WORDS if self.rng.random() < 0.6 else RARE_WORDS
+            return endpoint, '/api/search', {'q': self.rng.choice(words), 'limit': 50}
+        if endpoint == 'article':
+            return endpoint, f'/api/article/{self.rng.randint(1, self.max_id)}', {}
+        raise ValueError(f"Unknown endpoint {endpoint}")
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+async def discover_max_id(session: aiohttp.ClientSession) -> int:
+    async with session.get('/api/feed', params={'limit': 1}) as response:
+        response.raise_for_status()
+        total = (await response.json())['total']
+    if not total:
+        raise SystemExit("The feed is empty; load data first (benchmarks/generate_content.py)")
+    # Inactive rows are not counted in total but still take ids
+    return int(total * 1.05)
+
+
+async def worker(session: aiohttp.ClientSession, picker: RequestPicker, measure_from: float, stop_at: float,
+                 samples: Dict[str, List[float]], statuses: Dict[str, Dict[str, int]]):
+    while True:
+        now = time.perf_counter()
+        if now >= stop_at:
+            return
+        endpoint, path, params = picker.pick()
+        started = time.perf_counter()
+        try:
+            async with session.get(path, params=params) as response:
+                await response.read()
+                status = str(response.status)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            status = type(e).__name__
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if started >= measure_from:
+            samples[endpoint].append(elapsed_ms)
+            statuses[endpoint][status] += 1
+
+
+async def run_load(args) -> Dict:
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(base_url=args.base_url, connector=connector, timeout=timeout) as session:
+        max_id = args.max_id or await discover_max_id(session)
+        picker = RequestPicker(parse_weights(args.mix), max_id, random.Random(args.seed))
+        
+        samples = defaultdict(list)
+        statuses = defaultdict(lambda: defaultdict(int))
+        started = time.perf_counter()
+        measure_from = started + args.warmup
+        stop_at = measure_from + args.duration
+        await asyncio.gather(*(
+            worker(session, picker, measure_from, stop_at, samples, statuses) for _ in range(args.concurrency)
+        ))
+    
+    endpoints = {}
+    for endpoint, timings in sorted(samples.items()):
+        timings.sort()
+        codes = dict(statuses[endpoint])
+        errors = sum(n for code, n in codes.items() if not (code.startswith('2') or code == '404'))
+        endpoints[endpoint] = {
+            'requests': len(timings),
+            'rps': round(len(timings) / args.duration, 1),
+            'errors': errors,
+            'statuses': codes,
+            'mean_ms': round(sum(timings) / len(timings), 2),
+            'p50_ms': round(percentile(timings, 0.50), 2),
+            'p90_ms': round(percentile(timings, 0.90), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+            'max_ms': round(timings[-1], 2),
+        }
+    total = sum(e['requests'] for e in endpoints.values())
+    return {
+        'base_url': args.base_url,
+        'concurrency': args.concurrency,
+        'duration_seconds': args.duration,
+        'mix': args.mix,
+        'max_id': max_id,
+        'total_rps': round(total / args.duration, 1),
+        'endpoints': endpoints,
+    }
+
+
+def print_report(report: Dict):
+    print(f"{report['base_url']}: concurrency {report['concurrency']}, {report['duration_seconds']}s, "
+          f"{report['total_rps']} req/s total\n")
+    header = f"{'endpoint':<10} {'requests':>9} {'req/s':>8} {'errors':>7} {'p50 ms':>8} {'p90 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    print(header)
+    print('-' * len(header))
+    for endpoint, e in report['endpoints'].items():
+        print(f"{endpoint:<10} {e['requests']:>9} {e['rps']:>8.1f} {e['errors']:>7} {e['p50_ms']:>8.1f} "
+              f"{e['p90_ms']:>8.1f} {e['p95_ms']:>8.1f} {e['p99_ms']:>8.1f} {e['max_ms']:>8.1f}")
+    for endpoint, e in report['endpoints'].items():
+        unexpected = {code: n for code, n in e['statuses'].items() if code not in ('200', '404')}
+        if unexpected:
+            print(f"  {endpoint}: {unexpected}")
+
+
+def compare(report: Dict, baseline_path: str, tolerance: float) -> List[str]:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    
+    regressions = []
+    print(f"\nAgainst {baseline_path} (tolerance {tolerance:.0%}):")
+    print(f"{'endpoint':<10} {'req/s':>9} {'p95':>9} {'p99':>9}")
+    for endpoint, e in report['endpoints'].items():
+        old = baseline['endpoints'].get(endpoint)
+        if not old:
+            continue
+        changes = {
+            'req/s': e['rps'] / old['rps'] - 1 if old['rps'] else 0.0,
+            'p95': e['p95_ms'] / old['p95_ms'] - 1 if old['p95_ms'] else 0.0,
+            'p99': e['p99_ms'] / old['p99_ms'] - 1 if old['p99_ms'] else 0.0,
+        }
+        print(f"{endpoint:<10} {changes['req/s']:>+9.1%} {changes['p95']:>+9.1%} {changes['p99']:>+9.1%}")
+        if changes['req/s'] < -tolerance:
+            regressions.append(f"{endpoint}: req/s down {-changes['req/s']:.0%}")
+        if changes['p95'] > tolerance:
+            regressions.append(f"{endpoint}: p95 up {changes['p95']:.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the read API")
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--concurrency', type=int, default=32, help="Requests kept in flight")
+    parser.add_argument('--duration', type=float, default=30, help="Measured seconds")
+    parser.add_argument('--warmup', type=float, default=5, help="Unmeasured seconds before the measurement")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="Endpoint weights, e.g. feed=50,article=35,search=15")
+    parser.add_argument('--max-id', type=int, help="Highest article id to request (default: estimated from the feed total)")
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Write the report to this file")
+    parser.add_argument('--compare', help="Report from an earlier run to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.15)
+    args = parser.parse_args()
+    
+    report = asyncio.run(run_load(args))
+    print_report(report)
+    
+    regressions = compare(report, args.compare, args.tolerance) if args.compare else []
+    for r in regressions:
+        print(f"  REGRESSION {r}")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
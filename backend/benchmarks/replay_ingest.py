@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+End-to-end ingest load test against a local stand-in for the internet.
+
+Starts an aiohttp server that serves the extraction corpus (feeds, article
+pages), Hacker News and Dev.to API responses built from it, and a fake
+OpenAI chat completions endpoint, then runs run_content_fetch against a
+scratch database. Outbound requests are rewritten to the server at the
+requests.Session under http_client, so stored URLs, per-host limits and
+circuit breakers all still see the original hosts.
+
+Latency, errors and slow hosts can be injected to exercise timeouts, the
+circuit breaker and the summarizer fallback. --copies multiplies every feed
+with reworded copies of its articles for a bigger run (arXiv copies still
+resolve to the same /html/ page, so they come back as near-duplicates, as a
+re-listed paper would), and --runs repeats the fetch so later runs measure
+the dedupe path.
+
+    python benchmarks/replay_ingest.py
+    python benchmarks/replay_ingest.py --copies 10 --latency-ms 80 --error-rate 0.02 --slow-host techcrunch.com=3000
+    python benchmarks/replay_ingest.py --database-url postgresql://localhost/replay_scratch --runs 2 --json replay.json
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import glob
+import json
+import random
+import re
+import socket
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import feedparser
+import requests
+from aiohttp import web
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+DEFAULT_CORPUS = os.path.join(FIXTURES, 'extraction_corpus')
+
+HN_HOST = 'hacker-news.firebaseio.com'
+OPENAI_HOST = 'openai'
+OPENAI_PATH = '/openai/v1'
+
+# Marks the n-th reworded copy of an article; kept by URL normalization so copies are distinct items
+COPY_PARAM = 'replay'
+
+
+class Faults:
+    def __init__(self, latency_ms: float, jitter_ms: float, error_rate: float,
+                 slow_hosts: Dict[str, float], openai_latency_ms: float, seed: int):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.slow_hosts = slow_hosts
+        self.openai_latency_ms = openai_latency_ms
+        self._rng = random.Random(seed)
+    
+    def delay_seconds(self, host: str) -> float:
+        base = self.openai_latency_ms if host == OPENAI_HOST else self.latency_ms
+        return (base + self._rng.uniform(0, self.jitter_ms) + self.slow_hosts.get(host, 0)) / 1000
+    
+    def should_fail(self) -> bool:
+        return self._rng.random() < self.error_rate
+
+
+def page_key(host: str, path: str) -> str:
+    return f"{host.lower()}{path.rstrip('/')}"
+
+
+def with_copy(url: str, copy: int, ampersand: str = '&') -> str:
+    if not copy:
+        return url
+    return f"{url}{ampersand if '?' in url else '?'}{COPY_PARAM}={copy}"
+
+
+def reword(html: str, seed: str) -> str:
+    """Shuffle the words of every longer text node in the body, so a copy is not a near-duplicate of its original."""
+    rng = random.Random(seed)
+    head, marker, body = html.partition('<body')
+    
+    def shuffle(match):
+        words = match.group(1).split()
+        rng.shuffle(words)
+        return f">{' '.join(words)}<"
+    return head + marker + re.sub(r'>([^<]{40,})<', shuffle, body)
+
+
+class StandInServer:
+    """Serves the corpus for every host it stands in for; runs its own event loop in a thread."""
+    
+    def __init__(self, corpus_dir: str, faults: Faults, copies: int):
+        with open(os.path.join(corpus_dir, 'manifest.json')) as f:
+            self.manifest = json.load(f)
+        self.faults = faults
+        self.copies = copies
+        self.pages: Dict[str, bytes] = {}
+        for entry in self.manifest['pages'] + self.manifest['feeds']:
+            parsed = urlparse(entry['url'])
+            with open(os.path.join(corpus_dir, entry['file']), 'rb') as f:
+                self.pages[page_key(parsed.hostname, parsed.path)] = f.read()
+        # Feeds list more articles than the corpus has pages for; those are served a
+        # reworded page from the same host and path section
+        self.templates: Dict[Tuple[str, str], bytes] = {}
+        for page in self.manifest['pages']:
+            host, path = self._host_path(page['url'])
+            self.templates.setdefault((host, self._section(path)), self.pages[page_key(host, path)])
+            self.templates.setdefault((host, ''), self.pages[page_key(host, path)])
+        self.hn_items = self._hn_items()
+        self.stats = defaultdict(lambda: defaultdict(int))
+        self.port: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    # Content
+    
+    def _hn_items(self) -> List[Dict]:
+        """HN front page: every other article from the other feeds, so cross-source dedupe gets exercised."""
+        stories = []
+        for feed in self.manifest['feeds']:
+            parsed = urlparse(feed['url'])
+            body = self.pages[page_key(parsed.hostname, parsed.path)]
+            if feed['kind'] == 'devto_api':
+                stories += [(a['title'], a['url']) for a in json.loads(body)]
+            else:
+                stories += [(e.title, e.link) for e in feedparser.parse(body).entries]
+        stories = stories[::2]
+        return [
+            {'id': 40000000 + i, 'type': 'story', 'by': f'hn_user{i % 7}', 'time': 1773316800 - i * 600,
+             'title': title if not copy else f"{title} (part {copy})", 'url': with_copy(url, copy), 'score': 100 - i % 90}
+            for i, (copy, (title, url)) in enumerate((c, s) for c in range(self.copies) for s in stories)
+        ]
+    
+    def _feed(self, body: bytes, kind: str) -> bytes:
+        if self.copies <= 1:
+            return body
+        if kind == 'devto_api':
+            articles = json.loads(body)
+            expanded = [
+                dict(a, id=a['id'] + copy * 100000, url=with_copy(a['url'], copy),
+                     title=a['title'] if not copy else f"{a['title']} (part {copy})")
+                for copy in range(self.copies) for a in articles
+            ]
+            return json.dumps(expanded).encode()
+        
+        text = body.decode('utf-8')
+        tag = 'entry' if '<feed' in text[:500] else 'item'
+        entries = re.findall(rf'<{tag}>.*?</{tag}>', text, re.S)
+        if not entries:
+            return body
+        
+        def copy_of(entry: str, copy: int) -> str:
+            entry = re.sub(r'<title>(.*?)</title>', lambda m: f"<title>{m.group(1)} (part {copy})</title>", entry, count=1)
+            # Links are already XML-escaped
+            entry = re.sub(r'<link>(.*?)</link>', lambda m: f"<link>{with_copy(m.group(1), copy, '&amp;')}</link>", entry, count=1)
+            return re.sub(r'<link href="(.*?)"', lambda m: f'<link href="{with_copy(m.group(1), copy, "&amp;")}"', entry, count=1)
+        copies = ''.join(copy_of(entry, copy) for copy in range(1, self.copies) for entry in entries)
+        closing = text.rindex(entries[-1]) + len(entries[-1])
+        return (text[:closing] + copies + text[closing:]).encode()
+    
+    def _openai(self, payload: Dict) -> Dict:
+        prompt = payload['messages'][-1]['content']
+        batch = re.findall(r'### Article (\d+)\nArticle Title: (.*)', prompt)
+        if batch:
+            content = json.dumps({'results': [
+                {'id': int(article_id), 'summary': f"Replay summary of {title}.",
+                 'key_points': [f"Point {n} about {title}" for n in range(1, 4)]}
+                for article_id, title in batch
+            ]})
+        else:
+            title = re.search(r'Article Title: (.*)', prompt)
+            title = title.group(1) if title else 'the article'
+            content = json.dumps({'summary': f"Replay summary of {title}.",
+                                  'key_points': [f"Point {n} about {title}" for n in range(1, 4)]})
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        return {
+            'id': 'chatcmpl-replay', 'object': 'chat.completion', 'created': int(time.time()),
+            'model': payload.get('model', 'gpt-4o-mini'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                      'total_tokens': prompt_tokens + completion_tokens},
+        }
+    
+    def respond(self, host: str, path: str, query: Dict[str, str]) -> Tuple[int, bytes, str]:
+        if host == HN_HOST:
+            if path == '/v0/topstories.json':
+                return 200, json.dumps([item['id'] for item in self.hn_items]).encode(), 'application/json'
+            match = re.match(r'/v0/item/(\d+)\.json', path)
+            items = {item['id']: item for item in self.hn_items}
+            if match and int(match.group(1)) in items:
+                return 200, json.dumps(items[int(match.group(1))]).encode(), 'application/json'
+            return 200, b'null', 'application/json'
+        
+        key = page_key(host, path)
+        body = self.pages.get(key)
+        if body is None:
+            template = self.templates.get((host, self._section(path))) or self.templates.get((host, ''))
+            if template is None:
+                return 404, b'Not found', 'text/plain'
+            return 200, reword(template.decode('utf-8'), f"{key}:{query.get(COPY_PARAM, '')}").encode(), 'text/html; charset=utf-8'
+        feed = next((f for f in self.manifest['feeds'] if page_key(*self._host_path(f['url'])) == page_key(host, path)), None)
+        if feed:
+            content_type = 'application/json' if feed['kind'] == 'devto_api' else 'application/xml'
+            return 200, self._feed(body, feed['kind']), content_type
+        copy = query.get(COPY_PARAM)
+        if copy:
+            body = reword(body.decode('utf-8'), f"{host}{path}:{copy}").encode()
+        return 200, body, 'text/html; charset=utf-8'
+    
+    @staticmethod
+    def _section(path: str) -> str:
+        return path.strip('/').split('/')[0]
+    
+    @staticmethod
+    def _host_path(url: str) -> Tuple[str, str]:
+        parsed = urlparse(url)
+        return parsed.hostname, parsed.path
+    
+    # Server
+    
+    async def handle(self, request):
+        if request.path.startswith(OPENAI_PATH):
+            host, path = OPENAI_HOST, request.path[len(OPENAI_PATH):]
+        else:
+            host, _, rest = request.path.lstrip('/').partition('/')
+            path = '/' + rest
+        
+        stats = self.stats[host]
+        stats['requests'] += 1
+        await asyncio.sleep(self.faults.delay_seconds(host))
+        if self.faults.should_fail():
+            stats['injected_errors'] += 1
+            return web.Response(status=503, text='Injected failure')
+        
+        if host == OPENAI_HOST:
+            if path != '/chat/completions':
+                return web.Response(status=404)
+            return web.json_response(self._openai(await request.json()))
+        
+        status, body, content_type = self.respond(host, path, dict(request.query))
+        stats['bytes'] += len(body)
+        if status >= 400:
+            stats['not_found'] += 1
+        return web.Response(status=status, body=body, headers={'Content-Type': content_type})
+    
+    def start(self, port: int):
+        ready = threading.Event()
+        
+        def run():
+            loop = asyncio.new_event_loop()
+            self._loop = loop
+            app = web.Application(client_max_size=64 * 1024 * 1024)
+            app.router.add_route('*', '/{tail:.*}', self.handle)
+            runner = web.AppRunner(app, access_log=None)
+            loop.run_until_complete(runner.setup())
+            loop.run_until_complete(web.TCPSite(runner, '127.0.0.1', port).start())
+            self.port = port
+            ready.set()
+            loop.run_forever()
+            loop.run_until_complete(runner.cleanup())
+        
+        threading.Thread(target=run, name='replay-server', daemon=True).start()
+        if not ready.wait(10):
+            raise RuntimeError("Stand-in server did not start")
+    
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+class ReplaySession(requests.Session):
+    """Sends https://host/path to http://127.0.0.1:port/host/path."""
+    
+    def __init__(self, port: int):
+        super().__init__()
+        self.port = port
+    
+    def request(self, method, url, *args, **kwargs):
+        parsed = urlparse(url)
+        local = f"http://127.0.0.1:{self.port}/{parsed.hostname}{parsed.path or '/'}"
+        if parsed.query:
+            local += f"?{parsed.query}"
+        return super().request(method, local, *args, **kwargs)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def configure_environment(args, port: int, workdir: str) -> str:
+    """Point settings at the stand-in server and scratch database; must run before any backend import."""
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'replay.db')}"
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['OPENAI_API_KEY'] = 'replay'
+    os.environ['OPENAI_BASE_URL'] = f"http://127.0.0.1:{port}{OPENAI_PATH}"
+    os.environ['TRACING_EXPORTER'] = 'jsonl'
+    os.environ['TRACING_DIR'] = os.path.join(workdir, 'traces')
+    if args.host_rps:
+        os.environ['HTTP_REQUESTS_PER_SECOND_PER_HOST'] = str(args.host_rps)
+    return database_url
+
+
+def seed_sources(manifest: Dict):
+    from database import SessionLocal, init_db
+    from models import Source
+    
+    init_db()
+    sources = [{'name': 'Hacker News', 'url': 'https://news.ycombinator.com', 'source_type': 'API', 'feed_url': None}]
+    for feed in manifest['feeds']:
+        host = urlparse(feed['url']).hostname
+        if feed['kind'] == 'devto_api':
+            sources.append({'name': 'Dev.to', 'url': 'https://dev.to', 'source_type': 'API', 'feed_url': None})
+        else:
+            sources.append({'name': feed['source_name'], 'url': f"https://{host}", 'source_type': 'RSS', 'feed_url': feed['url']})
+    
+    db = SessionLocal()
+    try:
+        existing = {name for (name,) in db.query(Source.name).all()}
+        for fields in sources:
+            if fields['name'] not in existing:
+                db.add(Source(**fields))
+        db.commit()
+    finally:
+        db.close()
+
+
+def item_outcomes() -> Dict[str, float]:
+    from metrics import INGEST_ITEMS
+    
+    totals = defaultdict(float)
+    for metric in INGEST_ITEMS.collect():
+        for sample in metric.samples:
+            if sample.name.endswith('_total'):
+                totals[sample.labels['outcome']] += sample.value
+    return totals
+
+
+def run_once(triggers: int, trace_dir: str) -> Dict:
+    """One ingest run, optionally fired from several threads at once to exercise the single-flight lock."""
+    from content_fetcher import run_content_fetch
+    from tracing import summarize_trace
+    
+    before = item_outcomes()
+    traces_before = set(glob.glob(os.path.join(trace_dir, '*.jsonl')))
+    results: List[Dict] = [None] * triggers
+    
+    def trigger(i: int):
+        results[i] = run_content_fetch()
+    
+    started = time.perf_counter()
+    threads = [threading.Thread(target=trigger, args=(i,)) for i in range(triggers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    
+    after = item_outcomes()
+    outcomes = {outcome: int(after[outcome] - before.get(outcome, 0)) for outcome in after if after[outcome] - before.get(outcome, 0)}
+    traces = sorted(set(glob.glob(os.path.join(trace_dir, '*.jsonl'))) - traces_before)
+    trace = summarize_trace(traces[-1], top_n=5) if traces else None
+    
+    return {
+        'wall_seconds': round(wall, 2),
+        'triggers': [r['status'] for r in results],
+        'items_per_second': round(outcomes.get('fetched', 0) / wall, 2),
+        'stored_per_second': round(outcomes.get('stored', 0) / wall, 2),
+        'outcomes': outcomes,
+        'sources': [s for r in results for s in r.get('sources', [])],
+        'stages': trace['stages'] if trace else [],
+        'slowest_hosts': trace['hosts'] if trace else [],
+        'trace': traces[-1] if traces else None,
+    }
+
+
+def print_run(n: int, run: Dict):
+    print(f"\nRun {n}: {run['wall_seconds']:.1f}s wall, {run['items_per_second']:.1f} items/s fetched, "
+          f"{run['stored_per_second']:.1f} stored/s; triggers {', '.join(run['triggers'])}")
+    print("  outcomes: " + ', '.join(f"{k}={v}" for k, v in sorted(run['outcomes'].items())))
+    for source in run['sources']:
+        print(f"  {source['source']:<16} {source['status']:<8} fetched {source.get('fetched', '-'):>4}  stored {source.get('stored', '-'):>4}"
+              + (f"  {source['error'][:60]}" if source.get('error') else ''))
+    if run['stages']:
+        print(f"  {'stage':<24} {'seconds':>8} {'spans':>6} {'errors':>6}")
+        for stage in run['stages']:
+            print(f"  {stage['stage']:<24} {stage['duration_ms'] / 1000:>8.2f} {stage['spans']:>6} {stage['errors']:>6}")
+    if run['slowest_hosts']:
+        print("  slowest hosts: " + ', '.join(f"{h['host']} {h['duration_ms'] / 1000:.1f}s" for h in run['slowest_hosts']))
+
+
+def parse_slow_hosts(values: List[str]) -> Dict[str, float]:
+    slow = {}
+    for value in values or []:
+        host, _, ms = value.partition('=')
+        slow[host] = float(ms or 5000)
+    return slow
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the full ingest pipeline against a local stand-in server")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    parser.add_argument('--database-url', help="Scratch database (default: a new SQLite file); tables and sources are created in it")
+    parser.add_argument('--copies', type=int, default=1, help="Serve each feed with this many reworded copies of its articles")
+    parser.add_argument('--runs', type=int, default=1, help="Fetch this many times; runs after the first mostly hit dedupe")
+    parser.add_argument('--triggers', type=int, default=1, help="Concurrent run_content_fetch calls per run")
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--jitter-ms', type=float, default=10)
+    parser.add_argument('--openai-latency-ms', type=float, default=400)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of responses replaced by a 503")
+    parser.add_argument('--slow-host', action='append', metavar='HOST=MS', help="Extra latency for one host, e.g. dev.to=12000 (repeatable; 'openai' for the API)")
+    parser.add_argument('--host-rps', type=float, help="Override HTTP_REQUESTS_PER_SECOND_PER_HOST")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Write the report to this file")
+    args = parser.parse_args()
+    
+    faults = Faults(args.latency_ms, args.jitter_ms, args.error_rate, parse_slow_hosts(args.slow_host), args.openai_latency_ms, args.seed)
+    server = StandInServer(args.corpus, faults, max(args.copies, 1))
+    port = free_port()
+    server.start(port)
+    
+    workdir = tempfile.mkdtemp(prefix='replay-ingest-')
+    database_url = configure_environment(args, port, workdir)
+    
+    import logging
+    logging.basicConfig(level=logging.WARNING)
+    from http_client import http_client
+    
+    sessions = threading.local()
+    
+    def replay_session() -> requests.Session:
+        if not hasattr(sessions, 'session'):
+            sessions.session = ReplaySession(port)
+        return sessions.session
+    http_client._session = replay_session
+    
+    seed_sources(server.manifest)
+    print(f"Stand-in server on :{port}, database {database_url}, working files in {workdir}")
+    
+    report = {
+        'database': database_url.split('@')[-1],
+        'copies': args.copies,
+        'faults': {'latency_ms': args.latency_ms, 'jitter_ms': args.jitter_ms, 'error_rate': args.error_rate,
+                   'openai_latency_ms': args.openai_latency_ms, 'slow_hosts': faults.slow_hosts},
+        'runs': [],
+    }
+    try:
+        for n in range(1, args.runs + 1):
+            run = run_once(args.triggers, os.path.join(workdir, 'traces'))
+            report['runs'].append(run)
+            print_run(n, run)
+    finally:
+        server.stop()
+    
+    report['server'] = {host: dict(stats) for host, stats in server.stats.items()}
+    report['http_client'] = http_client.stats()['process']
+    print("\nServed: " + ', '.join(f"{host} {stats['requests']}" for host, stats in sorted(report['server'].items())))
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
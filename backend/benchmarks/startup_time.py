@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the API process.
+
+Each run spawns a fresh interpreter that imports main and serves it with
+uvicorn, the way a new replica boots. Reports, as p50/p95 over --runs:
+
+    import   time to import main
+    ready    spawn to the first 200 from /api/health (interpreter, imports, first query)
+    first    latency of the first request to each common endpoint
+
+It also lists the slowest direct imports of main (from -X importtime) and
+fails if a heavy ingest-only module (newspaper, readability, openai,
+langdetect, numpy, ...) is loaded once the common endpoints have been hit;
+those belong to the worker and must stay lazy in the API. Save a run with
+--json and pass it back with --compare to check a change against it.
+
+Without --database-url a scratch SQLite database is created and migrated
+first, since the API no longer creates tables. Set REDIS_URL to a reachable
+Redis, or to a closed port to measure the in-process fallbacks.
+
+    python benchmarks/startup_time.py --runs 20 --json startup.json
+    python benchmarks/startup_time.py --compare startup.json
+"""
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import argparse
+import json
+import platform
+import re
+import socket
+import subprocess
+import tempfile
+import time
+from typing import List, Dict, Tuple
+
+HEAVY_MODULES = [
+    'newspaper', 'readability', 'openai', 'langdetect', 'numpy', 'PIL',
+    'feedparser', 'bs4', 'lxml', 'tiktoken', 'celery', 'zstandard', 'alembic',
+]
+
+ENDPOINTS = [
+    ('health', '/api/health'),
+    ('feed', '/api/feed?limit=50'),
+    ('search', '/api/search?q=python&limit=50'),
+    ('article', '/api/article/1'),
+    ('sitemap', '/sitemap.xml'),
+    ('metrics', '/metrics'),
+]
+
+READY_TIMEOUT = 60
+
+# Runs in the spawned interpreter: uvicorn in the main thread, requests from a helper thread
+CHILD = """
+import json, sys, threading, time, urllib.error, urllib.request
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+import uvicorn
+
+port, endpoints, heavy = int(sys.argv[1]), json.loads(sys.argv[2]), json.loads(sys.argv[3])
+server = uvicorn.Server(uvicorn.Config(main.app, host='127.0.0.1', port=port, log_level='warning'))
+result = {'import_ms': (imported - started) * 1000, 'first_ms': {}}
+
+def get(path):
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}{path}', timeout=30) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def drive():
+    try:
+        while True:
+            try:
+                if get('/api/health') == 200:
+                    break
+            except OSError:
+                pass
+            time.sleep(0.005)
+        print(f'READY {time.time()}', flush=True)
+        for name, path in endpoints:
+            t = time.perf_counter()
+            status = get(path)
+            result['first_ms'][name] = (time.perf_counter() - t) * 1000
+            result.setdefault('statuses', {})[name] = status
+        result['heavy_modules'] = sorted(m for m in heavy if m in sys.modules)
+    finally:
+        server.should_exit = True
+
+threading.Thread(target=drive, daemon=True).start()
+server.run()
+print('RESULT ' + json.dumps(result), flush=True)
+"""
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def prepare_database(env: Dict, workdir: str) -> str:
+    database_url = f"sqlite:///{os.path.join(workdir, 'startup.db')}"
+    subprocess.run([sys.executable, 'migrate.py', 'upgrade'], cwd=BACKEND_DIR, check=True,
+                   env={**env, 'DATABASE_URL': database_url}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return database_url
+
+
+def run_once(env: Dict) -> Dict:
+    port = free_port()
+    # Wall clock, so the child's READY timestamp can be compared with it
+    started = time.time()
+    child = subprocess.Popen(
+        [sys.executable, '-c', CHILD, str(port), json.dumps(ENDPOINTS), json.dumps(HEAVY_MODULES)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+    )
+    try:
+        stdout, stderr = child.communicate(timeout=READY_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        child.kill()
+        stdout, stderr = child.communicate()
+    
+    result, ready_ms = None, None
+    for line in stdout.splitlines():
+        if line.startswith('READY '):
+            ready_ms = (float(line.split()[1]) - started) * 1000
+        elif line.startswith('RESULT '):
+            result = json.loads(line[len('RESULT '):])
+    if result is None or ready_ms is None:
+        raise RuntimeError(f"API process did not come up:\n{stderr[-2000:]}")
+    result['ready_ms'] = ready_ms
+    return result
+
+
+def top_imports(env: Dict, limit: int) -> List[Tuple[str, float]]:
+    """Direct imports of main by cumulative time, from -X importtime."""
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'],
+                            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True).stderr
+    children = []
+    for line in output.splitlines():
+        match = re.match(r'import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)', line)
+        if not match:
+            continue
+        cumulative, depth, name = int(match.group(2)), len(match.group(3)) // 2, match.group(4)
+        if depth == 0:
+            if name == 'main':
+                break
+            children = []
+        elif depth == 1:
+            children.append((name, cumulative / 1000))
+    return sorted(children, key=lambda c: -c[1])[:limit]
+
+
+def summarize(values: List[float]) -> Dict:
+    values = sorted(values)
+    return {
+        'p50_ms': round(percentile(values, 0.5), 1),
+        'p95_ms': round(percentile(values, 0.95), 1),
+        'max_ms': round(values[-1], 1),
+    }
+
+
+def measure(args) -> Dict:
+    env = dict(os.environ)
+    with tempfile.TemporaryDirectory() as workdir:
+        env['DATABASE_URL'] = args.database_url or prepare_database(env, workdir)
+        runs = []
+        for i in range(args.runs):
+            runs.append(run_once(env))
+            print(f"\r  {i + 1}/{args.runs} runs", end='', file=sys.stderr, flush=True)
+        print(file=sys.stderr)
+        imports = top_imports(env, args.top)
+    
+    return {
+        'python': platform.python_version(),
+        'runs': args.runs,
+        'import': summarize([r['import_ms'] for r in runs]),
+        'ready': summarize([r['ready_ms'] for r in runs]),
+        'first_request': {name: summarize([r['first_ms'][name] for r in runs]) for name, _ in ENDPOINTS},
+        'statuses': runs[-1]['statuses'],
+        'heavy_modules': sorted({m for r in runs for m in r['heavy_modules']}),
+        'top_imports': [{'module': name, 'ms': round(ms, 1)} for name, ms in imports],
+    }
+
+
+def print_report(report: Dict):
+    print(f"Python {report['python']}, {report['runs']} cold starts\n")
+    header = f"{'':<14} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}"
+    print(header)
+    print('-' * len(header))
+    rows = [('import main', report['import']), ('ready', report['ready'])]
+    rows += [(f"first {name}", s) for name, s in report['first_request'].items()]
+    for label, s in rows:
+        print(f"{label:<14} {s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['max_ms']:>8.1f}")
+    unexpected = {name: code for name, code in report['statuses'].items() if code not in (200, 404)}
+    if unexpected:
+        print(f"  unexpected statuses: {unexpected}")
+    
+    print("\nSlowest imports of main:")
+    for entry in report['top_imports']:
+        print(f"  {entry['module']:<24} {entry['ms']:>8.1f} ms")
+    print(f"\nHeavy modules loaded: {', '.join(report['heavy_modules']) or 'none'}")
+
+
+def compare(report: Dict, baseline_path: str, tolerance: float) -> List[str]:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    
+    regressions = []
+    print(f"\nAgainst {baseline_path} (tolerance {tolerance:.0%}):")
+    print(f"{'':<14} {'p50':>9} {'p95':>9}")
+    for key in ('import', 'ready'):
+        new, old = report[key], baseline[key]
+        changes = {
+            'p50': new['p50_ms'] / old['p50_ms'] - 1 if old['p50_ms'] else 0.0,
+            'p95': new['p95_ms'] / old['p95_ms'] - 1 if old['p95_ms'] else 0.0,
+        }
+        print(f"{key:<14} {changes['p50']:>+9.1%} {changes['p95']:>+9.1%}")
+        if changes['p50'] > tolerance:
+            regressions.append(f"{key}: p50 up {changes['p50']:.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API cold-start time")
+    parser.add_argument('--runs', type=int, default=10, help="Fresh processes to start")
+    parser.add_argument('--database-url', help="Already migrated database (default: a scratch SQLite one)")
+    parser.add_argument('--top', type=int, default=10, help="Slowest imports to list")
+    parser.add_argument('--json', help="Write the report to this file")
+    parser.add_argument('--compare', help="Report from an earlier run to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.15)
+    args = parser.parse_args()
+    
+    report = measure(args)
+    print_report(report)
+    
+    regressions = compare(report, args.compare, args.tolerance) if args.compare else []
+    regressions += [f"{m} loaded in the API process" for m in report['heavy_modules']]
+    for r in regressions:
+        print(f"  REGRESSION {r}")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,9 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_ready, worker_process_shutdown
+
+from config import get_settings
 
 REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
 
@@ -23,19 +26,93 @@ celery_app.conf.update(
     broker_connection_retry_on_startup=True,
 )
 
+# Each source has its own adaptive schedule (see scheduler.py); the beat only
+# looks for due sources and queues them
 celery_app.conf.beat_schedule = {
-    'fetch-content-hourly': {
-        'task': 'celery_app.fetch_content_task',
-        'schedule': crontab(minute=0),
+    'dispatch-due-sources': {
+        'task': 'celery_app.dispatch_due_sources_task',
+        'schedule': 60.0,
+    },
+    'maintain-content-storage': {
+        'task': 'celery_app.maintain_content_storage_task',
+        'schedule': crontab(hour=3, minute=30),
     },
 }
 
+# Read through settings like the summarizer does, so a policy set in .env also schedules this
+if get_settings().summarizer_policy == 'local_first':
+    celery_app.conf.beat_schedule['upgrade-local-summaries'] = {
+        'task': 'celery_app.upgrade_local_summaries_task',
+        'schedule': crontab(minute='*/15'),
+    }
+
+
+@worker_ready.connect
+def start_metrics_exporter(**kwargs):
+    # Set PROMETHEUS_MULTIPROC_DIR too so the exporter covers every pool process
+    port = os.environ.get('CELERY_METRICS_PORT')
+    if port:
+        from metrics import start_exporter
+        start_exporter(int(port))
+
+
+@worker_process_shutdown.connect
+def mark_metrics_process_dead(pid=None, **kwargs):
+    from metrics import mark_process_dead
+    mark_process_dead(pid or os.getpid())
+
 
 @celery_app.task(name='celery_app.fetch_content_task')
 def fetch_content_task():
     from content_fetcher import run_content_fetch
-    run_content_fetch()
-    return "Content fetch completed"
+    return run_content_fetch()
+
+
+@celery_app.task(name='celery_app.dispatch_due_sources_task')
+def dispatch_due_sources_task():
+    from scheduler import dispatch_due_sources
+    return dispatch_due_sources()
+
+
+@celery_app.task(name='celery_app.fetch_source_task')
+def fetch_source_task(source_id: int):
+    from content_fetcher import run_source_fetch
+    return run_source_fetch(source_id)
+
+
+@celery_app.task(name='celery_app.upgrade_local_summaries_task')
+def upgrade_local_summaries_task(limit: int = 50):
+    from ai_summarizer import upgrade_local_summaries
+    from locks import LeaseLock
+    with LeaseLock('summaries:upgrade_local') as lock:
+        if not lock.acquired:
+            return {"status": "skipped"}
+        return upgrade_local_summaries(limit)
+
+
+@celery_app.task(name='celery_app.maintain_content_storage_task')
+def maintain_content_storage_task():
+    """Create upcoming content partitions, then archive old bodies if ARCHIVE_AFTER_MONTHS is set."""
+    from archive import body_archive
+    from database import SessionLocal, engine
+    from locks import LeaseLock
+    from partitions import ensure_partitions
+    with LeaseLock('content:storage') as lock:
+        if not lock.acquired:
+            return {"status": "skipped"}
+        created = ensure_partitions(engine)
+        db = SessionLocal()
+        try:
+            archived = body_archive.run_policy(db)
+        finally:
+            db.close()
+        return {"status": "completed", "created_partitions": created, "archive": archived}
+
+
+@celery_app.task(name='celery_app.backfill_shard_task')
+def backfill_shard_task(run_id: int, shard: int):
+    from backfill import run_shard
+    return run_shard(run_id, shard)
 
 
 if __name__ == '__main__':
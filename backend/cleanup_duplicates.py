@@ -1,9 +1,13 @@
+import argparse
 from database import SessionLocal
 from models import Content
+from url_keys import url_hash, find_existing
+from backfill import BackfillTask, DELETE, register, start_run, execute_run, latest_unfinished_run, print_status
+from sqlalchemy.orm import Session
+from typing import List, Any
 from urllib.parse import urlparse, urlunparse, parse_qs, urlencode
 import logging
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -53,53 +57,84 @@ def normalize_url(url: str) -> str:
         return url
 
 
-def cleanup_duplicates():
-    db = SessionLocal()
-    try:
-        all_content = db.query(Content).all()
-        total = len(all_content)
+@register
+class DuplicateURLTask(BackfillTask):
+    """Normalize URLs and delete rows whose normalized URL already exists.
+    
+    Whether a normalized URL is taken is looked up through the url_hash
+    index rather than held in memory.
+    """
+    
+    name = 'dedupe_urls'
+    description = "Normalize URLs and delete duplicates of an existing normalized URL"
+    columns = (Content.url, Content.title, Content.source_name)
+    chunk_size = 1000
+    # Renames in different id ranges could race for the same unique URL
+    max_shards = 1
+    
+    def transform_batch(self, db: Session, rows: List) -> List[Any]:
+        changed = {}
+        for row in rows:
+            normalized = normalize_url(row.url)
+            if normalized != row.url:
+                changed[row.id] = normalized
         
-        logger.info(f"Checking {total} articles for duplicates...")
+        if not changed:
+            return [None] * len(rows)
         
-        url_map = {}
-        duplicates_to_remove = []
+        # Who already owns each target URL, in the database or earlier in this chunk
+        owners = find_existing(db, changed.values())
         
-        for content in all_content:
-            normalized = normalize_url(content.url)
+        results = []
+        for row in rows:
+            if row.id not in changed:
+                results.append(None)
+                continue
+            normalized = changed[row.id]
+            owner_id = owners.get(normalized)
             
-            if normalized in url_map:
-                existing_content = url_map[normalized]
+            if owner_id is not None and owner_id != row.id:
                 logger.info(
-                    f"Found duplicate: '{content.title[:60]}...'\n"
-                    f"  Keeping:  ID={existing_content.id}, Source={existing_content.source_name}\n"
-                    f"  Removing: ID={content.id}, Source={content.source_name}"
+                    f"Found duplicate: '{row.title[:60]}...'\n"
+                    f"  Keeping:  ID={owner_id}\n"
+                    f"  Removing: ID={row.id}, Source={row.source_name}"
                 )
-                duplicates_to_remove.append(content)
+                results.append(DELETE)
             else:
-                url_map[normalized] = content
-                if normalized != content.url:
-                    logger.info(f"Normalizing URL for ID={content.id}: {content.url[:80]}...")
-                    content.url = normalized
-        
-        logger.info(f"\nRemoving {len(duplicates_to_remove)} duplicate articles...")
-        
-        for duplicate in duplicates_to_remove:
-            db.delete(duplicate)
-        
-        db.commit()
-        
-        logger.info(f"\nCleanup completed!")
-        logger.info(f"Total articles checked: {total}")
-        logger.info(f"Duplicates removed: {len(duplicates_to_remove)}")
-        logger.info(f"Unique articles remaining: {len(url_map)}")
+                logger.info(f"Normalizing URL for ID={row.id}: {row.url[:80]}...")
+                results.append({'url': normalized, 'url_hash': url_hash(normalized)})
+                owners[normalized] = row.id
         
-    except Exception as e:
-        logger.error(f"Cleanup failed: {str(e)}")
-        db.rollback()
+        return results
+
+
+def cleanup_duplicates(chunk_size: int = 1000, dry_run: bool = False, restart: bool = False):
+    """Run the dedupe_urls task, resuming the last unfinished run unless restart is set."""
+    db = SessionLocal()
+    try:
+        run_id = None if restart else latest_unfinished_run(db, DuplicateURLTask.name, dry_run)
     finally:
         db.close()
+    
+    if run_id:
+        logger.info(f"Resuming backfill run {run_id}")
+        status = execute_run(run_id)
+    else:
+        status = start_run(DuplicateURLTask.name, chunk_size=chunk_size, dry_run=dry_run)
+    
+    logger.info(f"\nCleanup {status['status']}{' (dry run)' if dry_run else ''}!")
+    logger.info(f"Total articles checked: {status['processed']}")
+    logger.info(f"Duplicates removed: {status['deleted']}")
+    logger.info(f"URLs normalized: {status['updated']}")
+    return status
 
 
 if __name__ == "__main__":
-    cleanup_duplicates()
-
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Remove duplicate articles by normalized URL")
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--dry-run', action='store_true', help="Report duplicates without changing anything")
+    parser.add_argument('--restart', action='store_true', help="Start a new run instead of resuming the last unfinished one")
+    args = parser.parse_args()
+    
+    print_status(cleanup_duplicates(args.chunk_size, args.dry_run, args.restart))
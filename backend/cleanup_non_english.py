@@ -1,56 +1,83 @@
+import argparse
 from database import SessionLocal
-from models import Content
-from langdetect import detect, LangDetectException
+from models import Content, ContentBody
+from language_id import detect_batch
+from backfill import BackfillTask, DELETE, register, start_run, execute_run, latest_unfinished_run, print_status
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import List, Any
 import logging
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def cleanup_non_english_content():
-    db = SessionLocal()
-    try:
-        all_content = db.query(Content).all()
-        total = len(all_content)
-        removed = 0
-        
-        logger.info(f"Checking {total} articles for language...")
-        
-        for content in all_content:
-            try:
-                reader_text = content.reader_mode_content[:200] if content.reader_mode_content else ""
-                combined_text = f"{content.title} {reader_text}"
-                
-                if len(combined_text.strip()) < 10:
-                    continue
-                
-                detected_lang = detect(combined_text)
-                
-                if detected_lang != 'en':
-                    logger.info(f"Removing non-English ({detected_lang}) content: {content.title[:60]}...")
-                    db.delete(content)
-                    removed += 1
-                    
-            except LangDetectException:
-                logger.warning(f"Could not detect language for: {content.title[:60]}...")
-                continue
-            except Exception as e:
-                logger.error(f"Error processing content {content.id}: {str(e)}")
+@register
+class NonEnglishTask(BackfillTask):
+    name = 'language'
+    description = "Delete non-English articles"
+    columns = (Content.title, func.substr(ContentBody.reader_mode_content, 1, 200).label('reader_text'))
+    chunk_size = 1000
+    
+    def transform_batch(self, db: Session, rows: List) -> List[Any]:
+        results = [None] * len(rows)
+        candidates = []
+        texts = []
+        for i, row in enumerate(rows):
+            combined_text = f"{row.title} {row.reader_text or ''}"
+            
+            if len(combined_text.strip()) < 10:
                 continue
+            
+            candidates.append(i)
+            texts.append(combined_text)
         
-        db.commit()
-        logger.info(f"\nCleanup completed!")
-        logger.info(f"Total articles checked: {total}")
-        logger.info(f"Non-English articles removed: {removed}")
-        logger.info(f"English articles remaining: {total - removed}")
+        for i, detected_lang in zip(candidates, detect_batch(texts)):
+            if detected_lang is None:
+                logger.warning(f"Could not detect language for: {rows[i].title[:60]}...")
+                continue
+            
+            if detected_lang != 'en':
+                logger.info(f"Removing non-English ({detected_lang}) content: {rows[i].title[:60]}...")
+                results[i] = DELETE
         
-    except Exception as e:
-        logger.error(f"Cleanup failed: {str(e)}")
-        db.rollback()
+        return results
+
+
+def cleanup_non_english_content(
+    chunk_size: int = 1000,
+    dry_run: bool = False,
+    restart: bool = False,
+    shards: int = 1,
+    workers: int = 1
+):
+    """Run the language task, resuming the last unfinished run unless restart is set."""
+    db = SessionLocal()
+    try:
+        run_id = None if restart else latest_unfinished_run(db, NonEnglishTask.name, dry_run)
     finally:
         db.close()
+    
+    if run_id:
+        logger.info(f"Resuming backfill run {run_id}")
+        status = execute_run(run_id, workers)
+    else:
+        status = start_run(NonEnglishTask.name, shards, workers, chunk_size=chunk_size, dry_run=dry_run)
+    
+    logger.info(f"\nCleanup {status['status']}{' (dry run)' if dry_run else ''}!")
+    logger.info(f"Total articles checked: {status['processed']}")
+    logger.info(f"Non-English articles removed: {status['deleted']}")
+    logger.info(f"English articles remaining: {status['processed'] - status['deleted']}")
+    return status
 
 
 if __name__ == "__main__":
-    cleanup_non_english_content()
-
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Remove non-English articles")
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--dry-run', action='store_true', help="Report matches without deleting anything")
+    parser.add_argument('--restart', action='store_true', help="Start a new run instead of resuming the last unfinished one")
+    parser.add_argument('--shards', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+    
+    print_status(cleanup_non_english_content(args.chunk_size, args.dry_run, args.restart, args.shards, args.workers))
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Cluster the existing corpus into near-duplicate groups using the SimHash LSH bands.
+
+1. Fingerprints any article without a simhash and writes its band rows; texts
+   too short to fingerprint are marked so later runs skip them.
+2. Walks content_simhash_bands in (band, value) order; only articles sharing a
+   band bucket are compared, so the pass is linear in the number of rows.
+3. Keeps one article per cluster (summarized first, then earliest published)
+   and flags the rest with duplicate_of_id and is_active = False.
+
+    python cluster_near_duplicates.py --dry-run
+    python cluster_near_duplicates.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import logging
+from typing import List, Dict, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import Content, ContentBody, SimhashBand
+from near_duplicates import (
+    simhash, to_signed, bands, band_rows, bucket_pairs, UnionFind, MAX_BUCKET_SIZE, NO_FINGERPRINT
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def fingerprint_missing(db: Session, batch_size: int, dry_run: bool) -> Dict[int, int]:
+    """Compute simhash and band rows for articles that have none yet.
+
+    A dry run writes nothing and returns the fingerprints of active articles
+    instead, for find_clusters to include.
+    """
+    computed = {}
+    fingerprinted = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(
+                Content.id, Content.is_active, Content.duplicate_of_id,
+                ContentBody.reader_mode_content, ContentBody.full_content
+            )
+            .outerjoin_from(Content, ContentBody)
+            .where(Content.id > last_id, Content.simhash.is_(None))
+            .order_by(Content.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        
+        for content_id, is_active, duplicate_of_id, reader_content, full_content in rows:
+            fingerprint = simhash(reader_content or full_content)
+            if fingerprint is not None:
+                fingerprinted += 1
+            if dry_run:
+                if fingerprint is not None and is_active and duplicate_of_id is None:
+                    computed[content_id] = fingerprint
+                continue
+            if fingerprint is None:
+                db.execute(update(Content).where(Content.id == content_id).values(simhash=NO_FINGERPRINT))
+                continue
+            db.execute(update(Content).where(Content.id == content_id).values(simhash=to_signed(fingerprint)))
+            db.add_all(band_rows(content_id, fingerprint))
+        
+        if not dry_run:
+            db.commit()
+        logger.info(f"Fingerprinted {fingerprinted} articles (through id {last_id})")
+    
+    return computed
+
+
+def find_clusters(db: Session, unstored: Optional[Dict[int, int]] = None) -> List[List[int]]:
+    """unstored: fingerprints by content id that have no band rows yet (a dry run's)."""
+    clusters = UnionFind()
+    bucket = []
+    bucket_key = None
+    compared = 0
+    
+    extra: Dict[tuple, List] = {}
+    for content_id, fingerprint in (unstored or {}).items():
+        for band, value in enumerate(bands(fingerprint)):
+            extra.setdefault((band, value), []).append((content_id, fingerprint))
+    
+    def flush():
+        nonlocal compared
+        bucket.extend(extra.pop(bucket_key, []))
+        if len(bucket) > MAX_BUCKET_SIZE:
+            logger.warning(f"Skipping oversized bucket {bucket_key} with {len(bucket)} articles")
+            return
+        compared += len(bucket) * (len(bucket) - 1) // 2
+        for a, b in bucket_pairs(bucket):
+            clusters.union(a, b)
+    
+    rows = db.execute(
+        select(SimhashBand.band, SimhashBand.value, Content.id, Content.simhash)
+        .join(Content, Content.id == SimhashBand.content_id)
+        .where(Content.is_active == True, Content.duplicate_of_id.is_(None))
+        .order_by(SimhashBand.band, SimhashBand.value)
+        .execution_options(yield_per=5000)
+    )
+    for band, value, content_id, stored in rows:
+        if (band, value) != bucket_key:
+            flush()
+            bucket = []
+            bucket_key = (band, value)
+        bucket.append((content_id, stored))
+    flush()
+    # Buckets only the unstored fingerprints fall into
+    for bucket_key in list(extra):
+        bucket = []
+        flush()
+    
+    logger.info(f"Compared {compared} candidate pairs")
+    return clusters.clusters()
+
+
+def pick_original(members: List[Content]) -> Content:
+    return min(
+        members,
+        key=lambda c: (c.ai_summary is None, c.published_date, c.id)
+    )
+
+
+def flag_duplicates(db: Session, clusters: List[List[int]], dry_run: bool) -> Dict[str, int]:
+    flagged = 0
+    for ids in clusters:
+        members = db.query(Content).filter(Content.id.in_(ids)).all()
+        original = pick_original(members)
+        
+        for content in members:
+            if content.id == original.id:
+                continue
+            logger.info(
+                f"Near-duplicate: '{content.title[:60]}'\n"
+                f"  Keeping:  ID={original.id}, Source={original.source_name}\n"
+                f"  Flagging: ID={content.id}, Source={content.source_name}"
+            )
+            flagged += 1
+            if not dry_run:
+                content.duplicate_of_id = original.id
+                content.is_active = False
+        
+        if not dry_run:
+            db.commit()
+    
+    return {'clusters': len(clusters), 'flagged': flagged}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cluster near-duplicate articles")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--dry-run', action='store_true', help="Report clusters without writing anything")
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    try:
+        unstored = fingerprint_missing(db, args.batch_size, args.dry_run)
+        clusters = find_clusters(db, unstored)
+        result = flag_duplicates(db, clusters, args.dry_run)
+        
+        logger.info(f"\nClustering completed{' (dry run)' if args.dry_run else ''}!")
+        logger.info(f"Clusters found: {result['clusters']}")
+        logger.info(f"Near-duplicates flagged: {result['flagged']}")
+    except Exception as e:
+        logger.error(f"Clustering failed: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,41 @@ class Settings(BaseSettings):
     api_host: str = "0.0.0.0"
     api_port: int = int(os.environ.get("PORT", 8000))
     log_level: str = "INFO"
+    summary_cache_enabled: bool = True
+    summary_cache_ttl_seconds: int = 30 * 24 * 3600
+    summary_cache_max_local_entries: int = 2048
+    summarizer_policy: str = "llm_fallback"
+    summarizer_llm_timeout_seconds: float = 20.0
+    summarizer_llm_max_retries: int = 1
+    scheduler_default_interval_seconds: int = 3600
+    scheduler_min_interval_seconds: int = 300
+    scheduler_max_interval_seconds: int = 24 * 3600
+    http_requests_per_second_per_host: float = 2.0
+    http_max_concurrency_per_host: int = 4
+    http_max_limiter_wait_seconds: float = 30.0
+    http_circuit_failure_threshold: int = 5
+    http_circuit_cooldown_seconds: int = 300
+    tracing_exporter: str = "none"
+    tracing_dir: str = "traces"
+    tracing_top_n: int = 10
+    backfill_executor: str = "local"
+    backfill_celery_shards: int = 4
+    backfill_lease_seconds: int = 900
+    thumbnail_cache_ttl_seconds: int = 7 * 24 * 3600
+    thumbnail_negative_ttl_seconds: int = 6 * 3600
+    thumbnail_cache_max_local_entries: int = 8192
+    thumbnail_probe_workers: int = 16
+    image_cache_dir: str = "image_cache"
+    image_cache_max_bytes: int = 2 * 1024 ** 3
+    image_proxy_workers: int = 2
+    image_source_max_bytes: int = 20 * 1024 ** 2
+    content_partitions_ahead: int = 3
+    recent_window_days: int = 90
+    list_count_cap: int = 1000
+    archive_after_months: int = 0
+    archive_dir: str = "archive"
+    archive_codec: str = "zstd"
+    archive_tablespace: str = ""
     
     @property
     def celery_broker_url(self) -> str:
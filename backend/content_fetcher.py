@@ -1,29 +1,30 @@
 import feedparser
-import requests
 from bs4 import BeautifulSoup
-from newspaper import Article
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import logging
 import re
 from sqlalchemy.orm import Session
-from langdetect import detect, LangDetectException
 from urllib.parse import urlparse, urlunparse, parse_qs, urlencode
 
 from models import Content, Source
+from summarizer_metrics import summarizer_metrics, format_run_summary
+from near_duplicates import simhash, to_signed, find_near_duplicate, match_pending, band_rows
+from language_id import is_english_batch
+from url_keys import url_hash, find_existing
+from scheduler import SourceScheduler
+from http_client import http_client, BROWSER_HEADERS
+from locks import LeaseLock, INGEST_LOCK, lock_holder, wait_for_release
+from metrics import count_items, stage_timer
+from tracing import span, current_span, url_attributes, trace_run, ARTICLE_SPAN
+from thumbnails import thumbnail_resolver
 from database import SessionLocal
 
 logger = logging.getLogger(__name__)
 
-BROWSER_HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-    'Accept-Language': 'en-US,en;q=0.5',
-    'Accept-Encoding': 'gzip, deflate, br',
-    'DNT': '1',
-    'Connection': 'keep-alive',
-    'Upgrade-Insecure-Requests': '1',
-}
+# Extracted items are summarized in groups of this size so short ones can
+# share a single LLM request
+SUMMARY_BATCH_SIZE = 8
 
 
 class ArxivURLConverter:
@@ -109,34 +110,26 @@ class URLNormalizer:
 class LanguageFilter:
     @staticmethod
     def is_english(text: str, min_length: int = 30) -> bool:
-        if not text or len(text.strip()) < 10:
-            return False
-        
-        try:
-            cleaned_text = text.strip()
-            
-            non_latin_chars = sum(1 for c in cleaned_text if ord(c) > 0x024F)
-            total_chars = len(cleaned_text.replace(' ', ''))
-            
-            if total_chars > 0 and (non_latin_chars / total_chars) > 0.3:
-                return False
-            
-            if len(cleaned_text) < min_length:
-                return True
-            
-            detected_lang = detect(cleaned_text)
-            return detected_lang == 'en'
-        except LangDetectException:
-            logger.debug(f"Could not detect language for text: {text[:50]}...")
-            return True
+        return is_english_batch([text], min_length)[0]
     
     @staticmethod
     def filter_content(title: str, summary: str = "") -> bool:
-        if summary and len(summary) > 50:
-            combined_text = f"{title} {summary}"
-            return LanguageFilter.is_english(combined_text, min_length=60)
-        else:
-            return LanguageFilter.is_english(title, min_length=50)
+        return LanguageFilter.filter_batch([(title, summary)])[0]
+    
+    @staticmethod
+    def filter_batch(entries: List[Tuple[str, str]]) -> List[bool]:
+        """filter_content for many (title, summary) pairs in one classifier call."""
+        with_summary = [i for i, (_, summary) in enumerate(entries) if summary and len(summary) > 50]
+        title_only = [i for i, (_, summary) in enumerate(entries) if not (summary and len(summary) > 50)]
+        
+        results = [False] * len(entries)
+        combined = is_english_batch([f"{entries[i][0]} {entries[i][1]}" for i in with_summary], min_length=60)
+        for i, keep in zip(with_summary, combined):
+            results[i] = keep
+        titles = is_english_batch([entries[i][0] for i in title_only], min_length=50)
+        for i, keep in zip(title_only, titles):
+            results[i] = keep
+        return results
 
 
 class ContentClassifier:
@@ -218,8 +211,8 @@ class ReaderModeExtractor:
     def extract(url: str) -> tuple[Optional[str], Optional[str], Optional[str]]:
         try:
             from readability import Document
-            import requests
             from bs4 import BeautifulSoup
+            from newspaper import Article
             
             # For ArXiv, use the HTML version for better content extraction
             fetch_url = url
@@ -228,13 +221,17 @@ class ReaderModeExtractor:
                 logger.info(f"ArXiv detected, using HTML version: {fetch_url}")
             
             # Fetch the HTML content with browser-like headers
-            response = requests.get(fetch_url, timeout=10, headers=BROWSER_HEADERS)
-            response.raise_for_status()
-            html_content = response.text
+            with span('extract.download', **url_attributes(fetch_url)) as download:
+                response = http_client.get(fetch_url, timeout=10, headers=BROWSER_HEADERS)
+                download.set('http.response.status_code', response.status_code)
+                download.set('http.response.body.size', len(response.content))
+                response.raise_for_status()
+                html_content = response.text
             
             # Use readability to extract the main content HTML
-            doc = Document(html_content)
-            clean_html = doc.summary()
+            with span('extract.readability'):
+                doc = Document(html_content)
+                clean_html = doc.summary()
             
             # Extract featured image if present
             original_soup = BeautifulSoup(html_content, 'html.parser')
@@ -392,11 +389,20 @@ class ReaderModeExtractor:
             # Convert relative URLs to absolute URLs
             clean_html = ReaderModeExtractor.fix_relative_urls(clean_html, fetch_url)
             
-            # Also use Newspaper3k for plain text extraction
-            article = Article(url)
-            article.download()
-            article.parse()
-            reader_content = article.text
+            # Also use Newspaper3k for plain text extraction, reusing the page
+            # already fetched rather than letting it download again
+            article_html = html_content
+            if fetch_url != url:
+                with span('extract.download', **url_attributes(url)) as download:
+                    response = http_client.get(url, timeout=10, headers=BROWSER_HEADERS)
+                    download.set('http.response.status_code', response.status_code)
+                    download.set('http.response.body.size', len(response.content))
+                    article_html = response.text
+            with span('extract.newspaper'):
+                article = Article(url)
+                article.download(input_html=article_html)
+                article.parse()
+                reader_content = article.text
             
             return clean_html, reader_content, featured_image_url
         except Exception as e:
@@ -464,274 +470,457 @@ class ImageExtractor:
     
     @staticmethod
     def extract_from_url(url: str) -> Optional[str]:
-        """Extract image URL by fetching and parsing the URL"""
-        try:
-            # For ArXiv, use the HTML version for better image extraction
-            fetch_url = url
-            if ArxivURLConverter.is_arxiv_url(url):
-                fetch_url = ArxivURLConverter.to_html_url(url)
-            
-            response = requests.get(fetch_url, timeout=5, headers=BROWSER_HEADERS)
-            return ImageExtractor.extract_from_html(response.text)
-        except Exception as e:
-            logger.debug(f"Could not extract image from {url}: {str(e)}")
-            return None
+        """Extract image URL from the start of the page (see thumbnails.ThumbnailResolver)"""
+        return thumbnail_resolver.resolve(url)
 
 
 class RSSFetcher:
     @staticmethod
     def fetch(feed_url: str, source_name: str) -> List[Dict]:
-        try:
-            feed = feedparser.parse(feed_url)
-            items = []
-            
-            for entry in feed.entries:
-                published_date = None
-                if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                    published_date = datetime(*entry.published_parsed[:6])
-                elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
-                    published_date = datetime(*entry.updated_parsed[:6])
-                else:
-                    published_date = datetime.now()
-                
-                thumbnail = None
-                if hasattr(entry, 'media_thumbnail') and entry.media_thumbnail:
-                    thumbnail = entry.media_thumbnail[0]['url']
-                elif hasattr(entry, 'media_content') and entry.media_content:
-                    thumbnail = entry.media_content[0]['url']
-                
-                if not thumbnail:
-                    content_html = ''
-                    if hasattr(entry, 'content') and entry.content:
-                        content_html = entry.content[0].get('value', '')
-                    elif hasattr(entry, 'summary'):
-                        content_html = entry.summary
-                    
-                    if content_html:
-                        thumbnail = ImageExtractor.extract_from_html(content_html)
-                
-                if not thumbnail:
-                    thumbnail = ImageExtractor.extract_from_url(entry.link)
-                
-                tags = []
-                if hasattr(entry, 'tags'):
-                    tags = [tag.term for tag in entry.tags]
-                
-                summary = entry.summary if hasattr(entry, 'summary') else ""
-                
-                if not LanguageFilter.filter_content(entry.title, summary):
-                    logger.info(f"Filtered non-English content: {entry.title[:60]}...")
-                    continue
-                
-                items.append({
-                    'title': entry.title,
-                    'url': entry.link,
-                    'source_name': source_name,
-                    'published_date': published_date,
-                    'thumbnail_url': thumbnail,
-                    'author': entry.author if hasattr(entry, 'author') else None,
-                    'tags': tags
-                })
+        with stage_timer('fetch'), span('fetch.feed', **url_attributes(feed_url)) as s:
+            response = http_client.get(feed_url, timeout=10, headers=BROWSER_HEADERS)
+            s.set('http.response.status_code', response.status_code)
+            s.set('http.response.body.size', len(response.content))
+            response.raise_for_status()
+        with stage_timer('parse'), span('parse.feed', source=source_name) as s:
+            feed = feedparser.parse(response.content)
+            s.set('feed.entries', len(feed.entries))
+            
+            # Language filtering runs first, in one batch, so non-English entries
+            # never cost a thumbnail fetch
+            summaries = [entry.summary if hasattr(entry, 'summary') else "" for entry in feed.entries]
+            english = LanguageFilter.filter_batch([
+                (entry.get('title', ''), summary) for entry, summary in zip(feed.entries, summaries)
+            ])
+        count_items(source_name, 'fetched', len(feed.entries))
+        count_items(source_name, 'filtered_non_english', english.count(False))
+        items = []
+        # Entries without an image in the feed are probed together after the loop
+        needs_probe = []
+        
+        for entry, summary, is_english in zip(feed.entries, summaries, english):
+            if not is_english:
+                logger.info(f"Filtered non-English content: {entry.get('title', '')[:60]}...")
+                continue
             
-            return items
-        except Exception as e:
-            logger.error(f"Failed to fetch RSS from {feed_url}: {str(e)}")
-            return []
+            published_date = None
+            if hasattr(entry, 'published_parsed') and entry.published_parsed:
+                published_date = datetime(*entry.published_parsed[:6])
+            elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
+                published_date = datetime(*entry.updated_parsed[:6])
+            else:
+                published_date = datetime.now()
+            
+            thumbnail = None
+            if hasattr(entry, 'media_thumbnail') and entry.media_thumbnail:
+                thumbnail = entry.media_thumbnail[0]['url']
+            elif hasattr(entry, 'media_content') and entry.media_content:
+                thumbnail = entry.media_content[0]['url']
+            
+            if not thumbnail:
+                content_html = ''
+                if hasattr(entry, 'content') and entry.content:
+                    content_html = entry.content[0].get('value', '')
+                elif hasattr(entry, 'summary'):
+                    content_html = entry.summary
+                
+                if content_html:
+                    thumbnail = ImageExtractor.extract_from_html(content_html)
+            
+            if not thumbnail:
+                needs_probe.append(len(items))
+            
+            tags = []
+            if hasattr(entry, 'tags'):
+                tags = [tag.term for tag in entry.tags]
+            
+            items.append({
+                'title': entry.title,
+                'url': entry.link,
+                'source_name': source_name,
+                'published_date': published_date,
+                'thumbnail_url': thumbnail,
+                'author': entry.author if hasattr(entry, 'author') else None,
+                'tags': tags
+            })
+        
+        if needs_probe:
+            thumbnails = thumbnail_resolver.resolve_many([items[i]['url'] for i in needs_probe])
+            for i in needs_probe:
+                items[i]['thumbnail_url'] = thumbnails.get(items[i]['url'])
+        
+        return items
 
 
 class HackerNewsFetcher:
     @staticmethod
     def fetch() -> List[Dict]:
-        try:
-            response = requests.get('https://hacker-news.firebaseio.com/v0/topstories.json', timeout=10)
+        top_stories_url = 'https://hacker-news.firebaseio.com/v0/topstories.json'
+        with stage_timer('fetch'), span('fetch.feed', **url_attributes(top_stories_url)) as s:
+            response = http_client.get(top_stories_url, timeout=10)
+            s.set('http.response.status_code', response.status_code)
+            s.set('http.response.body.size', len(response.content))
             response.raise_for_status()
             story_ids = response.json()[:50]
             
-            items = []
+            stories = []
             for story_id in story_ids:
                 try:
-                    story_response = requests.get(
-                        f'https://hacker-news.firebaseio.com/v0/item/{story_id}.json',
-                        timeout=5
-                    )
-                    story = story_response.json()
+                    story_url = f'https://hacker-news.firebaseio.com/v0/item/{story_id}.json'
+                    with span('fetch.item', **url_attributes(story_url)) as s:
+                        story_response = http_client.get(story_url, timeout=5)
+                        s.set('http.response.body.size', len(story_response.content))
+                        story = story_response.json()
                     
                     if story and story.get('url'):
-                        title = story.get('title')
-                        if not LanguageFilter.is_english(title):
-                            logger.info(f"Filtered non-English HN content: {title[:60]}...")
-                            continue
-                        
-                        items.append({
-                            'title': title,
-                            'url': story.get('url'),
-                            'source_name': 'Hacker News',
-                            'published_date': datetime.fromtimestamp(story.get('time')),
-                            'thumbnail_url': None,
-                            'author': story.get('by'),
-                            'tags': []
-                        })
+                        stories.append(story)
                 except Exception as e:
                     logger.error(f"Failed to fetch HN story {story_id}: {str(e)}")
+                    count_items('Hacker News', 'failed')
                     continue
+        
+        with stage_timer('parse'), span('parse.feed', source='Hacker News'):
+            english = is_english_batch([story.get('title') or '' for story in stories])
+        count_items('Hacker News', 'fetched', len(stories))
+        count_items('Hacker News', 'filtered_non_english', english.count(False))
+        
+        items = []
+        for story, is_english in zip(stories, english):
+            title = story.get('title')
+            if not is_english:
+                logger.info(f"Filtered non-English HN content: {(title or '')[:60]}...")
+                continue
             
-            return items
-        except Exception as e:
-            logger.error(f"Failed to fetch Hacker News: {str(e)}")
-            return []
+            try:
+                items.append({
+                    'title': title,
+                    'url': story.get('url'),
+                    'source_name': 'Hacker News',
+                    'published_date': datetime.fromtimestamp(story.get('time')),
+                    'thumbnail_url': None,
+                    'author': story.get('by'),
+                    'tags': []
+                })
+            except Exception as e:
+                logger.error(f"Failed to parse HN story {story.get('id')}: {str(e)}")
+                continue
+        
+        return items
 
 
 class DevToFetcher:
     @staticmethod
     def fetch() -> List[Dict]:
-        try:
-            response = requests.get(
+        with stage_timer('fetch'), span('fetch.feed', **url_attributes('https://dev.to/api/articles')) as s:
+            response = http_client.get(
                 'https://dev.to/api/articles',
                 params={'per_page': 50},
                 timeout=10
             )
+            s.set('http.response.status_code', response.status_code)
+            s.set('http.response.body.size', len(response.content))
             response.raise_for_status()
+        with stage_timer('parse'), span('parse.feed', source='Dev.to') as s:
             articles = response.json()
+            s.set('feed.entries', len(articles))
             
-            items = []
-            for article in articles:
-                title = article.get('title')
-                description = article.get('description', '')
-                
-                if not LanguageFilter.filter_content(title, description):
-                    logger.info(f"Filtered non-English Dev.to content: {title[:60]}...")
-                    continue
-                
-                items.append({
-                    'title': title,
-                    'url': article.get('url'),
-                    'source_name': 'Dev.to',
-                    'published_date': datetime.fromisoformat(
-                        article.get('published_at').replace('Z', '+00:00')
-                    ),
-                    'thumbnail_url': article.get('cover_image'),
-                    'author': article.get('user', {}).get('name'),
-                    'tags': article.get('tag_list', [])
-                })
+            english = LanguageFilter.filter_batch([
+                (article.get('title') or '', article.get('description') or '') for article in articles
+            ])
+        count_items('Dev.to', 'fetched', len(articles))
+        count_items('Dev.to', 'filtered_non_english', english.count(False))
+        
+        items = []
+        for article, is_english in zip(articles, english):
+            title = article.get('title')
             
-            return items
-        except Exception as e:
-            logger.error(f"Failed to fetch Dev.to: {str(e)}")
-            return []
+            if not is_english:
+                logger.info(f"Filtered non-English Dev.to content: {title[:60]}...")
+                continue
+            
+            items.append({
+                'title': title,
+                'url': article.get('url'),
+                'source_name': 'Dev.to',
+                'published_date': datetime.fromisoformat(
+                    article.get('published_at').replace('Z', '+00:00')
+                ),
+                'thumbnail_url': article.get('cover_image'),
+                'author': article.get('user', {}).get('name'),
+                'tags': article.get('tag_list', [])
+            })
+        
+        return items
 
 
 class ContentAggregator:
     def __init__(self, db: Session):
         self.db = db
     
-    def fetch_all_sources(self):
+    def fetch_all_sources(self) -> List[Dict]:
+        """Fetch every active source now, regardless of its schedule."""
         sources = self.db.query(Source).filter(Source.is_active == True).all()
+        return [self.fetch_source(source) for source in sources]
+    
+    @staticmethod
+    def fetch_items(source: Source) -> List[Dict]:
+        """Network and HTTP errors propagate, so the scheduler backs the source off; [] means nothing was listed."""
+        if source.source_type == 'RSS' and source.feed_url:
+            return RSSFetcher.fetch(source.feed_url, source.name)
+        elif source.source_type == 'API':
+            if 'hacker' in source.name.lower():
+                return HackerNewsFetcher.fetch()
+            elif 'dev.to' in source.name.lower():
+                return DevToFetcher.fetch()
+        return []
+    
+    def fetch_source(self, source: Source) -> Dict:
+        """Fetch and store one source, then record the outcome on its schedule.
         
-        all_items = []
-        for source in sources:
-            logger.info(f"Fetching from {source.name}")
-            
-            try:
-                if source.source_type == 'RSS' and source.feed_url:
-                    items = RSSFetcher.fetch(source.feed_url, source.name)
-                    all_items.extend(items)
-                elif source.source_type == 'API':
-                    if 'hacker' in source.name.lower():
-                        items = HackerNewsFetcher.fetch()
-                        all_items.extend(items)
-                    elif 'dev.to' in source.name.lower():
-                        items = DevToFetcher.fetch()
-                        all_items.extend(items)
-                
-                source.last_fetched = datetime.now()
-                self.db.commit()
-                
-            except Exception as e:
-                logger.error(f"Failed to fetch from {source.name}: {str(e)}")
-                continue
+        Skipped if another worker is already fetching the same source.
+        """
+        with LeaseLock(f"ingest:source:{source.id}") as lock:
+            if not lock.acquired:
+                return {'source': source.name, 'status': 'skipped'}
+            with span('fetch.source', source=source.name) as s:
+                result = self._fetch_source(source)
+                s.set_outcome(result['status'])
+                s.set('items.stored', result.get('stored'))
+                return result
+    
+    def _fetch_source(self, source: Source) -> Dict:
+        logger.info(f"Fetching from {source.name}")
+        
+        try:
+            items = self.fetch_items(source)
+            stored = self.process_and_store(items)
+        except Exception as e:
+            logger.error(f"Failed to fetch from {source.name}: {str(e)}")
+            self.db.rollback()
+            SourceScheduler.record_failure(source, str(e))
+            self.db.commit()
+            return {'source': source.name, 'status': 'error', 'error': str(e)}
         
-        self.process_and_store(all_items)
+        SourceScheduler.record_success(source, len(items), stored)
+        self.db.commit()
+        logger.info(
+            f"{source.name}: {stored} new of {len(items)} fetched, "
+            f"next fetch in {source.fetch_interval_seconds // 60} min"
+        )
+        return {'source': source.name, 'status': 'ok', 'fetched': len(items), 'stored': stored}
     
-    def process_and_store(self, items: List[Dict]):
+    def process_and_store(self, items: List[Dict]) -> int:
+        stored = 0
+        pending = []
+        pending_simhashes = {}
+        # One batched url_hash probe up front instead of a query per item
+        seen_urls = set(find_existing(
+            self.db, [URLNormalizer.normalize(item['url']) for item in items if item.get('url')]
+        ))
+        
         for item in items:
-            try:
-                normalized_url = URLNormalizer.normalize(item['url'])
-                
-                existing = self.db.query(Content).filter(
-                    Content.url == normalized_url
-                ).first()
-                
-                if existing:
-                    logger.debug(f"Skipping duplicate: {item['title'][:60]}...")
-                    continue
+            # Per-article span; summarization and storage are batched and traced per batch
+            with span(ARTICLE_SPAN, source=item.get('source_name'), **url_attributes(item.get('url'))):
+                prepared = self.prepare_item(item, seen_urls, pending_simhashes)
+            if not prepared:
+                continue
+            
+            pending.append(prepared)
+            seen_urls.add(prepared['url'])
+            if prepared['simhash'] is not None and not prepared['duplicate_of_url']:
+                pending_simhashes[prepared['url']] = prepared['simhash']
+            
+            if len(pending) >= SUMMARY_BATCH_SIZE:
+                stored += self.summarize_and_store(pending)
+                pending = []
+                pending_simhashes = {}
+        
+        if pending:
+            stored += self.summarize_and_store(pending)
+        return stored
+    
+    def prepare_item(self, item: Dict, seen_urls: set, pending_simhashes: Dict[str, int]) -> Optional[Dict]:
+        """Dedupe, classify and extract one item; returns Content fields or None.
+        
+        seen_urls holds the normalized URLs already stored or prepared this run.
+        Near-duplicates of stored or pending articles come back flagged with
+        duplicate_of_id / duplicate_of_url so they skip summarization.
+        """
+        try:
+            normalized_url = URLNormalizer.normalize(item['url'])
+            
+            if normalized_url in seen_urls:
+                logger.debug(f"Skipping duplicate: {item['title'][:60]}...")
+                count_items(item['source_name'], 'duplicate')
+                current_span().set_outcome('duplicate')
+                return None
                 
-                item['url'] = normalized_url
+            item['url'] = normalized_url
+            current_span().set('url.full', normalized_url)
                 
-                content_type = ContentClassifier.classify(
-                    item['title'],
-                    item['source_name'],
-                    item.get('tags')
-                )
+            content_type = ContentClassifier.classify(
+                item['title'],
+                item['source_name'],
+                item.get('tags')
+            )
                 
+            with stage_timer('extract'), span('extract') as s:
                 full_content, reader_content, extracted_image_url = ReaderModeExtractor.extract(item['url'])
+                s.set('content.size', len(full_content or '') + len(reader_content or ''))
+                if not (full_content or reader_content):
+                    s.set_outcome('extract_failed')
+            count_items(item['source_name'], 'extracted' if full_content or reader_content else 'extract_failed')
+            if not (full_content or reader_content):
+                current_span().set_outcome('extract_failed')
+            
+            fingerprint = simhash(reader_content or full_content)
+            duplicate_of_id = None
+            duplicate_of_url = None
+            if fingerprint is not None:
+                duplicate_of_url = match_pending(fingerprint, pending_simhashes)
+                if not duplicate_of_url:
+                    duplicate_of_id = find_near_duplicate(self.db, fingerprint)
+                if duplicate_of_id or duplicate_of_url:
+                    logger.info(f"Near-duplicate of {duplicate_of_id or duplicate_of_url}: {item['title'][:60]}...")
+                    count_items(item['source_name'], 'near_duplicate')
+                    current_span().set_outcome('near_duplicate')
+                
+            # Use extracted featured image if no thumbnail was provided
+            thumbnail_url = item.get('thumbnail_url')
+            if not thumbnail_url and extracted_image_url:
+                thumbnail_url = extracted_image_url
+                
+            author = item.get('author', '')
+            if author and len(author) > 200:
+                author = author[:197] + '...'
+                
+            title = item['title']
+            if title and len(title) > 500:
+                title = title[:497] + '...'
+                
+            return {
+                'title': title,
+                'url': item['url'],
+                'url_hash': url_hash(item['url']),
+                'source_name': item['source_name'],
+                'content_type': content_type,
+                'published_date': item['published_date'],
+                'thumbnail_url': thumbnail_url[:2048] if thumbnail_url else None,
+                'author': author if author else None,
+                'tags': item.get('tags'),
+                'full_content': full_content,
+                'reader_mode_content': reader_content,
+                'simhash': fingerprint,
+                'duplicate_of_id': duplicate_of_id,
+                'duplicate_of_url': duplicate_of_url,
+            }
+        except Exception as e:
+            logger.error(f"Failed to process item {item.get('url')}: {str(e)}")
+            count_items(item.get('source_name'), 'failed')
+            current_span().set_outcome('error')
+            current_span().set('error.type', type(e).__name__)
+            self.db.rollback()
+            return None
                 
-                # Use extracted featured image if no thumbnail was provided
-                thumbnail_url = item.get('thumbnail_url')
-                if not thumbnail_url and extracted_image_url:
-                    thumbnail_url = extracted_image_url
-                
-                author = item.get('author', '')
-                if author and len(author) > 200:
-                    author = author[:197] + '...'
-                
-                title = item['title']
-                if title and len(title) > 500:
-                    title = title[:497] + '...'
-                
-                ai_summary = None
-                ai_key_points = None
-                
+    def summarize_and_store(self, prepared_items: List[Dict]) -> int:
+        # Near-duplicates are stored inactive, pointing at their original, and never summarized
+        originals = [
+            fields for fields in prepared_items
+            if not fields['duplicate_of_id'] and not fields['duplicate_of_url']
+        ]
+        summaries = {}
+        try:
+            from ai_summarizer import summarize_articles
+            with stage_timer('summarize'), span('summarize.batch', **{'batch.size': len(originals)}):
+                results = summarize_articles([
+                    {
+                        'title': fields['title'],
+                        'content': fields['reader_mode_content'] or fields['full_content'],
+                        'source_name': fields['source_name'],
+                        'content_type': fields['content_type'],
+                    }
+                    for fields in originals
+                ])
+            summaries = {fields['url']: result for fields, result in zip(originals, results)}
+            for fields, result in zip(originals, results):
+                if result.summary:
+                    count_items(fields['source_name'], 'summarized')
+        except Exception as e:
+            logger.warning(f"Failed to generate AI summaries: {str(e)}")
+        
+        stored_ids = {}
+        with stage_timer('store'), span('store.batch', **{'batch.size': len(prepared_items)}) as batch_span:
+            for fields in prepared_items:
                 try:
-                    from ai_summarizer import generate_article_summary
-                    text_for_summary = reader_content or full_content
-                    ai_summary, ai_key_points = generate_article_summary(
-                        title, 
-                        text_for_summary, 
-                        item['source_name']
-                    )
-                except Exception as e:
-                    logger.warning(f"Failed to generate AI summary: {str(e)}")
-                
-                content = Content(
-                    title=title,
-                    url=item['url'],
-                    source_name=item['source_name'],
-                    content_type=content_type,
-                    published_date=item['published_date'],
-                    thumbnail_url=thumbnail_url[:2048] if thumbnail_url else None,
-                    author=author if author else None,
-                    tags=item.get('tags'),
-                    full_content=full_content,
-                    reader_mode_content=reader_content,
-                    ai_summary=ai_summary,
-                    ai_key_points=ai_key_points
-                )
+                    fields = dict(fields)
+                    duplicate_of_url = fields.pop('duplicate_of_url')
+                    fingerprint = fields['simhash']
+                    if fingerprint is not None:
+                        fields['simhash'] = to_signed(fingerprint)
+                    if duplicate_of_url:
+                        fields['duplicate_of_id'] = stored_ids.get(duplicate_of_url)
+                
+                    content = Content(**fields)
+                    result = summaries.get(fields['url'])
+                    if result:
+                        content.ai_summary = result.summary
+                        content.ai_key_points = result.key_points
+                        content.ai_summary_backend = result.backend
+                
+                    if fields['duplicate_of_id']:
+                        content.is_active = False
+                
+                    self.db.add(content)
+                    if fingerprint is not None and not fields['duplicate_of_id']:
+                        self.db.flush()
+                        self.db.add_all(band_rows(content.id, fingerprint))
+                    self.db.commit()
+                    stored_ids[content.url] = content.id
+                    count_items(fields['source_name'], 'stored')
+                    logger.info(f"Added content: {fields['title']}")
                 
-                self.db.add(content)
-                self.db.commit()
-                logger.info(f"Added content: {item['title']}")
-                
-            except Exception as e:
-                logger.error(f"Failed to process item {item.get('url')}: {str(e)}")
-                self.db.rollback()
-                continue
+                except Exception as e:
+                    logger.error(f"Failed to process item {fields.get('url')}: {str(e)}")
+                    count_items(fields.get('source_name'), 'failed')
+                    self.db.rollback()
+                    continue
+            batch_span.set('items.stored', len(stored_ids))
+        
+        return len(stored_ids)
+
+
+def run_content_fetch(join_timeout: float = 0) -> Dict:
+    """Fetch every active source, unless a full run is already in progress.
+    
+    An overlapping call skips; with join_timeout it waits up to that long for
+    the running one to finish instead and reports that it joined it.
+    """
+    with LeaseLock(INGEST_LOCK) as lock:
+        if not lock.acquired:
+            if join_timeout and wait_for_release(INGEST_LOCK, join_timeout):
+                return {'status': 'joined'}
+            return {'status': 'skipped', 'holder': lock_holder(INGEST_LOCK)}
+        
+        summarizer_metrics.start_run()
+        db = SessionLocal()
+        try:
+            with trace_run('ingest'):
+                aggregator = ContentAggregator(db)
+                results = aggregator.fetch_all_sources()
+        finally:
+            db.close()
+            logger.info(f"Summarizer run: {format_run_summary(summarizer_metrics.finish_run())}")
+        return {'status': 'completed', 'sources': results}
 
 
-def run_content_fetch():
+def run_source_fetch(source_id: int) -> Dict:
     db = SessionLocal()
     try:
-        aggregator = ContentAggregator(db)
-        aggregator.fetch_all_sources()
+        source = db.get(Source, source_id)
+        if source is None or not source.is_active:
+            return {'source_id': source_id, 'status': 'skipped'}
+        with trace_run(f"source-{source_id}"):
+            return ContentAggregator(db).fetch_source(source)
     finally:
         db.close()
 
@@ -2,10 +2,15 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import get_settings
+from metrics import instrument_pool
 
 settings = get_settings()
 
+# Advisory lock key held while the schema changes, so release steps that overlap run one after the other
+MIGRATION_LOCK_ID = 7_305_050
+
 engine = create_engine(settings.database_url)
+instrument_pool(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -19,6 +24,7 @@ def get_db():
 
 
 def init_db():
-    import models
-    Base.metadata.create_all(bind=engine)
+    """Migrate the schema to the latest revision, for scripts and local setup; deploys run migrate.py instead."""
+    from migrate import upgrade
+    upgrade()
 
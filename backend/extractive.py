@@ -0,0 +1,242 @@
+import logging
+import math
+import re
+from functools import lru_cache
+from typing import Optional, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# gpt-4o-mini tokenizer
+TOKENIZER_ENCODING = "o200k_base"
+
+# Input token budgets per content_type. Papers get the most room so the
+# findings survive; news rarely needs more than a few paragraphs.
+CONTENT_TYPE_TOKEN_BUDGETS = {
+    'paper': 1000,
+    'research': 900,
+    'tutorial': 700,
+    'essay': 700,
+    'article': 650,
+    'post': 600,
+    'news': 600,
+}
+DEFAULT_TOKEN_BUDGET = 650
+
+# How strongly sentence position counts. News puts the facts up front,
+# papers bury them in results and conclusions.
+LEAD_WEIGHTS = {
+    'news': 0.5,
+    'paper': 0.1,
+    'research': 0.15,
+}
+DEFAULT_LEAD_WEIGHT = 0.3
+
+# Anything past this is never read, whatever the budget
+MAX_SCAN_CHARS = 120000
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her here
+hers him his how i if in into is it its itself just me more most my no nor not now of off on once only or other
+our ours out over own same she should so some such than that the their theirs them then there these they this
+those through to too under until up very was we were what when where which while who whom why will with would
+you your yours yet however may might must one two new like get got use used using
+""".split())
+
+BOILERPLATE_PATTERN = re.compile(
+    r'\b(cookies?|subscribe|sign up|sign in|log in|newsletter|all rights reserved|advertisement|'
+    r'share this|follow us|click here|read more|related articles?|privacy policy|terms of (use|service)|'
+    r'skip to|comments?\s*\(\d+\))\b',
+    re.IGNORECASE
+)
+
+CUE_PATTERN = re.compile(
+    r'\b(we (propose|present|introduce|show|find|found|demonstrate|achieve|report)|'
+    r'(results?|experiments?) (show|indicate|suggest|demonstrate)|outperform\w*|state[- ]of[- ]the[- ]art|'
+    r'in (summary|conclusion)|our (method|approach|model|results|findings)|announced|according to|'
+    r'key (finding|takeaway)s?|improv\w+ by)\b',
+    re.IGNORECASE
+)
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])["\')\]]*\s+(?=["\'(\[]?[A-Z0-9])|\s*\n\s*')
+_WORD = re.compile(r"[a-z0-9][a-z0-9\-']+")
+
+
+@lru_cache(maxsize=1)
+def _get_encoder():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable, estimating token counts from length: {str(e)}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoder = _get_encoder()
+    if encoder is None:
+        return math.ceil(len(text) / 4)
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def count_tokens_batch(texts: List[str]) -> np.ndarray:
+    encoder = _get_encoder()
+    if encoder is None:
+        return np.array([math.ceil(len(t) / 4) for t in texts], dtype=np.int64)
+    return np.array([len(ids) for ids in encoder.encode_batch(texts, disallowed_special=())], dtype=np.int64)
+
+
+def truncate_to_tokens(text: str, token_budget: int) -> str:
+    encoder = _get_encoder()
+    if encoder is None:
+        return text[:token_budget * 4]
+    return encoder.decode(encoder.encode(text, disallowed_special=())[:token_budget])
+
+
+def token_budget_for(content_type: Optional[str]) -> int:
+    return CONTENT_TYPE_TOKEN_BUDGETS.get(content_type or '', DEFAULT_TOKEN_BUDGET)
+
+
+def split_sentences(text: str) -> List[str]:
+    parts = _SENTENCE_SPLIT.split(text)
+    return [re.sub(r'\s+', ' ', p).strip() for p in parts if p and p.strip()]
+
+
+def is_boilerplate(sentence: str) -> bool:
+    """Navigation crumbs, cookie banners, share widgets and the like."""
+    if BOILERPLATE_PATTERN.search(sentence) and len(sentence.split()) < 25:
+        return True
+    return len(sentence.split()) <= 3 and not sentence.endswith(('.', '!', '?', ':'))
+
+
+def score_sentences(
+    sentences: List[str],
+    title: Optional[str] = None,
+    lead_weight: float = DEFAULT_LEAD_WEIGHT
+) -> np.ndarray:
+    """Score sentences by salient-term coverage, position, cue phrases and title overlap."""
+    n = len(sentences)
+    if n == 0:
+        return np.zeros(0)
+    
+    vocab = {}
+    rows = []
+    cols = []
+    word_counts = np.zeros(n)
+    for i, sentence in enumerate(sentences):
+        words = _WORD.findall(sentence.lower())
+        word_counts[i] = len(words)
+        for word in words:
+            if word in STOPWORDS or len(word) < 3:
+                continue
+            rows.append(i)
+            cols.append(vocab.setdefault(word, len(vocab)))
+    
+    if not vocab:
+        return np.zeros(n)
+    
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    vocab_size = len(vocab)
+    
+    # Document-level term frequency is the salience of each term
+    term_counts = np.bincount(cols, minlength=vocab_size).astype(np.float64)
+    term_weights = term_counts / term_counts.max()
+    
+    # Count each term once per sentence so repetition doesn't dominate
+    pairs = np.unique(rows * vocab_size + cols)
+    pair_rows = pairs // vocab_size
+    pair_cols = pairs % vocab_size
+    salience = np.bincount(pair_rows, weights=term_weights[pair_cols], minlength=n)
+    salience /= np.sqrt(np.maximum(word_counts, 1))
+    if salience.max() > 0:
+        salience /= salience.max()
+    
+    position = 1.0 / (1.0 + 4.0 * np.arange(n) / n)
+    
+    cues = np.array([1.0 if CUE_PATTERN.search(s) else 0.0 for s in sentences])
+    
+    title_overlap = np.zeros(n)
+    if title:
+        title_terms = [vocab[w] for w in set(_WORD.findall(title.lower())) if w in vocab]
+        if title_terms:
+            in_title = np.zeros(vocab_size, dtype=bool)
+            in_title[title_terms] = True
+            title_overlap = np.bincount(pair_rows, weights=in_title[pair_cols], minlength=n) / len(title_terms)
+    
+    scores = salience + lead_weight * position + 0.3 * cues + 0.2 * title_overlap
+    
+    boilerplate = np.array([bool(BOILERPLATE_PATTERN.search(s)) for s in sentences])
+    scores[boilerplate] *= 0.1
+    scores[word_counts < 6] *= 0.3
+    
+    return scores
+
+
+def select_sentences(sentences: List[str], scores: np.ndarray, token_budget: int) -> List[int]:
+    """Greedily take the best sentences that fit the budget; return them in document order."""
+    costs = count_tokens_batch(sentences) + 1
+    chosen = []
+    used = 0
+    for i in np.argsort(-scores, kind='stable'):
+        if used + costs[i] > token_budget:
+            continue
+        chosen.append(int(i))
+        used += costs[i]
+    return sorted(chosen)
+
+
+def prepare_summary_input(
+    text: str,
+    content_type: Optional[str] = None,
+    title: Optional[str] = None,
+    token_budget: Optional[int] = None
+) -> str:
+    """Fit article text into the content_type's token budget.
+
+    Page boilerplate is always dropped. If the rest fits it is passed through
+    whole; otherwise it is reduced to its highest-scoring sentences, kept in
+    their original order.
+    """
+    budget = token_budget or token_budget_for(content_type)
+    sentences = [s for s in split_sentences(text[:MAX_SCAN_CHARS]) if not is_boilerplate(s)]
+    text = '\n'.join(sentences)
+    
+    if count_tokens(text) <= budget:
+        return text
+    
+    if len(sentences) > 1:
+        scores = score_sentences(sentences, title, LEAD_WEIGHTS.get(content_type or '', DEFAULT_LEAD_WEIGHT))
+        chosen = select_sentences(sentences, scores, budget)
+        if chosen:
+            return '\n'.join(sentences[i] for i in chosen)
+    
+    return truncate_to_tokens(text, budget)
+
+
+def extractive_summary(
+    text: str,
+    title: Optional[str] = None,
+    content_type: Optional[str] = None,
+    summary_sentences: int = 2,
+    max_key_points: int = 4
+) -> Tuple[Optional[str], Optional[List[str]]]:
+    """Build a (summary, key_points) pair from the article's own top sentences."""
+    sentences = [
+        s for s in split_sentences(text[:MAX_SCAN_CHARS])
+        if not is_boilerplate(s) and 5 <= len(s.split()) <= 60
+    ]
+    if not sentences:
+        return None, None
+    
+    scores = score_sentences(sentences, title, LEAD_WEIGHTS.get(content_type or '', DEFAULT_LEAD_WEIGHT))
+    ranked = [int(i) for i in np.argsort(-scores, kind='stable')]
+    
+    summary_ids = sorted(ranked[:summary_sentences])
+    key_point_ids = sorted(ranked[summary_sentences:summary_sentences + max_key_points])
+    
+    summary = ' '.join(sentences[i] for i in summary_ids)
+    key_points = [sentences[i] for i in key_point_ids]
+    return summary, key_points
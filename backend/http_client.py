@@ -0,0 +1,356 @@
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Optional, Dict, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+KEY_PREFIX = "http_client:"
+STATS_KEY = "http_client:stats"
+
+# (requests per second, concurrent requests) for hosts that differ from the defaults
+HOST_LIMITS = {
+    'hacker-news.firebaseio.com': (20.0, 8),
+    'dev.to': (5.0, 4),
+}
+
+POLL_INTERVAL = 0.05
+
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+# Reserve the host's next free request slot; returns the wait in seconds, or -1 if it exceeds ARGV[2]
+RATE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local slot = tonumber(redis.call('GET', KEYS[1]) or '0')
+if slot < now then slot = now end
+local wait = slot - now
+if wait > tonumber(ARGV[2]) then return '-1' end
+redis.call('SET', KEYS[1], tostring(slot + interval), 'PX', math.ceil((wait + interval) * 1000) + 1000)
+return tostring(wait)
+"""
+
+# Take one of ARGV[2] leases on the host; expired leases (crashed workers) are dropped first
+CONCURRENCY_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[1])
+    redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[3])) + 1)
+    return 1
+end
+return 0
+"""
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without touching the network while a host's circuit is open."""
+
+
+class HostBusyError(requests.exceptions.Timeout):
+    """Raised when a host's limiter would make a request wait longer than allowed."""
+
+
+def host_limits(host: str) -> Tuple[float, int]:
+    return HOST_LIMITS.get(host, (settings.http_requests_per_second_per_host, settings.http_max_concurrency_per_host))
+
+
+class OutboundHTTP:
+    """Shared outbound HTTP layer: per-host rate and concurrency limits plus a circuit breaker.
+
+    Limiter and breaker state live in Redis so every worker process sees the
+    same budget per host. If Redis is unreachable each process falls back to
+    its own in-memory limits, which still keeps a single worker polite.
+    """
+    
+    def __init__(self, redis_url: str):
+        self.redis_url = redis_url
+        self._redis = None
+        self._redis_failed_at = 0.0
+        self._rate_script = None
+        self._concurrency_script = None
+        self._lock = threading.Lock()
+        self._local_next_slot: Dict[str, float] = {}
+        self._local_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._local_failures: Dict[str, int] = defaultdict(int)
+        self._local_open_until: Dict[str, float] = {}
+        self._stats = defaultdict(float)
+        self._sessions = threading.local()
+    
+    def _get_redis(self):
+        if self._redis is not None:
+            return self._redis
+        if time.time() - self._redis_failed_at < 60:
+            return None
+        try:
+            import redis
+            client = redis.Redis.from_url(self.redis_url, socket_timeout=1, socket_connect_timeout=1)
+            client.ping()
+            self._rate_script = client.register_script(RATE_SCRIPT)
+            self._concurrency_script = client.register_script(CONCURRENCY_SCRIPT)
+            self._redis = client
+            return client
+        except Exception as e:
+            logger.warning(f"Outbound HTTP limits are process-local only: {str(e)}")
+            self._redis_failed_at = time.time()
+            return None
+    
+    def _drop_redis(self, e: Exception):
+        logger.warning(f"Outbound HTTP Redis error, using process-local limits: {str(e)}")
+        self._redis = None
+        self._redis_failed_at = time.time()
+    
+    def _session(self) -> requests.Session:
+        session = getattr(self._sessions, 'session', None)
+        if session is None:
+            session = requests.Session()
+            self._sessions.session = session
+        return session
+    
+    # Circuit breaker
+    
+    def circuit_open(self, host: str) -> bool:
+        client = self._get_redis()
+        if client is not None:
+            try:
+                open_until = client.hget(f"{KEY_PREFIX}circuit:{host}", 'open_until')
+                return open_until is not None and float(open_until) > time.time()
+            except Exception as e:
+                self._drop_redis(e)
+        return self._local_open_until.get(host, 0.0) > time.time()
+    
+    def _record_failure(self, host: str):
+        """Count a consecutive failure; at the threshold the host is skipped for the cooldown.
+
+        The count is kept until a success, so after the cooldown a single
+        failed probe reopens the circuit straight away.
+        """
+        threshold = settings.http_circuit_failure_threshold
+        cooldown = settings.http_circuit_cooldown_seconds
+        failures = None
+        
+        client = self._get_redis()
+        if client is not None:
+            key = f"{KEY_PREFIX}circuit:{host}"
+            try:
+                pipe = client.pipeline()
+                pipe.hincrby(key, 'failures', 1)
+                pipe.expire(key, cooldown * 4)
+                failures = pipe.execute()[0]
+                if failures >= threshold:
+                    client.hset(key, 'open_until', time.time() + cooldown)
+            except Exception as e:
+                self._drop_redis(e)
+                failures = None
+        
+        if failures is None:
+            with self._lock:
+                self._local_failures[host] += 1
+                failures = self._local_failures[host]
+                if failures >= threshold:
+                    self._local_open_until[host] = time.time() + cooldown
+        
+        if failures == threshold:
+            logger.warning(f"Circuit open for {host} after {failures} failures; skipping it for {cooldown}s")
+    
+    def _record_success(self, host: str):
+        client = self._get_redis()
+        if client is not None:
+            try:
+                client.delete(f"{KEY_PREFIX}circuit:{host}")
+            except Exception as e:
+                self._drop_redis(e)
+        with self._lock:
+            self._local_failures.pop(host, None)
+            self._local_open_until.pop(host, None)
+    
+    # Limiter
+    
+    def _acquire(self, host: str, timeout: float) -> Optional[str]:
+        """Wait for a concurrency lease and a rate slot on host; returns the lease token."""
+        rps, concurrency = host_limits(host)
+        deadline = time.time() + settings.http_max_limiter_wait_seconds
+        
+        client = self._get_redis()
+        if client is not None:
+            token = uuid.uuid4().hex
+            slots_key = f"{KEY_PREFIX}slots:{host}"
+            try:
+                # Leases outlive the request timeout so a crashed worker frees its slot
+                while not self._concurrency_script(keys=[slots_key], args=[token, concurrency, timeout + 30], client=client):
+                    if time.time() >= deadline:
+                        raise HostBusyError(f"No free connection slot for {host}")
+                    time.sleep(POLL_INTERVAL)
+                
+                wait = float(self._rate_script(
+                    keys=[f"{KEY_PREFIX}rate:{host}"],
+                    args=[1.0 / rps, max(deadline - time.time(), 0)],
+                    client=client
+                ))
+                if wait < 0:
+                    client.zrem(slots_key, token)
+                    raise HostBusyError(f"Rate limit for {host} would exceed the maximum wait")
+                if wait > 0:
+                    time.sleep(wait)
+                return token
+            except HostBusyError:
+                raise
+            except Exception as e:
+                self._drop_redis(e)
+        
+        with self._lock:
+            semaphore = self._local_slots.get(host)
+            if semaphore is None:
+                semaphore = self._local_slots[host] = threading.BoundedSemaphore(concurrency)
+        if not semaphore.acquire(timeout=max(deadline - time.time(), 0)):
+            raise HostBusyError(f"No free connection slot for {host}")
+        
+        with self._lock:
+            now = time.time()
+            slot = max(self._local_next_slot.get(host, 0.0), now)
+            if slot - now > deadline - now:
+                semaphore.release()
+                raise HostBusyError(f"Rate limit for {host} would exceed the maximum wait")
+            self._local_next_slot[host] = slot + 1.0 / rps
+        if slot > now:
+            time.sleep(slot - now)
+        return None
+    
+    def _release(self, host: str, token: Optional[str]):
+        if token is None:
+            self._local_slots[host].release()
+            return
+        client = self._get_redis()
+        if client is not None:
+            try:
+                client.zrem(f"{KEY_PREFIX}slots:{host}", token)
+            except Exception as e:
+                self._drop_redis(e)
+    
+    # Requests
+    
+    def get(self, url: str, timeout: float = 10, **kwargs) -> requests.Response:
+        """requests.get through the host's limiter and circuit breaker.
+
+        Connection errors, timeouts, 429 and 5xx responses count as host
+        failures. With stream=True the slot is released once headers arrive.
+        """
+        host = (urlparse(url).hostname or '').lower()
+        if self.circuit_open(host):
+            self._add(host, {'circuit_skips': 1})
+            raise CircuitOpenError(f"Circuit open for {host}, skipping {url}")
+        
+        wait_started = time.perf_counter()
+        token = self._acquire(host, timeout)
+        wait_ms = (time.perf_counter() - wait_started) * 1000
+        
+        started = time.perf_counter()
+        try:
+            response = self._session().get(url, timeout=timeout, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            self._record_failure(host)
+            self._add(host, {
+                'requests': 1,
+                'errors': 1,
+                'wait_ms': wait_ms,
+                'network_ms': (time.perf_counter() - started) * 1000,
+            })
+            raise
+        finally:
+            self._release(host, token)
+        
+        failed = response.status_code == 429 or response.status_code >= 500
+        if failed:
+            self._record_failure(host)
+        else:
+            self._record_success(host)
+        self._add(host, {
+            'requests': 1,
+            'errors': 1 if failed else 0,
+            'wait_ms': wait_ms,
+            'network_ms': (time.perf_counter() - started) * 1000,
+        })
+        return response
+    
+    # Metrics
+    
+    def _add(self, host: str, fields: Dict[str, float]):
+        with self._lock:
+            for field, amount in fields.items():
+                self._stats[f'{host}:{field}'] += amount
+                self._stats[f'total:{field}'] += amount
+        
+        client = self._get_redis()
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                for field, amount in fields.items():
+                    pipe.hincrbyfloat(STATS_KEY, f'{host}:{field}', amount)
+                    pipe.hincrbyfloat(STATS_KEY, f'total:{field}', amount)
+                pipe.execute()
+            except Exception as e:
+                self._drop_redis(e)
+    
+    @staticmethod
+    def _summarize(values: Dict[str, float], top_hosts: int = 20) -> Dict:
+        hosts = defaultdict(dict)
+        for key, amount in values.items():
+            host, field = key.rsplit(':', 1)
+            hosts[host][field] = amount
+        
+        def row(fields: Dict[str, float]) -> Dict:
+            return {
+                'requests': int(fields.get('requests', 0)),
+                'errors': int(fields.get('errors', 0)),
+                'circuit_skips': int(fields.get('circuit_skips', 0)),
+                'wait_seconds': round(fields.get('wait_ms', 0) / 1000, 2),
+                'network_seconds': round(fields.get('network_ms', 0) / 1000, 2),
+            }
+        
+        total = row(hosts.pop('total', {}))
+        ranked = sorted(hosts.items(), key=lambda item: item[1].get('wait_ms', 0) + item[1].get('network_ms', 0), reverse=True)
+        return {'total': total, 'hosts': {host: row(fields) for host, fields in ranked[:top_hosts]}}
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            result = {'process': self._summarize(dict(self._stats))}
+        
+        client = self._get_redis()
+        if client is not None:
+            try:
+                result['shared'] = self._summarize({
+                    key.decode(): float(amount) for key, amount in client.hgetall(STATS_KEY).items()
+                })
+                result['open_circuits'] = sorted(
+                    key.decode()[len(f"{KEY_PREFIX}circuit:"):]
+                    for key in client.scan_iter(f"{KEY_PREFIX}circuit:*")
+                    if self.circuit_open(key.decode()[len(f"{KEY_PREFIX}circuit:"):])
+                )
+            except Exception as e:
+                self._drop_redis(e)
+        else:
+            now = time.time()
+            result['open_circuits'] = sorted(host for host, until in self._local_open_until.items() if until > now)
+        
+        return result
+
+
+http_client = OutboundHTTP(settings.redis_url)
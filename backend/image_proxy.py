@@ -0,0 +1,309 @@
+import hashlib
+import io
+import json
+import logging
+import math
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, List, Dict, Tuple
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Served variants; a client asks for the smallest one at least as wide as its slot
+WIDTHS = (160, 320, 640)
+FORMATS = {'webp': 'image/webp', 'jpg': 'image/jpeg'}
+QUALITY = {'webp': 80, 'jpg': 82}
+
+KEY_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+VARIANT_PATTERN = re.compile(r'^(\d+)\.(webp|jpg)$')
+
+# Requests for the same URL share one fetch; unrelated URLs rarely share a stripe
+URL_LOCK_STRIPES = 64
+
+BLURHASH_COMPONENTS = (4, 3)
+BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+
+
+class ImageProxyError(Exception):
+    """The original could not be fetched or decoded."""
+
+
+def parse_variant(variant: str) -> Tuple[int, str]:
+    """'320.webp' -> (320, 'webp'); raises ValueError for anything that is not a served variant."""
+    match = VARIANT_PATTERN.match(variant)
+    if not match or int(match.group(1)) not in WIDTHS:
+        raise ValueError(f"Unknown thumbnail variant {variant}")
+    return int(match.group(1)), match.group(2)
+
+
+def _base83(value: int, length: int) -> str:
+    return ''.join(BASE83[(value // 83 ** (length - i - 1)) % 83] for i in range(length))
+
+
+def _linear_to_srgb(value: float) -> int:
+    v = min(max(value, 0.0), 1.0)
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def blurhash(pixels: 'np.ndarray', x_components: int = 4, y_components: int = 3) -> str:
+    """BlurHash (https://blurha.sh) of an RGB uint8 array; callers pass a small downscaled copy."""
+    import numpy as np
+    
+    srgb = pixels.astype(np.float64) / 255
+    linear = np.where(srgb <= 0.04045, srgb / 12.92, ((srgb + 0.055) / 1.055) ** 2.4)
+    height, width = linear.shape[:2]
+    
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            basis = np.outer(np.cos(np.pi * j * np.arange(height) / height), np.cos(np.pi * i * np.arange(width) / width))
+            scale = 1 if i == 0 and j == 0 else 2
+            factors.append(scale * np.einsum('hw,hwc->c', basis, linear) / (width * height))
+    dc, ac = factors[0], factors[1:]
+    
+    result = _base83((x_components - 1) + (y_components - 1) * 9, 1)
+    if ac:
+        quantised_max = max(0, min(82, int(math.floor(max(float(np.abs(f).max()) for f in ac) * 166 - 0.5))))
+        max_value = (quantised_max + 1) / 166
+        result += _base83(quantised_max, 1)
+    else:
+        max_value = 1.0
+        result += _base83(0, 1)
+    
+    r, g, b = (_linear_to_srgb(float(c)) for c in dc)
+    result += _base83((r << 16) + (g << 8) + b, 4)
+    for factor in ac:
+        quantised = [
+            max(0, min(18, int(math.floor(math.copysign(abs(c / max_value) ** 0.5, c) * 9 + 9.5))))
+            for c in factor
+        ]
+        result += _base83(quantised[0] * 19 * 19 + quantised[1] * 19 + quantised[2], 2)
+    return result
+
+
+def render_variants(original: bytes, directory: str) -> Dict:
+    """Decode original and write every width/format variant plus meta.json into directory.
+
+    Top-level so it runs in the proxy's process pool.
+    """
+    import numpy as np
+    from PIL import Image, ImageOps
+    
+    with Image.open(io.BytesIO(original)) as image:
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+    flat = image
+    if image.mode == 'RGBA':
+        flat = Image.new('RGB', image.size, (255, 255, 255))
+        flat.paste(image, mask=image.getchannel('A'))
+    
+    for width in WIDTHS:
+        # Never upscale; small originals are stored as-is under every width
+        scale = min(width / image.width, 1.0)
+        size = (max(int(image.width * scale), 1), max(int(image.height * scale), 1))
+        for fmt in FORMATS:
+            source = image if fmt == 'webp' else flat
+            resized = source.resize(size, Image.LANCZOS) if size != source.size else source
+            resized.save(os.path.join(directory, f'{width}.{fmt}'),
+                         'WEBP' if fmt == 'webp' else 'JPEG', quality=QUALITY[fmt], optimize=True)
+    
+    preview = flat.copy()
+    preview.thumbnail((32, 32))
+    meta = {
+        'width': image.width,
+        'height': image.height,
+        'blurhash': blurhash(np.asarray(preview), *BLURHASH_COMPONENTS),
+    }
+    with open(os.path.join(directory, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    return meta
+
+
+class ImageStore:
+    """Content-addressed variant directories (<root>/<key[:2]>/<key>/) with size-bounded LRU eviction.
+
+    The mtime of meta.json is the last access. Directories are renamed into
+    place whole, so API workers sharing the directory never see a partial entry.
+    """
+    
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._approx_bytes: Optional[int] = None
+    
+    def directory(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+    
+    def meta(self, key: str) -> Optional[Dict]:
+        try:
+            with open(os.path.join(self.directory(key), 'meta.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def path(self, key: str, width: int, fmt: str) -> Optional[str]:
+        directory = self.directory(key)
+        path = os.path.join(directory, f'{width}.{fmt}')
+        if not os.path.exists(path):
+            return None
+        try:
+            os.utime(os.path.join(directory, 'meta.json'))
+        except OSError:
+            pass
+        return path
+    
+    def staging_directory(self) -> str:
+        os.makedirs(self.root, exist_ok=True)
+        return tempfile.mkdtemp(prefix='.staging-', dir=self.root)
+    
+    def commit(self, key: str, staging: str) -> int:
+        """Move a rendered staging directory into place; returns the bytes added (0 if it already existed)."""
+        target = self.directory(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        size = self._directory_bytes(staging)
+        try:
+            os.rename(staging, target)
+        except OSError:
+            # Rendered concurrently by another worker
+            shutil.rmtree(staging, ignore_errors=True)
+            return 0
+        with self._lock:
+            if self._approx_bytes is not None:
+                self._approx_bytes += size
+        self.evict_if_needed()
+        return size
+    
+    @staticmethod
+    def _directory_bytes(directory: str) -> int:
+        return sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+    
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """(last access, bytes, directory) for every cached key."""
+        entries = []
+        for shard in os.scandir(self.root):
+            if not shard.is_dir() or shard.name.startswith('.'):
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    accessed = os.stat(os.path.join(entry.path, 'meta.json')).st_mtime
+                    entries.append((accessed, self._directory_bytes(entry.path), entry.path))
+                except OSError:
+                    continue
+        return entries
+    
+    def evict_if_needed(self):
+        with self._lock:
+            if self._approx_bytes is not None and self._approx_bytes <= self.max_bytes:
+                return
+            # Rescan rather than trust the running total; other workers write here too
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            if total > self.max_bytes:
+                target = int(self.max_bytes * 0.9)
+                evicted = 0
+                for _, size, directory in sorted(entries):
+                    if total <= target:
+                        break
+                    shutil.rmtree(directory, ignore_errors=True)
+                    total -= size
+                    evicted += 1
+                logger.info(f"Image cache evicted {evicted} entries, {total / 1e6:.0f} MB left")
+            self._approx_bytes = total
+    
+    def stats(self) -> Dict:
+        entries = self._entries() if os.path.isdir(self.root) else []
+        return {
+            'root': self.root,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+        }
+
+
+class ImageProxy:
+    """Fetches a thumbnail original once and serves resized WebP/JPEG variants from the ImageStore.
+
+    Decoding and resizing run in a spawn process pool so Pillow never holds
+    the API worker; concurrent requests for the same URL share one fetch.
+    """
+    
+    def __init__(self, store: ImageStore, workers: int, max_source_bytes: int):
+        self.store = store
+        self.workers = workers
+        self.max_source_bytes = max_source_bytes
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._url_locks = [threading.Lock() for _ in range(URL_LOCK_STRIPES)]
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+    
+    def fetch_original(self, url: str) -> bytes:
+        import requests
+        from http_client import http_client, BROWSER_HEADERS
+        
+        try:
+            response = http_client.get(url, timeout=10, headers=BROWSER_HEADERS, stream=True)
+        except requests.RequestException as e:
+            raise ImageProxyError(f"Could not fetch {url}: {str(e)}")
+        try:
+            if response.status_code >= 400:
+                raise ImageProxyError(f"{url} returned {response.status_code}")
+            body = bytearray()
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                body.extend(chunk)
+                if len(body) > self.max_source_bytes:
+                    raise ImageProxyError(f"{url} is larger than {self.max_source_bytes} bytes")
+            return bytes(body)
+        except requests.RequestException as e:
+            raise ImageProxyError(f"Could not fetch {url}: {str(e)}")
+        finally:
+            response.close()
+    
+    def prepare(self, url: str) -> Dict:
+        """Make sure url's variants are cached; returns {'key', 'width', 'height', 'blurhash'}."""
+        with self._url_locks[hash(url) % URL_LOCK_STRIPES]:
+            original = self.fetch_original(url)
+            key = hashlib.sha256(original).hexdigest()[:32]
+            meta = self.store.meta(key)
+            if meta is None:
+                started = time.perf_counter()
+                staging = self.store.staging_directory()
+                try:
+                    meta = self._get_pool().submit(render_variants, original, staging).result()
+                except Exception as e:
+                    shutil.rmtree(staging, ignore_errors=True)
+                    raise ImageProxyError(f"Could not decode {url}: {str(e)}")
+                self.store.commit(key, staging)
+                logger.debug(f"Rendered thumbnail variants of {url} in {(time.perf_counter() - started) * 1000:.0f}ms")
+            return {'key': key, **meta}
+    
+    def variant_path(self, key: str, width: int, fmt: str) -> Optional[str]:
+        if not KEY_PATTERN.match(key):
+            return None
+        return self.store.path(key, width, fmt)
+
+
+_settings = get_settings()
+
+image_proxy = ImageProxy(
+    store=ImageStore(_settings.image_cache_dir, _settings.image_cache_max_bytes),
+    workers=_settings.image_proxy_workers,
+    max_source_bytes=_settings.image_source_max_bytes,
+)
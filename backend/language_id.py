@@ -0,0 +1,199 @@
+import json
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Optional, List, Tuple, Dict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Character n-gram orders used for scoring, matching langdetect's profiles
+NGRAM_ORDERS = (1, 2, 3)
+
+# Only the head of each text is scored; a few hundred characters settle the language
+MAX_CHARS = 1000
+
+# Texts whose characters are mostly outside Latin / Latin Extended are rejected outright
+LATIN_LIMIT = 0x024F
+NON_LATIN_RATIO = 0.3
+
+# Texts scored per matrix gather; bounds memory on large batches
+BATCH_SIZE = 64
+
+_NON_LETTER = re.compile(r"[\W\d_]+", re.UNICODE)
+
+
+def _profile_dir() -> str:
+    import langdetect
+    return os.path.join(os.path.dirname(langdetect.__file__), 'profiles')
+
+
+@lru_cache(maxsize=1)
+def _normalization_table() -> Dict[int, str]:
+    """langdetect's per-character normalization (kana, CJK classes, Latin punctuation) as a str.translate table."""
+    from langdetect.utils.ngram import NGram
+    table = {}
+    for codepoint in range(0x10000):
+        ch = chr(codepoint)
+        if 0xD800 <= codepoint <= 0xDFFF:
+            continue
+        normalized = NGram.normalize(ch)
+        if normalized != ch:
+            table[codepoint] = normalized
+    return table
+
+
+class LanguageModel:
+    """Character n-gram language identifier built from langdetect's bundled profiles.
+
+    Every profile is loaded once into a dense (n-gram, language) log-probability
+    matrix, so classifying a batch is a gather plus a segmented sum. Scoring is
+    plain arithmetic on the matrix, so results are deterministic.
+    """
+    
+    def __init__(self, profile_dir: str):
+        languages = []
+        profiles = []
+        for name in sorted(os.listdir(profile_dir)):
+            with open(os.path.join(profile_dir, name), encoding='utf-8') as f:
+                profile = json.load(f)
+            languages.append(profile['name'])
+            profiles.append(profile)
+        
+        vocab = {}
+        for profile in profiles:
+            for gram in profile['freq']:
+                key = gram.lower()
+                if len(key) in NGRAM_ORDERS:
+                    vocab.setdefault(key, len(vocab))
+        
+        # Unlisted n-grams get half the frequency of the rarest listed one of
+        # the same order, so one unusual n-gram can't veto a language
+        log_probs = np.empty((len(vocab), len(languages)), dtype=np.float32)
+        orders = np.array([len(g) for g in vocab], dtype=np.int64)
+        for j, profile in enumerate(profiles):
+            counts = np.zeros(len(vocab), dtype=np.float64)
+            for gram, freq in profile['freq'].items():
+                key = gram.lower()
+                if key in vocab:
+                    counts[vocab[key]] += freq
+            
+            for n in NGRAM_ORDERS:
+                in_order = orders == n
+                total = profile['n_words'][n - 1]
+                listed = counts[in_order]
+                floor = listed[listed > 0].min() / 2 if (listed > 0).any() else 1.0
+                log_probs[in_order, j] = np.log(np.maximum(listed, floor) / total)
+        
+        self.languages = languages
+        self.vocab = vocab
+        self.log_probs = log_probs
+        _normalization_table()
+    
+    @staticmethod
+    def ngrams(text: str) -> List[str]:
+        normalized = text[:MAX_CHARS].translate(_normalization_table()).lower()
+        cleaned = ' ' + _NON_LETTER.sub(' ', normalized).strip() + ' '
+        grams = []
+        for n in NGRAM_ORDERS:
+            for i in range(len(cleaned) - n + 1):
+                gram = cleaned[i:i + n]
+                if gram.strip():
+                    grams.append(gram)
+        return grams
+    
+    def scores(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-text summed log-probabilities (texts x languages) and matched n-gram counts."""
+        scores = np.zeros((len(texts), len(self.languages)), dtype=np.float64)
+        matched = np.zeros(len(texts), dtype=np.int64)
+        for start in range(0, len(texts), BATCH_SIZE):
+            chunk = texts[start:start + BATCH_SIZE]
+            scores[start:start + len(chunk)], matched[start:start + len(chunk)] = self._score_chunk(chunk)
+        return scores, matched
+    
+    def _score_chunk(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        rows = []
+        cols = []
+        for i, text in enumerate(texts):
+            ids = [self.vocab[g] for g in self.ngrams(text or '') if g in self.vocab]
+            rows.extend([i] * len(ids))
+            cols.extend(ids)
+        
+        scores = np.zeros((len(texts), len(self.languages)), dtype=np.float64)
+        matched = np.bincount(np.asarray(rows, dtype=np.int64), minlength=len(texts))
+        if not cols:
+            return scores, matched
+        
+        # Score each distinct (text, n-gram) once, weighted by its count
+        vocab_size = len(self.vocab)
+        pairs, counts = np.unique(
+            np.asarray(rows, dtype=np.int64) * vocab_size + np.asarray(cols, dtype=np.int64),
+            return_counts=True
+        )
+        pair_rows = pairs // vocab_size
+        gathered = self.log_probs[pairs % vocab_size] * counts[:, None].astype(np.float32)
+        
+        present = np.unique(pair_rows)
+        starts = np.searchsorted(pair_rows, present)
+        scores[present] = np.add.reduceat(gathered, starts, axis=0)
+        return scores, matched
+    
+    def classify(self, texts: List[str]) -> List[Tuple[Optional[str], float]]:
+        """(language, confidence) per text; (None, 0.0) when nothing could be scored."""
+        scores, matched = self.scores(texts)
+        results = []
+        for row, count in zip(scores, matched):
+            if count == 0:
+                results.append((None, 0.0))
+                continue
+            # Per-n-gram average keeps the softmax from saturating on long texts
+            normalized = row / count
+            best = int(np.argmax(normalized))
+            weights = np.exp((normalized - normalized[best]) * 10)
+            results.append((self.languages[best], float(weights[best] / weights.sum())))
+        return results
+
+
+@lru_cache(maxsize=1)
+def get_model() -> LanguageModel:
+    return LanguageModel(_profile_dir())
+
+
+def non_latin_ratios(texts: List[str]) -> np.ndarray:
+    """Share of non-space characters beyond Latin Extended-B, per text."""
+    ratios = np.zeros(len(texts))
+    for i, text in enumerate(texts):
+        codepoints = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+        letters = np.count_nonzero(codepoints != 0x20)
+        if letters:
+            ratios[i] = np.count_nonzero(codepoints > LATIN_LIMIT) / letters
+    return ratios
+
+
+def detect_batch(texts: List[str]) -> List[Optional[str]]:
+    return [language for language, _ in get_model().classify(texts)]
+
+
+def is_english_batch(texts: List[str], min_length: int = 30) -> List[bool]:
+    """Batched equivalent of LanguageFilter.is_english."""
+    cleaned = [(text or '').strip() for text in texts]
+    results = [False] * len(texts)
+    
+    ratios = non_latin_ratios(cleaned)
+    to_classify = []
+    for i, text in enumerate(cleaned):
+        if len(text) < 10 or ratios[i] > NON_LATIN_RATIO:
+            continue
+        if len(text) < min_length:
+            results[i] = True
+            continue
+        to_classify.append(i)
+    
+    if to_classify:
+        for i, (language, _) in zip(to_classify, get_model().classify([cleaned[i] for i in to_classify])):
+            # Nothing scorable: give it the benefit of the doubt, as before
+            results[i] = language in (None, 'en')
+    
+    return results
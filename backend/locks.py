@@ -0,0 +1,297 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Optional, Dict
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+KEY_PREFIX = "lock:"
+STATS_KEY = "locks:stats"
+
+DEFAULT_TTL_SECONDS = 60
+POLL_INTERVAL = 0.2
+
+# Full runs and single-source fetches each hold a lease, so overlapping
+# triggers skip (or join) instead of fetching and summarizing twice
+INGEST_LOCK = 'ingest:all'
+
+# Only the holder's token may extend or delete the key
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class _LockBackend:
+    """Redis connection plus an in-process registry used while Redis is unreachable."""
+    
+    def __init__(self, redis_url: str):
+        self.redis_url = redis_url
+        self._redis = None
+        self._redis_failed_at = 0.0
+        self._renew = None
+        self._release = None
+        self._lock = threading.Lock()
+        self._local: Dict[str, str] = {}
+        self._stats = defaultdict(float)
+    
+    def get_redis(self):
+        if self._redis is not None:
+            return self._redis
+        if time.time() - self._redis_failed_at < 60:
+            return None
+        try:
+            import redis
+            client = redis.Redis.from_url(self.redis_url, socket_timeout=2, socket_connect_timeout=1)
+            client.ping()
+            self._renew = client.register_script(RENEW_SCRIPT)
+            self._release = client.register_script(RELEASE_SCRIPT)
+            self._redis = client
+            return client
+        except Exception as e:
+            logger.warning(f"Locks are process-local only: {str(e)}")
+            self._redis_failed_at = time.time()
+            return None
+    
+    def drop_redis(self, e: Exception):
+        logger.warning(f"Lock Redis error, falling back to process-local locks: {str(e)}")
+        self._redis = None
+        self._redis_failed_at = time.time()
+    
+    def try_acquire(self, name: str, value: str, ttl_ms: int) -> bool:
+        client = self.get_redis()
+        if client is not None:
+            try:
+                return bool(client.set(f"{KEY_PREFIX}{name}", value, nx=True, px=ttl_ms))
+            except Exception as e:
+                self.drop_redis(e)
+        with self._lock:
+            if name in self._local:
+                return False
+            self._local[name] = value
+            return True
+    
+    def renew(self, name: str, value: str, ttl_ms: int) -> bool:
+        client = self.get_redis()
+        if client is not None:
+            try:
+                return bool(self._renew(keys=[f"{KEY_PREFIX}{name}"], args=[value, ttl_ms], client=client))
+            except Exception as e:
+                self.drop_redis(e)
+        with self._lock:
+            return self._local.get(name) == value
+    
+    def release(self, name: str, value: str):
+        client = self.get_redis()
+        if client is not None:
+            try:
+                self._release(keys=[f"{KEY_PREFIX}{name}"], args=[value], client=client)
+            except Exception as e:
+                self.drop_redis(e)
+        with self._lock:
+            if self._local.get(name) == value:
+                del self._local[name]
+    
+    def holder(self, name: str) -> Optional[Dict]:
+        client = self.get_redis()
+        if client is not None:
+            try:
+                raw = client.get(f"{KEY_PREFIX}{name}")
+                return json.loads(raw) if raw else None
+            except Exception as e:
+                self.drop_redis(e)
+        with self._lock:
+            raw = self._local.get(name)
+        return json.loads(raw) if raw else None
+    
+    def held(self) -> Dict[str, Dict]:
+        client = self.get_redis()
+        if client is not None:
+            try:
+                return {
+                    key.decode()[len(KEY_PREFIX):]: json.loads(client.get(key) or 'null')
+                    for key in client.scan_iter(f"{KEY_PREFIX}*")
+                }
+            except Exception as e:
+                self.drop_redis(e)
+        with self._lock:
+            return {name: json.loads(raw) for name, raw in self._local.items()}
+    
+    def record(self, name: str, fields: Dict[str, float]):
+        # Lock names include ids (ingest:source:12); stats are kept per kind
+        kind = ':'.join(part for part in name.split(':') if not part.isdigit())
+        with self._lock:
+            for field, amount in fields.items():
+                self._stats[f'{kind}|{field}'] += amount
+        
+        client = self.get_redis()
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                for field, amount in fields.items():
+                    pipe.hincrbyfloat(STATS_KEY, f'{kind}|{field}', amount)
+                pipe.execute()
+            except Exception as e:
+                self.drop_redis(e)
+    
+    @staticmethod
+    def summarize(values: Dict[str, float]) -> Dict:
+        kinds = defaultdict(dict)
+        for key, amount in values.items():
+            kind, field = key.split('|', 1)
+            kinds[kind][field] = amount
+        result = {}
+        for kind, fields in sorted(kinds.items()):
+            acquired = int(fields.get('acquired', 0))
+            result[kind] = {
+                'acquired': acquired,
+                'skipped': int(fields.get('skipped', 0)),
+                'joined': int(fields.get('joined', 0)),
+                'lost': int(fields.get('lost', 0)),
+                'wait_seconds': round(fields.get('wait_ms', 0) / 1000, 2),
+                'hold_seconds': round(fields.get('hold_ms', 0) / 1000, 2),
+                'hold_seconds_avg': round(fields.get('hold_ms', 0) / 1000 / acquired, 2) if acquired else 0.0,
+            }
+        return result
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            result = {'process': self.summarize(dict(self._stats))}
+        client = self.get_redis()
+        if client is not None:
+            try:
+                result['shared'] = self.summarize({
+                    key.decode(): float(amount) for key, amount in client.hgetall(STATS_KEY).items()
+                })
+            except Exception as e:
+                self.drop_redis(e)
+        result['held'] = self.held()
+        return result
+
+
+_backend = _LockBackend(settings.redis_url)
+
+
+class LeaseLock:
+    """Single-flight lease on a named job, e.g. 'ingest:all' or 'ingest:source:12'.
+
+    The key expires after ttl_seconds unless the holder's heartbeat thread
+    renews it, so a crashed worker never blocks the next run for long.
+    With wait_seconds=0 (the default) acquire() gives up at once, which is
+    how overlapping triggers skip instead of duplicating work.
+
+        with LeaseLock('ingest:all') as lock:
+            if not lock.acquired:
+                return
+    """
+    
+    def __init__(self, name: str, ttl_seconds: int = DEFAULT_TTL_SECONDS, wait_seconds: float = 0):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.wait_seconds = wait_seconds
+        self.acquired = False
+        self.lost = False
+        self.waited = 0.0
+        self._value = json.dumps({
+            'token': uuid.uuid4().hex,
+            'holder': f"{socket.gethostname()}:{os.getpid()}",
+            'acquired_at': time.time(),
+        })
+        self._acquired_at = 0.0
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+    
+    def acquire(self) -> bool:
+        started = time.perf_counter()
+        deadline = time.time() + self.wait_seconds
+        while True:
+            if _backend.try_acquire(self.name, self._value, self.ttl_seconds * 1000):
+                self.acquired = True
+                break
+            if time.time() >= deadline:
+                break
+            time.sleep(POLL_INTERVAL)
+        self.waited = time.perf_counter() - started
+        
+        if not self.acquired:
+            _backend.record(self.name, {'skipped': 1, 'wait_ms': self.waited * 1000})
+            holder = _backend.holder(self.name)
+            logger.info(f"Lock {self.name} is held by {holder['holder'] if holder else 'another worker'}; skipping")
+            return False
+        
+        self._acquired_at = time.perf_counter()
+        self._heartbeat = threading.Thread(target=self._renew_loop, name=f"lock-heartbeat-{self.name}", daemon=True)
+        self._heartbeat.start()
+        return True
+    
+    def _renew_loop(self):
+        interval = self.ttl_seconds / 3
+        while not self._stop.wait(interval):
+            if not _backend.renew(self.name, self._value, self.ttl_seconds * 1000):
+                self.lost = True
+                logger.error(f"Lost lock {self.name}; another worker may now run the same job")
+                return
+    
+    def release(self):
+        if not self.acquired:
+            return
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join(timeout=5)
+        _backend.release(self.name, self._value)
+        self.acquired = False
+        
+        held = time.perf_counter() - self._acquired_at
+        _backend.record(self.name, {
+            'acquired': 1,
+            'lost': 1 if self.lost else 0,
+            'wait_ms': self.waited * 1000,
+            'hold_ms': held * 1000,
+        })
+        logger.debug(f"Lock {self.name}: waited {self.waited:.2f}s, held {held:.2f}s")
+    
+    def __enter__(self) -> "LeaseLock":
+        self.acquire()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+def lock_holder(name: str) -> Optional[Dict]:
+    return _backend.holder(name)
+
+
+def wait_for_release(name: str, timeout: float) -> bool:
+    """Block until nobody holds name (True) or timeout passes (False); used to join a running job."""
+    started = time.perf_counter()
+    deadline = time.time() + timeout
+    released = True
+    while _backend.holder(name) is not None:
+        if time.time() >= deadline:
+            released = False
+            break
+        time.sleep(POLL_INTERVAL)
+    _backend.record(name, {'joined': 1 if released else 0, 'wait_ms': (time.perf_counter() - started) * 1000})
+    return released
+
+
+def lock_stats() -> Dict:
+    return _backend.stats()
@@ -1,16 +1,19 @@
 from fastapi import FastAPI, Depends, HTTPException, Query, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from typing import Optional
+from sqlalchemy.orm import Session, joinedload
+from typing import Optional, List, Tuple
+from datetime import datetime, timedelta
 import logging
+import time
 
-from database import get_db, init_db
+from database import get_db
 from models import Content, Source
 from schemas import (
     ContentResponse, ContentDetailResponse, FeedResponse, 
     SearchResponse, HealthResponse
 )
 from config import get_settings
+from metrics import observe_request
 
 settings = get_settings()
 
@@ -32,10 +35,18 @@ app.add_middleware(
 )
 
 
-@app.on_event("startup")
-async def startup_event():
-    init_db()
-    logger.info("Database initialized")
+@app.middleware("http")
+async def record_request_latency(request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template (/api/article/{article_id}), not the raw path
+        route = request.scope.get('route')
+        observe_request(request.method, route.path if route else 'unmatched', status, time.perf_counter() - started)
 
 
 @app.get("/")
@@ -43,34 +54,12 @@ async def root():
     return {"message": "TechFirstSearch API", "version": "1.0.0"}
 
 
-@app.post("/api/admin/migrate-ai-columns")
-async def migrate_ai_columns():
-    from sqlalchemy import text
-    from database import engine
-    
-    results = []
-    with engine.connect() as conn:
-        try:
-            conn.execute(text("ALTER TABLE content ADD COLUMN ai_summary TEXT"))
-            conn.commit()
-            results.append("Added ai_summary column")
-        except Exception as e:
-            if "already exists" in str(e).lower() or "duplicate" in str(e).lower():
-                results.append("ai_summary column already exists")
-            else:
-                results.append(f"Error adding ai_summary: {str(e)}")
-        
-        try:
-            conn.execute(text("ALTER TABLE content ADD COLUMN ai_key_points JSON"))
-            conn.commit()
-            results.append("Added ai_key_points column")
-        except Exception as e:
-            if "already exists" in str(e).lower() or "duplicate" in str(e).lower():
-                results.append("ai_key_points column already exists")
-            else:
-                results.append(f"Error adding ai_key_points: {str(e)}")
-    
-    return {"status": "completed", "results": results}
+@app.get("/api/admin/schema")
+def schema_status():
+    """Migration state; the schema is changed only by `python migrate.py upgrade`, run as the release step."""
+    from migrate import current_revision, head_revision
+    current, head = current_revision(), head_revision()
+    return {"revision": current, "latest": head, "up_to_date": current == head}
 
 
 @app.get("/api/admin/sources")
@@ -83,6 +72,25 @@ async def list_sources(db: Session = Depends(get_db)):
     }
 
 
+@app.get("/api/admin/sources/schedule")
+async def source_schedule(db: Session = Depends(get_db)):
+    from scheduler import SourceScheduler
+    sources = db.query(Source).order_by(Source.next_fetch_at.asc().nullsfirst()).all()
+    return [SourceScheduler.schedule_state(s) for s in sources]
+
+
+@app.post("/api/admin/sources/{source_id}/fetch-now")
+async def fetch_source_now(source_id: int, db: Session = Depends(get_db)):
+    """Make a source due on the next scheduler tick."""
+    from scheduler import SourceScheduler
+    source = db.get(Source, source_id)
+    if not source:
+        raise HTTPException(status_code=404, detail="Source not found")
+    source.next_fetch_at = datetime.now()
+    db.commit()
+    return SourceScheduler.schedule_state(source)
+
+
 @app.post("/api/admin/seed-sources")
 async def seed_sources_endpoint(db: Session = Depends(get_db)):
     try:
@@ -103,10 +111,14 @@ async def fetch_one_source(db: Session = Depends(get_db)):
         if not source:
             return {"error": "TechCrunch source not found"}
         
-        items = RSSFetcher.fetch(source.feed_url, source.name)
-        items_to_process = items[:5]  # Just first 5
-        aggregator = ContentAggregator(db)
-        aggregator.process_and_store(items_to_process)
+        from locks import LeaseLock
+        with LeaseLock(f"ingest:source:{source.id}") as lock:
+            if not lock.acquired:
+                return {"status": "skipped", "source": source.name, "message": "Source is being fetched elsewhere"}
+            items = RSSFetcher.fetch(source.feed_url, source.name)
+            items_to_process = items[:5]  # Just first 5
+            aggregator = ContentAggregator(db)
+            aggregator.process_and_store(items_to_process)
         
         return {"status": "success", "source": source.name, "fetched": len(items), "processed": len(items_to_process)}
     except Exception as e:
@@ -117,196 +129,182 @@ async def fetch_one_source(db: Session = Depends(get_db)):
 def background_content_fetch():
     try:
         from content_fetcher import run_content_fetch
-        run_content_fetch()
-        logger.info("Background content fetch completed")
+        result = run_content_fetch()
+        logger.info(f"Background content fetch {result['status']}")
     except Exception as e:
         logger.error(f"Background fetch failed: {str(e)}")
 
 
 @app.post("/api/admin/fetch-content")
 async def fetch_content_endpoint(background_tasks: BackgroundTasks):
+    from locks import INGEST_LOCK, lock_holder
+    holder = lock_holder(INGEST_LOCK)
+    if holder:
+        return {"status": "running", "message": "A content fetch is already in progress", "holder": holder}
     background_tasks.add_task(background_content_fetch)
     return {"status": "started", "message": "Content fetch started in background"}
 
 
 @app.post("/api/admin/fetch-content-sync")
-async def fetch_content_sync_endpoint(db: Session = Depends(get_db)):
+def fetch_content_sync_endpoint(db: Session = Depends(get_db)):
     try:
-        from content_fetcher import ContentAggregator
-        aggregator = ContentAggregator(db)
-        results = aggregator.fetch_all_sources()
+        from content_fetcher import run_content_fetch
+        # Joins a run that is already in progress rather than starting a second one. A plain
+        # def, so the wait of up to 10 minutes holds a threadpool worker, not the event loop
+        result = run_content_fetch(join_timeout=600)
         
         total_content = db.query(Content).filter(Content.is_active == True).count()
         return {
-            "status": "completed",
+            "status": result['status'],
             "total_content_now": total_content,
-            "message": "Sync fetch completed"
+            "sources": result.get('sources'),
+            "message": f"Sync fetch {result['status']}"
         }
     except Exception as e:
         import traceback
         return {"status": "error", "error": str(e), "traceback": traceback.format_exc()}
 
 
-@app.post("/api/admin/update-thumbnails")
-async def update_thumbnails_endpoint(db: Session = Depends(get_db), limit: int = Query(default=50)):
-    try:
-        from content_fetcher import ImageExtractor
-        
-        articles_without_thumb = db.query(Content).filter(
-            Content.thumbnail_url == None,
-            Content.is_active == True
-        ).limit(limit).all()
-        
-        updated = 0
-        errors = []
-        for article in articles_without_thumb:
-            try:
-                thumbnail = ImageExtractor.extract_from_url(article.url)
-                if thumbnail:
-                    article.thumbnail_url = thumbnail[:2048]
-                    db.commit()
-                    updated += 1
-                    logger.info(f"Updated thumbnail for: {article.title[:50]}")
-            except Exception as e:
-                errors.append(f"{article.url}: {str(e)}")
-                db.rollback()
-        
+def enqueue_backfill_task(
+    db: Session,
+    background_tasks: BackgroundTasks,
+    task_name: str,
+    limit: int,
+    params: Optional[dict] = None
+) -> dict:
+    """Create a backfill run and hand it off; the response only carries the run id."""
+    from backfill import active_run, claim_stale_run, create_run
+    
+    running = active_run(db, task_name)
+    if running and not claim_stale_run(db, running, settings.backfill_lease_seconds):
         return {
-            "status": "completed",
-            "checked": len(articles_without_thumb),
-            "updated": updated,
-            "errors": errors[:5]
+            "status": "running",
+            "run_id": running,
+            "status_url": f"/api/admin/backfill/runs/{running}",
+            "message": f"A {task_name} run is already in progress"
         }
-    except Exception as e:
-        import traceback
-        return {"status": "error", "error": str(e), "traceback": traceback.format_exc()}
+    
+    if running:
+        # Its process went away (e.g. a restart); continue it rather than starting over
+        run_id = running
+    else:
+        use_celery = settings.backfill_executor == 'celery'
+        shards = settings.backfill_celery_shards if use_celery else 1
+        run_id = create_run(db, task_name, shards=shards, limit=limit, params=params).id
+    return dispatch_backfill_run(background_tasks, run_id, "resumed" if running else "queued")
+
+
+def dispatch_backfill_run(background_tasks: BackgroundTasks, run_id: int, status: str) -> dict:
+    from backfill import execute_run
+    
+    if settings.backfill_executor == 'celery':
+        execute_run(run_id, use_celery=True)
+    else:
+        background_tasks.add_task(execute_run, run_id)
+    return {
+        "status": status,
+        "run_id": run_id,
+        "status_url": f"/api/admin/backfill/runs/{run_id}",
+        "cancel_url": f"/api/admin/backfill/runs/{run_id}/cancel"
+    }
+
+
+@app.post("/api/admin/update-thumbnails")
+def update_thumbnails_endpoint(
+    background_tasks: BackgroundTasks,
+    limit: int = Query(default=50),
+    db: Session = Depends(get_db)
+):
+    return enqueue_backfill_task(db, background_tasks, 'thumbnails', limit)
 
 
 @app.post("/api/admin/refresh-arxiv-thumbnails")
-async def refresh_arxiv_thumbnails(limit: int = 100, db: Session = Depends(get_db)):
-    try:
-        from content_fetcher import ImageExtractor, ArxivURLConverter
-        
-        arxiv_articles = db.query(Content).filter(
-            Content.is_active == True,
-            Content.url.contains('arxiv.org')
-        ).limit(limit).all()
-        
-        updated = 0
-        errors = []
-        
-        for article in arxiv_articles:
-            try:
-                html_url = ArxivURLConverter.to_html_url(article.url)
-                new_thumbnail = ImageExtractor.extract_from_url(html_url)
-                
-                if new_thumbnail and new_thumbnail != article.thumbnail_url:
-                    article.thumbnail_url = new_thumbnail[:2048]
-                    db.add(article)
-                    db.commit()
-                    updated += 1
-                    logger.info(f"Updated ArXiv thumbnail: {article.title[:50]}")
-            except Exception as e:
-                errors.append(f"{article.url}: {str(e)}")
-                db.rollback()
-        
-        return {
-            "status": "completed",
-            "arxiv_articles_checked": len(arxiv_articles),
-            "updated": updated,
-            "errors": errors[:5]
-        }
-    except Exception as e:
-        import traceback
-        return {"status": "error", "error": str(e), "traceback": traceback.format_exc()}
+def refresh_arxiv_thumbnails(background_tasks: BackgroundTasks, limit: int = 100, db: Session = Depends(get_db)):
+    return enqueue_backfill_task(db, background_tasks, 'arxiv_thumbnails', limit)
 
 
 @app.post("/api/admin/refresh-arxiv-content")
-async def refresh_arxiv_content(limit: int = 50, db: Session = Depends(get_db)):
-    try:
-        from content_fetcher import ReaderModeExtractor, ImageExtractor, ArxivURLConverter
-        
-        arxiv_articles = db.query(Content).filter(
-            Content.is_active == True,
-            Content.url.contains('arxiv.org')
-        ).order_by(Content.published_date.desc()).limit(limit).all()
-        
-        updated = 0
-        errors = []
-        
-        for article in arxiv_articles:
-            try:
-                html_url = ArxivURLConverter.to_html_url(article.url)
-                full_content, reader_content, thumbnail = ReaderModeExtractor.extract(article.url)
-                
-                if full_content:
-                    article.full_content = full_content
-                if reader_content:
-                    article.reader_mode_content = reader_content
-                if thumbnail:
-                    article.thumbnail_url = thumbnail[:2048]
-                
-                db.add(article)
-                db.commit()
-                updated += 1
-                logger.info(f"Refreshed ArXiv content: {article.title[:50]}")
-            except Exception as e:
-                errors.append(f"{article.url}: {str(e)}")
-                db.rollback()
-        
-        return {
-            "status": "completed",
-            "arxiv_articles_checked": len(arxiv_articles),
-            "updated": updated,
-            "errors": errors[:5]
-        }
-    except Exception as e:
-        import traceback
-        return {"status": "error", "error": str(e), "traceback": traceback.format_exc()}
+def refresh_arxiv_content(background_tasks: BackgroundTasks, limit: int = 50, db: Session = Depends(get_db)):
+    return enqueue_backfill_task(db, background_tasks, 'arxiv_content', limit)
 
 
 @app.post("/api/admin/generate-summaries")
-async def generate_ai_summaries(limit: int = 50, db: Session = Depends(get_db)):
+def generate_ai_summaries(background_tasks: BackgroundTasks, limit: int = 50, db: Session = Depends(get_db)):
+    return enqueue_backfill_task(db, background_tasks, 'summaries', limit)
+
+
+@app.post("/api/admin/render-thumbnails")
+def render_thumbnails(background_tasks: BackgroundTasks, limit: int = 200, db: Session = Depends(get_db)):
+    return enqueue_backfill_task(db, background_tasks, 'thumbnail_variants', limit)
+
+
+@app.get("/api/admin/backfill/runs")
+async def list_backfill_runs(db: Session = Depends(get_db)):
+    from backfill import list_runs
+    return list_runs(db)
+
+
+@app.get("/api/admin/backfill/runs/{run_id}")
+async def backfill_run_status(run_id: int, db: Session = Depends(get_db)):
+    from backfill import run_status
     try:
-        from ai_summarizer import generate_article_summary
-        
-        articles_without_summary = db.query(Content).filter(
-            Content.is_active == True,
-            Content.ai_summary == None
-        ).order_by(Content.published_date.desc()).limit(limit).all()
-        
-        generated = 0
-        errors = []
-        
-        for article in articles_without_summary:
-            try:
-                text_content = article.reader_mode_content or article.full_content
-                ai_summary, ai_key_points = generate_article_summary(
-                    article.title,
-                    text_content,
-                    article.source_name
-                )
-                
-                if ai_summary:
-                    article.ai_summary = ai_summary
-                    article.ai_key_points = ai_key_points
-                    db.add(article)
-                    db.commit()
-                    generated += 1
-                    logger.info(f"Generated summary for: {article.title[:50]}")
-            except Exception as e:
-                errors.append(f"{article.title[:30]}: {str(e)}")
-                db.rollback()
-        
-        return {
-            "status": "completed",
-            "articles_checked": len(articles_without_summary),
-            "summaries_generated": generated,
-            "errors": errors[:5]
-        }
-    except Exception as e:
-        import traceback
-        return {"status": "error", "error": str(e), "traceback": traceback.format_exc()}
+        return run_status(db, run_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.post("/api/admin/backfill/runs/{run_id}/cancel")
+async def cancel_backfill_run(run_id: int, db: Session = Depends(get_db)):
+    from backfill import cancel_run
+    try:
+        return cancel_run(db, run_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.post("/api/admin/backfill/runs/{run_id}/resume")
+def resume_backfill_run(run_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    """Continue a cancelled, failed or stalled run from each shard's last committed id."""
+    from backfill import ACTIVE_STATUSES, claim_stale_run, run_status
+    try:
+        status = run_status(db, run_id)['status']
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if status == 'completed':
+        raise HTTPException(status_code=409, detail="Run already completed")
+    if status in ACTIVE_STATUSES and not claim_stale_run(db, run_id, settings.backfill_lease_seconds):
+        raise HTTPException(status_code=409, detail="Run is still making progress")
+    return dispatch_backfill_run(background_tasks, run_id, "resumed")
+
+
+@app.get("/api/admin/summary-cache/stats")
+async def summary_cache_stats():
+    from summary_cache import summary_cache
+    return summary_cache.stats()
+
+
+@app.get("/api/admin/metrics/summarizer")
+async def summarizer_metrics_stats():
+    from summarizer_metrics import summarizer_metrics
+    return summarizer_metrics.stats()
+
+
+@app.get("/api/admin/metrics/http")
+async def http_client_stats():
+    from http_client import http_client
+    return http_client.stats()
+
+
+@app.get("/api/admin/image-cache/stats")
+def image_cache_stats():
+    from image_proxy import image_proxy
+    return image_proxy.store.stats()
+
+
+@app.get("/api/admin/metrics/locks")
+async def lock_stats_endpoint():
+    from locks import lock_stats
+    return lock_stats()
 
 
 @app.get("/api/health", response_model=HealthResponse)
@@ -329,20 +327,51 @@ async def health_check(db: Session = Depends(get_db)):
         raise HTTPException(status_code=503, detail="Service unhealthy")
 
 
+def published_window(since: Optional[datetime] = None, until: Optional[datetime] = None) -> list:
+    """published_date bounds, so a partitioned content table only scans those months."""
+    conditions = []
+    if since is not None:
+        conditions.append(Content.published_date >= since)
+    if until is not None:
+        conditions.append(Content.published_date < until)
+    return conditions
+
+
+def newest_first(query, limit: int, offset: int, since: Optional[datetime], until: Optional[datetime],
+                 deep: bool = False) -> Tuple[List[Content], int]:
+    """A page of query, newest first, and its total.
+
+    Unless the client bounds the range or asks for deep, the last
+    RECENT_WINDOW_DAYS are tried first and the whole table only when they
+    can't fill the page, so the items are the same either way but the common
+    case prunes to the newest partitions. total counts the range that served
+    the page, up to LIST_COUNT_CAP rows.
+    """
+    windows = [published_window(since, until)]
+    if since is None and until is None and not deep:
+        windows.insert(0, published_window(datetime.now() - timedelta(days=settings.recent_window_days)))
+    
+    for window in windows:
+        items = query.filter(*window).order_by(
+            Content.published_date.desc()
+        ).limit(limit).offset(offset).all()
+        if len(items) == limit:
+            break
+    total = query.filter(*window).with_entities(Content.id).limit(settings.list_count_cap).count()
+    return items, total
+
+
 @app.get("/api/feed", response_model=FeedResponse)
 async def get_feed(
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
     db: Session = Depends(get_db)
 ):
     try:
-        total = db.query(Content).filter(Content.is_active == True).count()
-        
-        items = db.query(Content).filter(
-            Content.is_active == True
-        ).order_by(
-            Content.published_date.desc()
-        ).limit(limit).offset(offset).all()
+        query = db.query(Content).filter(Content.is_active == True)
+        items, total = newest_first(query, limit, offset, since, until)
         
         return {
             "total": total,
@@ -357,6 +386,9 @@ async def get_feed(
 async def search_content(
     q: str = Query(..., min_length=1),
     limit: int = Query(50, ge=1, le=200),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    deep: bool = Query(False),
     db: Session = Depends(get_db)
 ):
     try:
@@ -367,11 +399,7 @@ async def search_content(
         ).filter(
             Content.title.ilike(search_term)
         )
-        
-        total = query.count()
-        items = query.order_by(
-            Content.published_date.desc()
-        ).limit(limit).all()
+        items, total = newest_first(query, limit, 0, since, until, deep)
         
         return {
             "total": total,
@@ -388,7 +416,8 @@ async def get_article(
     db: Session = Depends(get_db)
 ):
     try:
-        article = db.query(Content).filter(
+        # The only read path that needs the body; feed and search never load content_body
+        article = db.query(Content).options(joinedload(Content.body)).filter(
             Content.id == article_id,
             Content.is_active == True
         ).first()
@@ -396,6 +425,14 @@ async def get_article(
         if not article:
             raise HTTPException(status_code=404, detail="Article not found")
         
+        # Bodies of old months may live in the archive (see archive.py), in full or in part
+        body = article.body
+        if body is None or body.full_content is None and body.reader_mode_content is None:
+            from archive import body_archive
+            archived = body_archive.load(db, article)
+            if archived:
+                missing = {field: value for field, value in archived.items() if getattr(article, field) is None}
+                return ContentDetailResponse.model_validate(article).model_copy(update=missing)
         return article
     except HTTPException:
         raise
@@ -404,6 +441,48 @@ async def get_article(
         raise HTTPException(status_code=500, detail="Failed to fetch article")
 
 
+@app.get("/api/thumbnails/{article_id}/{key}/{variant}")
+def get_thumbnail(article_id: int, key: str, variant: str, db: Session = Depends(get_db)):
+    """Resized thumbnail, e.g. /api/thumbnails/12/<key>/320.webp; the path comes from thumbnail_proxy_url."""
+    from fastapi.responses import FileResponse
+    from image_proxy import image_proxy, parse_variant, FORMATS, ImageProxyError
+    
+    try:
+        width, fmt = parse_variant(variant)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    path = image_proxy.variant_path(key, width, fmt)
+    current = path is not None
+    if path is None:
+        article = db.get(Content, article_id)
+        if not article or not article.thumbnail_url:
+            raise HTTPException(status_code=404, detail="Thumbnail not found")
+        # An old or unknown key gets the article's current image; only a missing current image is fetched
+        path = image_proxy.variant_path(article.thumbnail_key, width, fmt) if article.thumbnail_key else None
+        if path is None:
+            # Evicted, rendered on another host, or the publisher changed the image
+            try:
+                meta = image_proxy.prepare(article.thumbnail_url)
+            except ImageProxyError as e:
+                logger.warning(f"Thumbnail proxy failed for article {article_id}: {str(e)}")
+                raise HTTPException(status_code=502, detail="Could not render thumbnail")
+            if meta['key'] != article.thumbnail_key:
+                article.thumbnail_key = meta['key']
+                article.thumbnail_width = meta['width']
+                article.thumbnail_height = meta['height']
+                article.thumbnail_blurhash = meta['blurhash']
+                db.commit()
+            path = image_proxy.variant_path(meta['key'], width, fmt)
+            if path is None:
+                raise HTTPException(status_code=503, detail="Thumbnail was evicted while rendering")
+        current = article.thumbnail_key == key
+    
+    # Keyed paths never change content; a stale key gets the new image with a short lifetime
+    cache_control = "public, max-age=31536000, immutable" if current else "public, max-age=3600"
+    return FileResponse(path, media_type=FORMATS[fmt], headers={"Cache-Control": cache_control})
+
+
 from fastapi.responses import Response
 
 @app.get("/sitemap.xml")
@@ -442,12 +521,20 @@ async def robots():
     content = """User-agent: *
 Allow: /
 Disallow: /api/admin/
+Disallow: /metrics
 
 Sitemap: https://techfirstsearch.com/sitemap.xml
 """
     return Response(content=content, media_type="text/plain")
 
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    from metrics import render
+    body, content_type = render()
+    return Response(content=body, media_type=content_type)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
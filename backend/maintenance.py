@@ -0,0 +1,54 @@
+import logging
+from typing import List, Iterator, Sequence
+
+from sqlalchemy import select, delete
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from models import Content, ContentBody, SimhashBand
+
+logger = logging.getLogger(__name__)
+
+
+def join_body(stmt: Select) -> Select:
+    """Outer-join content_body into a Content select that uses any of its columns."""
+    if ContentBody.__table__ in stmt.get_final_froms():
+        return stmt.outerjoin_from(Content, ContentBody)
+    return stmt
+
+
+def iter_chunks(db: Session, columns: Sequence, chunk_size: int, start_after: int = 0, where: Sequence = ()) -> Iterator[List]:
+    """Yield lists of rows ordered by Content.id, one keyset-paginated query per chunk.
+
+    Only the given columns are loaded, so memory depends on chunk_size, not
+    on the size of the table. ContentBody columns are joined in as needed.
+    """
+    last_id = start_after
+    while True:
+        rows = db.execute(
+            join_body(select(Content.id, *columns))
+            .where(Content.id > last_id, *where)
+            .order_by(Content.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def bulk_delete(db: Session, ids: List[int]) -> int:
+    if not ids:
+        return 0
+    db.execute(delete(SimhashBand).where(SimhashBand.content_id.in_(ids)))
+    db.execute(delete(ContentBody).where(ContentBody.content_id.in_(ids)))
+    result = db.execute(delete(Content).where(Content.id.in_(ids)))
+    return result.rowcount
+
+
+def ensure_bodies(db: Session, ids: List[int]):
+    """Insert empty content_body rows for ids that have none, so body updates always match a row."""
+    existing = set(db.execute(select(ContentBody.content_id).where(ContentBody.content_id.in_(ids))).scalars())
+    missing = [{'content_id': content_id} for content_id in ids if content_id not in existing]
+    if missing:
+        db.connection().execute(ContentBody.__table__.insert(), missing)
@@ -0,0 +1,162 @@
+"""Prometheus metrics for the API and the ingest pipeline.
+
+With PROMETHEUS_MULTIPROC_DIR set before the process starts (gunicorn with
+several workers, Celery prefork), every process writes its samples to files
+in that directory and the exporters aggregate them.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Tuple
+
+from prometheus_client import (
+    Counter, Histogram, Gauge, CollectorRegistry, REGISTRY, CONTENT_TYPE_LATEST,
+    generate_latest, multiprocess, start_http_server,
+)
+
+logger = logging.getLogger(__name__)
+
+MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'techfirst_http_request_duration_seconds',
+    'API request latency by route template',
+    ['method', 'route', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    'techfirst_db_pool_checked_out',
+    'Database connections currently checked out of the pool',
+    multiprocess_mode='livesum',
+)
+DB_POOL_OVERFLOW = Gauge(
+    'techfirst_db_pool_overflow',
+    'Checked-out connections beyond pool_size, i.e. overflow connections in use',
+    multiprocess_mode='livesum',
+)
+
+# Hit ratio: rate(..{result="hit"}) / rate(..) in PromQL
+CACHE_REQUESTS = Counter(
+    'techfirst_cache_requests_total',
+    'Cache lookups by cache and result',
+    ['cache', 'result'],
+)
+
+# fetched, filtered_non_english, duplicate, near_duplicate, extracted,
+# extract_failed, summarized, stored, failed
+INGEST_ITEMS = Counter(
+    'techfirst_ingest_items_total',
+    'Items seen by ingest, by source and outcome',
+    ['source', 'outcome'],
+)
+
+# fetch, parse, extract, summarize, store
+INGEST_STAGE_SECONDS = Histogram(
+    'techfirst_ingest_stage_duration_seconds',
+    'Time spent per ingest stage call',
+    ['stage'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+# LLM stage, recorded by summarizer_metrics; path is full, title, batch or local
+SUMMARIZER_CALL_SECONDS = Histogram(
+    'techfirst_summarizer_call_duration_seconds',
+    'Summarizer request latency including retries, by path and model',
+    ['path', 'model'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+SUMMARIZER_CALLS = Counter(
+    'techfirst_summarizer_calls_total',
+    'Summarizer requests by path, model and outcome (ok, error)',
+    ['path', 'model', 'outcome'],
+)
+SUMMARIZER_RETRIES = Counter(
+    'techfirst_summarizer_retries_total',
+    'Summarizer request retries by path',
+    ['path'],
+)
+SUMMARIZER_TOKENS = Counter(
+    'techfirst_summarizer_tokens_total',
+    'Summarizer tokens by path, model and kind (prompt, completion)',
+    ['path', 'model', 'kind'],
+)
+SUMMARIZER_COST_USD = Counter(
+    'techfirst_summarizer_cost_usd_total',
+    'Estimated summarizer spend in USD, from summarizer_metrics.MODEL_PRICING',
+    ['model'],
+)
+SUMMARIZER_PARSE_FAILURES = Counter(
+    'techfirst_summarizer_parse_failures_total',
+    'Summarizer responses that could not be parsed, by path',
+    ['path'],
+)
+
+
+def count_items(source: str, outcome: str, amount: int = 1):
+    if amount:
+        INGEST_ITEMS.labels(source or 'unknown', outcome).inc(amount)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        INGEST_STAGE_SECONDS.labels(stage).observe(time.perf_counter() - started)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float):
+    HTTP_REQUEST_SECONDS.labels(method, route, str(status)).observe(seconds)
+
+
+def instrument_pool(engine):
+    """Track checked-out and overflow connections through pool events.
+    
+    Counted per event rather than read from the pool: checkin fires before
+    the connection is actually back in the pool.
+    """
+    from sqlalchemy import event
+    
+    # QueuePool.size() is a method; SingletonThreadPool keeps size as a plain attribute
+    size = getattr(engine.pool, 'size', 0)
+    size = size() if callable(size) else size
+    checked_out = [0]
+    # Checkouts and checkins fire from every thread using the engine
+    lock = threading.Lock()
+    
+    def update(delta: int):
+        with lock:
+            checked_out[0] += delta
+            DB_POOL_CHECKED_OUT.set(checked_out[0])
+            DB_POOL_OVERFLOW.set(max(checked_out[0] - size, 0))
+    
+    event.listen(engine, 'checkout', lambda *args: update(1))
+    event.listen(engine, 'checkin', lambda *args: update(-1))
+
+
+def _registry() -> CollectorRegistry:
+    if not MULTIPROC_DIR:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render() -> Tuple[bytes, str]:
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+
+def start_exporter(port: int):
+    """Serve /metrics from a Celery worker; in multiprocess mode this covers its pool children."""
+    start_http_server(port, registry=_registry())
+    logger.info(f"Prometheus exporter listening on :{port}")
+
+
+def mark_process_dead(pid: int):
+    """Drop a finished worker child's live gauges from the multiprocess files."""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
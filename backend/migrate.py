@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Schema migrations (Alembic, see migrations/). Run `upgrade` once per deploy as
+the release step, before the new API and worker processes start; the API
+itself never changes the schema.
+
+    python migrate.py upgrade
+    python migrate.py upgrade --sql           # print the SQL instead of running it
+    python migrate.py status                  # exits 1 unless the database is at the latest revision
+    python migrate.py revision -m "add foo"   # autogenerate migrations/versions/0002_add_foo.py from models.py
+
+A database that create_all built before migrations existed is adopted on its
+first upgrade: missing tables, nullable columns and indexes are added, and it
+is stamped at the baseline revision. Rows it cannot fill with DDL are left to
+two documented data steps, `backfill.py run url_hash` and
+split_content_body.py; the upgrade lists the ones still needed and finishes
+the adoption when run again after them.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import logging
+from typing import Optional, List
+
+from alembic import command
+from alembic.config import Config
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text, Column, BigInteger
+
+from database import engine, Base, MIGRATION_LOCK_ID
+from partitions import is_partitioned
+from split_content_body import legacy_columns, uncopied_bodies
+import models  # noqa: F401 (registers the tables on Base.metadata)
+
+BASELINE = '0001'
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'alembic.ini')
+
+
+class MigrationError(Exception):
+    """The database can't be migrated until someone acts on the message."""
+
+
+def alembic_config() -> Config:
+    config = Config(ALEMBIC_INI)
+    # Keep the caller's logging setup rather than alembic.ini's
+    config.attributes['configure_logger'] = False
+    return config
+
+
+def current_revision() -> Optional[str]:
+    with engine.connect() as conn:
+        return MigrationContext.configure(conn).get_current_revision()
+
+
+def head_revision() -> str:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def pending_data_steps(conn) -> List[str]:
+    """Data steps a legacy database still needs before its schema can be finished."""
+    steps = []
+    if conn.execute(text("SELECT 1 FROM content WHERE url_hash IS NULL LIMIT 1")).first():
+        steps.append("python backfill.py run url_hash")
+    columns = legacy_columns(conn)
+    if columns and uncopied_bodies(conn, columns):
+        steps.append("python split_content_body.py --fill-missing")
+    return steps
+
+
+def finish_legacy_schema(conn, operations: Operations, partitioned: bool):
+    """Schema changes that wait for the data steps: drop the old body columns and URL index, require url_hash."""
+    columns = legacy_columns(conn)
+    for column in columns:
+        operations.drop_column('content', column)
+        print(f"✓ Dropped content.{column}")
+    if columns and conn.dialect.name == 'postgresql':
+        print("  Dropped columns keep their space until the table is rewritten (VACUUM FULL content or pg_repack)")
+    
+    inspector = inspect(conn)
+    url_hash = next(c for c in inspector.get_columns('content') if c['name'] == 'url_hash')
+    if url_hash['nullable'] and conn.dialect.name == 'postgresql':
+        operations.alter_column('content', 'url_hash', nullable=False, existing_type=BigInteger())
+        print("✓ content.url_hash set NOT NULL")
+    
+    if partitioned:
+        return
+    if 'ix_content_url' in {i['name'] for i in inspector.get_indexes('content')}:
+        operations.drop_index('ix_content_url', table_name='content')
+        print("✓ Dropped index ix_content_url")
+    if 'content_url_key' in {c['name'] for c in inspector.get_unique_constraints('content')}:
+        operations.drop_constraint('content_url_key', 'content', type_='unique')
+        print("✓ Dropped constraint content_url_key")
+
+
+def adopt_legacy() -> bool:
+    """Bring a database from before migrations up to the baseline schema; False if there is nothing to adopt."""
+    with engine.begin() as conn:
+        # The same lock as migrations/env.py, held until the stamp commits with the adopted schema
+        if conn.dialect.name == 'postgresql':
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': MIGRATION_LOCK_ID})
+        inspector = inspect(conn)
+        tables = set(inspector.get_table_names())
+        if 'content' not in tables or 'alembic_version' in tables:
+            return False
+        
+        print("Adopting a database created before migrations...")
+        operations = Operations(MigrationContext.configure(conn))
+        partitioned = is_partitioned(conn)
+        if 'url_hash' not in {c['name'] for c in inspector.get_columns('content')}:
+            # Nullable until the url_hash backfill has filled it
+            operations.add_column('content', Column('url_hash', BigInteger))
+            print("✓ Added content.url_hash")
+        
+        for table in Base.metadata.sorted_tables:
+            if table.name not in tables:
+                table.create(conn)
+                print(f"✓ Created {table.name}")
+                continue
+            
+            existing = {c['name'] for c in inspect(conn).get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable and column.server_default is None:
+                    raise MigrationError(f"{table.name}.{column.name} is missing and NOT NULL; it needs a data migration")
+                operations.add_column(table.name, column._copy())
+                print(f"✓ Added {table.name}.{column.name}")
+            
+            # The partitioned table's indexes are partition_content.py's
+            if table.name == 'content' and partitioned:
+                continue
+            indexes = {i['name'] for i in inspect(conn).get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(conn)
+                    print(f"✓ Created index {index.name}")
+        
+        pending = pending_data_steps(conn)
+        if not pending:
+            finish_legacy_schema(conn, operations, partitioned)
+            MigrationContext.configure(conn).stamp(ScriptDirectory.from_config(alembic_config()), BASELINE)
+            print(f"✓ Stamped the existing schema at revision {BASELINE}")
+    
+    # What was added above is committed; the data steps run against it
+    if pending:
+        raise MigrationError(
+            "Run these data steps, then upgrade again:\n" + '\n'.join(f"    {step}" for step in pending)
+        )
+    return True
+
+
+def upgrade(revision: str = 'head', sql: bool = False):
+    if sql:
+        command.upgrade(alembic_config(), revision, sql=True)
+        return
+    adopt_legacy()
+    command.upgrade(alembic_config(), revision)
+    print(f"✓ Database at revision {current_revision()}")
+
+
+def status() -> bool:
+    current, head = current_revision(), head_revision()
+    print(f"Database revision: {current or 'none'}, latest: {head}")
+    return current == head
+
+
+def revision(message: str):
+    config = alembic_config()
+    script = ScriptDirectory.from_config(config)
+    rev_id = f"{len(list(script.walk_revisions())) + 1:04d}"
+    command.revision(config, message=message, autogenerate=True, rev_id=rev_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply and create schema migrations")
+    sub = parser.add_subparsers(dest='command', required=True)
+    
+    upgrade_parser = sub.add_parser('upgrade', help="Migrate to the latest (or the given) revision")
+    upgrade_parser.add_argument('revision', nargs='?', default='head')
+    upgrade_parser.add_argument('--sql', action='store_true', help="Print the SQL instead of running it")
+    
+    sub.add_parser('status', help="Show the database and latest revisions")
+    
+    revision_parser = sub.add_parser('revision', help="Autogenerate a revision from the models")
+    revision_parser.add_argument('-m', '--message', required=True)
+    
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.command == 'upgrade':
+        try:
+            upgrade(args.revision, args.sql)
+        except MigrationError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+    elif args.command == 'status':
+        sys.exit(0 if status() else 1)
+    elif args.command == 'revision':
+        revision(args.message)
+
+
+if __name__ == "__main__":
+    main()
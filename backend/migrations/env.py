@@ -0,0 +1,58 @@
+"""Alembic environment. The URL and the target metadata come from database.py and models.py."""
+import os
+import sys
+from logging.config import fileConfig
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alembic import context
+from sqlalchemy import text
+
+from database import engine, Base, MIGRATION_LOCK_ID
+from partitions import is_partition_table
+import models  # noqa: F401 (registers the tables on Base.metadata)
+
+config = context.config
+if config.config_file_name and config.attributes.get('configure_logger', True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # Left to partition_content.py; autogenerate would otherwise drop them
+    if type_ == 'table' and reflected and compare_to is None and is_partition_table(name):
+        return False
+    return True
+
+
+def run_migrations_offline():
+    context.configure(
+        url=engine.url.render_as_string(hide_password=False),
+        target_metadata=Base.metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={'paramstyle': 'named'},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=Base.metadata,
+            include_object=include_object,
+            # Autogenerated ALTERs in batch blocks, which SQLite runs as a table
+            # rebuild, so revisions apply to local SQLite databases as well
+            render_as_batch=True,
+        )
+        with context.begin_transaction():
+            if connection.dialect.name == 'postgresql':
+                connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': MIGRATION_LOCK_ID})
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
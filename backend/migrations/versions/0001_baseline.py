@@ -0,0 +1,152 @@
+"""baseline: the full models.py schema when migrations were introduced
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+
+This is the current schema, not what create_all built for older databases.
+Those are brought up to it by migrate.py's adoption (new tables and columns,
+the url_hash and content_body data steps) and then stamped at this revision
+instead of running it.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'content',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('url', sa.String(length=2048), nullable=False),
+        sa.Column('url_hash', sa.BigInteger(), nullable=False),
+        sa.Column('title', sa.String(length=500), nullable=False),
+        sa.Column('source_name', sa.String(length=200), nullable=False),
+        sa.Column('content_type', sa.String(length=50), nullable=False),
+        sa.Column('published_date', sa.TIMESTAMP(), nullable=False),
+        sa.Column('fetched_date', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+        sa.Column('thumbnail_url', sa.String(length=2048), nullable=True),
+        sa.Column('thumbnail_key', sa.String(length=32), nullable=True),
+        sa.Column('thumbnail_width', sa.Integer(), nullable=True),
+        sa.Column('thumbnail_height', sa.Integer(), nullable=True),
+        sa.Column('thumbnail_blurhash', sa.String(length=64), nullable=True),
+        sa.Column('author', sa.String(length=200), nullable=True),
+        sa.Column('tags', sa.JSON(), nullable=True),
+        sa.Column('ai_summary', sa.Text(), nullable=True),
+        sa.Column('ai_summary_backend', sa.String(length=20), nullable=True),
+        sa.Column('simhash', sa.BigInteger(), nullable=True),
+        sa.Column('duplicate_of_id', sa.Integer(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_content_id', 'content', ['id'])
+    op.create_index('ix_content_content_type', 'content', ['content_type'])
+    op.create_index('ix_content_published_date', 'content', ['published_date'])
+    op.create_index('ix_content_duplicate_of_id', 'content', ['duplicate_of_id'])
+    op.create_index('idx_published_date', 'content', [sa.literal_column('published_date DESC')])
+    op.create_index('idx_content_type', 'content', ['content_type'])
+    op.create_index('idx_content_url_hash', 'content', ['url_hash'], unique=True)
+    
+    op.create_table(
+        'content_body',
+        sa.Column('content_id', sa.Integer(), nullable=False),
+        sa.Column('full_content', sa.Text(), nullable=True),
+        sa.Column('reader_mode_content', sa.Text(), nullable=True),
+        sa.Column('ai_key_points', sa.JSON(), nullable=True),
+        sa.ForeignKeyConstraint(['content_id'], ['content.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('content_id'),
+    )
+    
+    op.create_table(
+        'content_archives',
+        sa.Column('month', sa.String(length=7), nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=False),
+        sa.Column('codec', sa.String(length=10), nullable=False),
+        sa.Column('rows', sa.Integer(), nullable=False),
+        sa.Column('bytes', sa.BigInteger(), nullable=False),
+        sa.Column('frames', sa.JSON(), nullable=False),
+        sa.Column('archived_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('month'),
+    )
+    
+    op.create_table(
+        'content_simhash_bands',
+        sa.Column('content_id', sa.Integer(), nullable=False),
+        sa.Column('band', sa.Integer(), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['content_id'], ['content.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('content_id', 'band'),
+    )
+    op.create_index('idx_simhash_band_value', 'content_simhash_bands', ['band', 'value'])
+    
+    op.create_table(
+        'sources',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('url', sa.String(length=2048), nullable=False),
+        sa.Column('source_type', sa.String(length=50), nullable=False),
+        sa.Column('feed_url', sa.String(length=2048), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('last_fetched', sa.TIMESTAMP(), nullable=True),
+        sa.Column('fetch_interval_seconds', sa.Integer(), nullable=True),
+        sa.Column('next_fetch_at', sa.TIMESTAMP(), nullable=True),
+        sa.Column('items_per_hour', sa.Float(), nullable=True),
+        sa.Column('last_new_items', sa.Integer(), nullable=True),
+        sa.Column('consecutive_failures', sa.Integer(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_sources_id', 'sources', ['id'])
+    op.create_index('ix_sources_next_fetch_at', 'sources', ['next_fetch_at'])
+    
+    op.create_table(
+        'backfill_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('task', sa.String(length=100), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('params', sa.JSON(), nullable=True),
+        sa.Column('chunk_size', sa.Integer(), nullable=False),
+        sa.Column('dry_run', sa.Boolean(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+        sa.Column('finished_at', sa.TIMESTAMP(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_backfill_runs_id', 'backfill_runs', ['id'])
+    op.create_index('ix_backfill_runs_task', 'backfill_runs', ['task'])
+    
+    op.create_table(
+        'backfill_shards',
+        sa.Column('run_id', sa.Integer(), nullable=False),
+        sa.Column('shard', sa.Integer(), nullable=False),
+        sa.Column('start_id', sa.Integer(), nullable=False),
+        sa.Column('end_id', sa.Integer(), nullable=False),
+        sa.Column('last_id', sa.Integer(), nullable=False),
+        sa.Column('row_limit', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('processed', sa.Integer(), nullable=True),
+        sa.Column('updated', sa.Integer(), nullable=True),
+        sa.Column('deleted', sa.Integer(), nullable=True),
+        sa.Column('errors', sa.Integer(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['run_id'], ['backfill_runs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('run_id', 'shard'),
+    )
+
+
+def downgrade():
+    op.drop_table('backfill_shards')
+    op.drop_table('backfill_runs')
+    op.drop_table('sources')
+    op.drop_table('content_simhash_bands')
+    op.drop_table('content_archives')
+    op.drop_table('content_body')
+    op.drop_table('content')
@@ -1,31 +1,93 @@
-from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, Boolean, JSON, Index
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Text, TIMESTAMP, Boolean, JSON, Index, ForeignKey
+from sqlalchemy.ext.associationproxy import association_proxy
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
 
 
+def _body_proxy(column: str):
+    """content.<column> reads and writes content.body.<column>, creating the body row on first write."""
+    return association_proxy('body', column, creator=lambda value: ContentBody(**{column: value}))
+
+
 class Content(Base):
     __tablename__ = "content"
+    # On Postgres, partition_content.py turns this into monthly range partitions on
+    # published_date (see partitions.py); the primary key there is (id, published_date)
     
     id = Column(Integer, primary_key=True, index=True)
-    url = Column(String(2048), unique=True, nullable=False, index=True)
+    url = Column(String(2048), nullable=False)
+    # 64-bit hash of url; its unique index backs every existing-URL lookup (see url_keys)
+    url_hash = Column(BigInteger, nullable=False)
     title = Column(String(500), nullable=False)
     source_name = Column(String(200), nullable=False)
     content_type = Column(String(50), nullable=False, index=True)
     published_date = Column(TIMESTAMP, nullable=False, index=True)
     fetched_date = Column(TIMESTAMP, server_default=func.now())
     thumbnail_url = Column(String(2048))
+    # Set once the image proxy has rendered the thumbnail (see image_proxy); key names the variants
+    thumbnail_key = Column(String(32))
+    thumbnail_width = Column(Integer)
+    thumbnail_height = Column(Integer)
+    thumbnail_blurhash = Column(String(64))
     author = Column(String(200))
     tags = Column(JSON)
-    full_content = Column(Text)
-    reader_mode_content = Column(Text)
     ai_summary = Column(Text)
-    ai_key_points = Column(JSON)
+    ai_summary_backend = Column(String(20))
+    simhash = Column(BigInteger)
+    duplicate_of_id = Column(Integer, index=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(TIMESTAMP, server_default=func.now())
+    
+    # Article bodies live in content_body so feed and search scans only touch small rows;
+    # the body is loaded on first access (joinedload it on the detail path)
+    body = relationship('ContentBody', uselist=False, back_populates='content', cascade='all, delete-orphan', passive_deletes=True)
+    full_content = _body_proxy('full_content')
+    reader_mode_content = _body_proxy('reader_mode_content')
+    ai_key_points = _body_proxy('ai_key_points')
+
+
+class ContentBody(Base):
+    """The large, rarely read columns of a Content row, 1:1 by content_id."""
+    __tablename__ = "content_body"
+    
+    content_id = Column(Integer, ForeignKey('content.id', ondelete='CASCADE'), primary_key=True)
+    full_content = Column(Text)
+    reader_mode_content = Column(Text)
+    ai_key_points = Column(JSON)
+    
+    content = relationship('Content', back_populates='body')
+
+
+class ContentArchive(Base):
+    """Bodies of one published month, moved out of content_body into a compressed JSONL file; see archive.py."""
+    __tablename__ = "content_archives"
+    
+    month = Column(String(7), primary_key=True)
+    filename = Column(String(255), nullable=False)
+    codec = Column(String(10), nullable=False)
+    rows = Column(Integer, nullable=False)
+    bytes = Column(BigInteger, nullable=False)
+    # [first_id, last_id, offset, length] per compressed frame, ordered by id
+    frames = Column(JSON, nullable=False)
+    archived_at = Column(TIMESTAMP, server_default=func.now())
 
 
 Index('idx_published_date', Content.published_date.desc())
 Index('idx_content_type', Content.content_type)
+Index('idx_content_url_hash', Content.url_hash, unique=True)
+
+
+class SimhashBand(Base):
+    """LSH bands of Content.simhash, one row per band, for near-duplicate lookups."""
+    __tablename__ = "content_simhash_bands"
+    
+    content_id = Column(Integer, ForeignKey('content.id', ondelete='CASCADE'), primary_key=True)
+    band = Column(Integer, primary_key=True)
+    value = Column(Integer, nullable=False)
+
+
+Index('idx_simhash_band_value', SimhashBand.band, SimhashBand.value)
 
 
 class Source(Base):
@@ -38,5 +100,46 @@ class Source(Base):
     feed_url = Column(String(2048))
     is_active = Column(Boolean, default=True)
     last_fetched = Column(TIMESTAMP)
+    # Adaptive fetch schedule, maintained by scheduler.SourceScheduler
+    fetch_interval_seconds = Column(Integer)
+    next_fetch_at = Column(TIMESTAMP, index=True)
+    items_per_hour = Column(Float)
+    last_new_items = Column(Integer)
+    consecutive_failures = Column(Integer, default=0)
+    last_error = Column(Text)
     created_at = Column(TIMESTAMP, server_default=func.now())
 
+
+class BackfillRun(Base):
+    """One pass of a backfill task over the content table; see backfill.py."""
+    __tablename__ = "backfill_runs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    task = Column(String(100), nullable=False, index=True)
+    status = Column(String(20), nullable=False, default='pending')
+    params = Column(JSON)
+    chunk_size = Column(Integer, nullable=False)
+    dry_run = Column(Boolean, default=False)
+    error = Column(Text)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    finished_at = Column(TIMESTAMP)
+
+
+class BackfillShard(Base):
+    """A contiguous id range of a run, processed by one worker; last_id is its resume point."""
+    __tablename__ = "backfill_shards"
+    
+    run_id = Column(Integer, ForeignKey('backfill_runs.id', ondelete='CASCADE'), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    start_id = Column(Integer, nullable=False)
+    end_id = Column(Integer, nullable=False)
+    last_id = Column(Integer, nullable=False)
+    row_limit = Column(Integer)
+    status = Column(String(20), nullable=False, default='pending')
+    processed = Column(Integer, default=0)
+    updated = Column(Integer, default=0)
+    deleted = Column(Integer, default=0)
+    errors = Column(Integer, default=0)
+    last_error = Column(Text)
+    # Heartbeat: moves with every chunk commit; see backfill.claim_stale_run
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
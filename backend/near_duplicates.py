@@ -0,0 +1,164 @@
+import hashlib
+import logging
+import re
+from collections import Counter
+from typing import Optional, List, Dict, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from models import Content, SimhashBand
+
+logger = logging.getLogger(__name__)
+
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3
+
+# 4 bands of 16 bits: two fingerprints within MAX_DISTANCE bits must agree
+# exactly on at least one band, so band lookups never miss a near-duplicate
+# (outside buckets over MAX_BUCKET_SIZE, which are skipped).
+BANDS = 4
+BAND_BITS = 16
+MAX_DISTANCE = 3
+
+# Buckets this large mean a degenerate fingerprint (e.g. shared boilerplate);
+# comparing them would be quadratic and meaningless
+MAX_BUCKET_SIZE = 500
+
+# Stored in content.simhash for texts too short to fingerprint, so they are not re-read;
+# such rows get no band rows and never match
+NO_FINGERPRINT = 0
+
+# Short texts (teasers, title-only items) give unstable fingerprints
+MIN_WORDS = 50
+
+# Anything past this is never read
+MAX_SCAN_CHARS = 60000
+
+_WORD = re.compile(r"[a-z0-9]+")
+_BIT_POSITIONS = np.arange(SIMHASH_BITS, dtype=np.uint64)
+
+
+def _shingle_hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def simhash(text: Optional[str]) -> Optional[int]:
+    """64-bit SimHash over word 3-shingles, or None if the text is too short."""
+    if not text:
+        return None
+    
+    words = _WORD.findall(text[:MAX_SCAN_CHARS].lower())
+    if len(words) < MIN_WORDS:
+        return None
+    
+    counts = Counter(' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1))
+    hashes = np.fromiter((_shingle_hash(s) for s in counts), dtype=np.uint64, count=len(counts))
+    weights = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+    
+    bits = (hashes[:, None] >> _BIT_POSITIONS) & np.uint64(1)
+    votes = np.where(bits == 1, weights[:, None], -weights[:, None]).sum(axis=0)
+    
+    fingerprint = 0
+    for position in np.nonzero(votes > 0)[0]:
+        fingerprint |= 1 << int(position)
+    return fingerprint
+
+
+def to_signed(fingerprint: int) -> int:
+    """Fit an unsigned 64-bit fingerprint into a BIGINT column."""
+    return fingerprint - (1 << SIMHASH_BITS) if fingerprint >= 1 << (SIMHASH_BITS - 1) else fingerprint
+
+
+def to_unsigned(value: int) -> int:
+    return value & ((1 << SIMHASH_BITS) - 1)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(to_unsigned(a) ^ to_unsigned(b)).count('1')
+
+
+def bands(fingerprint: int) -> List[int]:
+    fingerprint = to_unsigned(fingerprint)
+    mask = (1 << BAND_BITS) - 1
+    return [(fingerprint >> (band * BAND_BITS)) & mask for band in range(BANDS)]
+
+
+def band_rows(content_id: int, fingerprint: int) -> List[SimhashBand]:
+    return [
+        SimhashBand(content_id=content_id, band=band, value=value)
+        for band, value in enumerate(bands(fingerprint))
+    ]
+
+
+def find_near_duplicate(db: Session, fingerprint: int) -> Optional[int]:
+    """Id of the closest stored article within MAX_DISTANCE bits, if any."""
+    best = None
+    for band, value in enumerate(bands(fingerprint)):
+        candidates = db.query(Content.id, Content.simhash).join(
+            SimhashBand, SimhashBand.content_id == Content.id
+        ).filter(
+            SimhashBand.band == band,
+            SimhashBand.value == value,
+            Content.is_active == True
+        ).limit(MAX_BUCKET_SIZE + 1).all()
+        if len(candidates) > MAX_BUCKET_SIZE:
+            logger.debug(f"Skipping oversized bucket {(band, value)}")
+            continue
+        
+        for content_id, stored in candidates:
+            if stored is None:
+                continue
+            distance = hamming_distance(fingerprint, stored)
+            if distance <= MAX_DISTANCE and (best is None or distance < best[0]):
+                best = (distance, content_id)
+    
+    return best[1] if best else None
+
+
+def match_pending(fingerprint: int, pending_simhashes: Dict[str, int]) -> Optional[str]:
+    """URL of a not-yet-stored item in the same batch that this one nearly duplicates."""
+    for url, other in pending_simhashes.items():
+        if hamming_distance(fingerprint, other) <= MAX_DISTANCE:
+            return url
+    return None
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent: Dict[int, int] = {}
+    
+    def find(self, x: int) -> int:
+        root = x
+        while self.parent.get(root, root) != root:
+            root = self.parent[root]
+        while x != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+    
+    def union(self, a: int, b: int):
+        self.parent.setdefault(a, a)
+        self.parent.setdefault(b, b)
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+    
+    def clusters(self) -> List[List[int]]:
+        groups: Dict[int, List[int]] = {}
+        for x in list(self.parent):
+            groups.setdefault(self.find(x), []).append(x)
+        return [sorted(g) for g in groups.values() if len(g) > 1]
+
+
+def bucket_pairs(bucket: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Pairs of content ids in one band bucket that are within MAX_DISTANCE bits."""
+    if len(bucket) < 2:
+        return []
+    
+    ids = np.array([content_id for content_id, _ in bucket])
+    hashes = np.array([to_unsigned(h) for _, h in bucket], dtype=np.uint64)
+    xor = hashes[:, None] ^ hashes[None, :]
+    distances = np.unpackbits(xor.view(np.uint8).reshape(len(bucket), len(bucket), 8), axis=2).sum(axis=2)
+    
+    left, right = np.nonzero(np.triu(distances <= MAX_DISTANCE, k=1))
+    return [(int(ids[a]), int(ids[b])) for a, b in zip(left, right)]
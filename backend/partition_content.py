@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Migration script that turns content into a table range-partitioned by
+published_date, one partition per month (Postgres only).
+
+Stop the Celery worker and beat first; they are the writers. The API keeps
+serving from the old table meanwhile. Rows are copied in id batches, one
+commit per batch, so the copy can be stopped and re-run. One short
+transaction then blocks writes, copies what arrived since and swaps the
+tables. The old table stays as content_unpartitioned until --drop-old.
+
+    python partition_content.py
+    python partition_content.py --status
+    python partition_content.py --ensure      # create upcoming partitions; Celery beat does this daily
+    python partition_content.py --drop-old
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+from database import engine
+from config import get_settings
+from partitions import (
+    DEFAULT_PARTITION, URL_KEYS_DDL, ROW_TRIGGER_DDL,
+    month_start, add_months, create_partition, ensure_partitions, is_partitioned, list_partitions,
+)
+
+# Built on the parent so every partition gets them; url_hash is no longer unique here (see content_url_keys)
+INDEXES = [
+    ('idx_published_date', 'published_date DESC'),
+    ('idx_content_type', 'content_type'),
+    ('ix_content_duplicate_of_id', 'duplicate_of_id'),
+    ('idx_content_url_hash', 'url_hash'),
+]
+
+COPY_ROWS = "INSERT INTO content_partitioned SELECT * FROM content WHERE id > :after AND id <= :end"
+COPY_KEYS = "INSERT INTO content_url_keys (url_hash, content_id) SELECT url_hash, id FROM content WHERE id > :after AND id <= :end"
+
+
+def create_table(conn, history_months: int):
+    oldest, newest = conn.execute(text("SELECT MIN(published_date), MAX(published_date) FROM content")).one()
+    current = month_start(datetime.now())
+    # Older rows go to the default partition instead of one nearly empty partition per month
+    first = max(month_start(oldest or current), add_months(current, -history_months))
+    last = min(month_start(newest or current), add_months(current, get_settings().content_partitions_ahead))
+    last = max(last, current)
+    
+    conn.execute(text("CREATE TABLE content_partitioned (LIKE content INCLUDING DEFAULTS) PARTITION BY RANGE (published_date)"))
+    conn.execute(text("ALTER TABLE content_partitioned ADD CONSTRAINT content_partitioned_pkey PRIMARY KEY (id, published_date)"))
+    for name, columns in INDEXES:
+        conn.execute(text(f"CREATE INDEX {name}_partitioned ON content_partitioned ({columns})"))
+    
+    month = first
+    while month <= last:
+        create_partition(conn, month, parent='content_partitioned')
+        month = add_months(month, 1)
+    conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF content_partitioned DEFAULT"))
+    conn.execute(text(URL_KEYS_DDL))
+    conn.commit()
+    print(f"✓ Created content_partitioned with partitions {first:%Y-%m} to {last:%Y-%m} and {DEFAULT_PARTITION}")
+
+
+def copy_rows(conn, batch_size: int) -> int:
+    after = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM content_partitioned")).scalar()
+    copied = 0
+    started = time.perf_counter()
+    while True:
+        end = conn.execute(
+            text("SELECT id FROM content WHERE id > :after ORDER BY id LIMIT 1 OFFSET :offset"),
+            {'after': after, 'offset': batch_size - 1}
+        ).scalar()
+        if end is None:
+            end = conn.execute(text("SELECT MAX(id) FROM content WHERE id > :after"), {'after': after}).scalar()
+            if end is None:
+                break
+        copied += conn.execute(text(COPY_ROWS), {'after': after, 'end': end}).rowcount
+        conn.execute(text(COPY_KEYS), {'after': after, 'end': end})
+        conn.commit()
+        after = end
+        print(f"\r  through id {end}: {copied} copied ({time.perf_counter() - started:.0f}s)", end='', flush=True)
+    print(f"\n✓ Copied {copied} rows")
+    return copied
+
+
+def swap_tables(conn):
+    conn.execute(text("SET LOCAL lock_timeout = '10s'"))
+    conn.execute(text("LOCK TABLE content IN EXCLUSIVE MODE"))
+    after = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM content_partitioned")).scalar()
+    end = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM content")).scalar()
+    late = conn.execute(text(COPY_ROWS), {'after': after, 'end': end}).rowcount
+    conn.execute(text(COPY_KEYS), {'after': after, 'end': end})
+    
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence('content', 'id')")).scalar()
+    foreign_keys = conn.execute(text(
+        "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+        "WHERE contype = 'f' AND confrelid = 'content'::regclass"
+    )).all()
+    for table, constraint in foreign_keys:
+        conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT {constraint}"))
+    old_indexes = conn.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = 'content'"
+    )).scalars().all()
+    
+    conn.execute(text("ALTER TABLE content RENAME TO content_unpartitioned"))
+    for index in old_indexes:
+        conn.execute(text(f"ALTER INDEX {index} RENAME TO {index}_unpartitioned"))
+    conn.execute(text("ALTER TABLE content_partitioned RENAME TO content"))
+    conn.execute(text("ALTER INDEX content_partitioned_pkey RENAME TO content_pkey"))
+    for name, _ in INDEXES:
+        conn.execute(text(f"ALTER INDEX {name}_partitioned RENAME TO {name}"))
+    if sequence:
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY content.id"))
+    
+    conn.execute(text(ROW_TRIGGER_DDL))
+    conn.execute(text(
+        "CREATE TRIGGER content_row_changed AFTER INSERT OR UPDATE OR DELETE ON content "
+        "FOR EACH ROW EXECUTE FUNCTION content_row_changed()"
+    ))
+    conn.commit()
+    print(f"✓ Swapped in the partitioned table ({late} late rows copied, "
+          f"{len(foreign_keys)} foreign keys replaced by the content_row_changed trigger)")
+
+
+def partition_content(batch_size: int, history_months: int):
+    if engine.dialect.name != 'postgresql':
+        print("✗ Partitioning needs Postgres")
+        sys.exit(1)
+    with engine.connect() as conn:
+        if is_partitioned(conn):
+            print("⊘ content is already partitioned")
+            return
+        if conn.execute(text("SELECT to_regclass('content_partitioned')")).scalar():
+            print("⊘ content_partitioned exists; resuming the copy")
+        else:
+            create_table(conn, history_months)
+        copy_rows(conn, batch_size)
+        try:
+            swap_tables(conn)
+        except Exception as e:
+            conn.rollback()
+            print(f"✗ Swap failed, nothing changed; run the script again: {e}")
+            sys.exit(1)
+    
+    ensure_partitions(engine)
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE content"))
+        conn.commit()
+    print("✓ content is partitioned by month; drop content_unpartitioned with --drop-old once verified")
+
+
+def print_status():
+    with engine.connect() as conn:
+        partitions = list_partitions(conn)
+    if not partitions:
+        print("content is not partitioned")
+        return
+    for p in partitions:
+        print(f"  {p['name']:<20} {p['approx_rows']:>10} rows {p['bytes'] / 1e6:>9.1f} MB  "
+              f"{p['tablespace']:<12} {p['bounds']}")
+
+
+def drop_old():
+    with engine.connect() as conn:
+        if not conn.execute(text("SELECT to_regclass('content_unpartitioned')")).scalar():
+            print("⊘ content_unpartitioned already dropped")
+            return
+        conn.execute(text("DROP TABLE content_unpartitioned"))
+        conn.commit()
+    print("✓ Dropped content_unpartitioned")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Partition content by published_date month")
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--history-months', type=int, default=36,
+                        help="Months before this go to the default partition")
+    parser.add_argument('--status', action='store_true', help="List partitions")
+    parser.add_argument('--ensure', action='store_true', help="Create the current and upcoming partitions")
+    parser.add_argument('--drop-old', action='store_true', help="Drop the old unpartitioned table")
+    args = parser.parse_args()
+    
+    if args.status:
+        print_status()
+    elif args.ensure:
+        created = ensure_partitions(engine)
+        print(f"✓ Created {', '.join(created)}" if created else "⊘ Partitions already exist")
+    elif args.drop_old:
+        drop_old()
+    else:
+        print("Partitioning content by month...")
+        partition_content(args.batch_size, args.history_months)
@@ -0,0 +1,164 @@
+import logging
+from datetime import date, datetime
+from typing import Optional, List, Dict
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Rows outside every monthly partition (older than the first one) land here
+DEFAULT_PARTITION = "content_default"
+
+# A partitioned table can only enforce uniqueness per partition, so url_hash
+# uniqueness moves to this key table, kept in step by the content_row_changed trigger
+URL_KEYS_DDL = """
+CREATE TABLE IF NOT EXISTS content_url_keys (
+    url_hash BIGINT PRIMARY KEY,
+    content_id INTEGER NOT NULL
+)
+"""
+
+# Also replaces the ON DELETE CASCADE of the foreign keys into content,
+# which cannot reference a table partitioned on published_date by id alone
+ROW_TRIGGER_DDL = """
+CREATE OR REPLACE FUNCTION content_row_changed() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        -- Updating published_date moves the row to another partition as a delete plus an insert
+        IF EXISTS (SELECT 1 FROM content WHERE id = OLD.id) THEN
+            RETURN NULL;
+        END IF;
+        DELETE FROM content_url_keys WHERE url_hash = OLD.url_hash AND content_id = OLD.id;
+        DELETE FROM content_body WHERE content_id = OLD.id;
+        DELETE FROM content_simhash_bands WHERE content_id = OLD.id;
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'UPDATE' THEN
+        IF NEW.url_hash = OLD.url_hash AND NEW.id = OLD.id THEN
+            RETURN NULL;
+        END IF;
+        DELETE FROM content_url_keys WHERE url_hash = OLD.url_hash AND content_id = OLD.id;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM content_url_keys WHERE url_hash = NEW.url_hash AND content_id = NEW.id) THEN
+        INSERT INTO content_url_keys (url_hash, content_id) VALUES (NEW.url_hash, NEW.id);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"content_p{month:%Y_%m}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    """Inverse of partition_name; None for the default partition."""
+    try:
+        return datetime.strptime(name, "content_p%Y_%m").date()
+    except ValueError:
+        return None
+
+
+def is_partition_table(name: str) -> bool:
+    """Tables that partition_content.py and ensure_partitions create and drop, outside the migrations."""
+    return partition_month(name) is not None or name in (
+        DEFAULT_PARTITION, 'content_url_keys', 'content_partitioned', 'content_unpartitioned'
+    )
+
+
+def is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name != 'postgresql':
+        return False
+    return bool(conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('content'))"
+    )).scalar())
+
+
+def list_partitions(conn: Connection) -> List[Dict]:
+    if not is_partitioned(conn):
+        return []
+    rows = conn.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) AS bounds, c.reltuples, "
+        "pg_total_relation_size(c.oid) AS bytes, t.spcname "
+        "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "LEFT JOIN pg_tablespace t ON t.oid = c.reltablespace "
+        "WHERE i.inhparent = 'content'::regclass ORDER BY c.relname"
+    )).all()
+    return [
+        {
+            'name': row.relname,
+            'bounds': row.bounds,
+            'approx_rows': max(int(row.reltuples), 0),
+            'bytes': row.bytes,
+            'tablespace': row.spcname or 'default',
+        }
+        for row in rows
+    ]
+
+
+def create_partition(conn: Connection, month: date, parent: str = 'content') -> bool:
+    """Create the partition for month unless it exists; returns True if it was created.
+
+    The table is created on its own and then attached: ATTACH PARTITION only
+    takes a SHARE UPDATE EXCLUSIVE lock on the parent, where CREATE TABLE ...
+    PARTITION OF would block every feed query until it got its lock. It still
+    needs the default partition to itself, for at most the lock timeout.
+    """
+    name = partition_name(month)
+    if conn.execute(text("SELECT to_regclass(:name)"), {'name': name}).scalar():
+        return False
+    conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {parent} INCLUDING DEFAULTS)"))
+    conn.execute(text(
+        f"ALTER TABLE {parent} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    ))
+    return True
+
+
+def ensure_partitions(engine: Engine, months_ahead: Optional[int] = None, today: Optional[date] = None) -> List[str]:
+    """Create the current month's partition and months_ahead more; a no-op unless content is partitioned.
+
+    A month whose rows already sit in the default partition (dates far in the
+    future, or a schedule that stopped for months) cannot be created on top of
+    them; it is logged and skipped, and the rows stay readable in the default
+    partition. So is a month whose locks timed out; the next daily run retries.
+    """
+    months_ahead = get_settings().content_partitions_ahead if months_ahead is None else months_ahead
+    current = month_start(today or datetime.now())
+    created = []
+    with engine.connect() as conn:
+        if not is_partitioned(conn):
+            return created
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            try:
+                if create_partition(conn, month):
+                    created.append(partition_name(month))
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Could not create partition {partition_name(month)}: {str(e)}")
+    if created:
+        logger.info(f"Created content partitions {', '.join(created)}")
+    return created
+
+
+def move_to_tablespace(conn: Connection, name: str, tablespace: str):
+    """Move a partition and its indexes; rewrites them under an exclusive lock on that partition only."""
+    conn.execute(text(f"ALTER TABLE {name} SET TABLESPACE {tablespace}"))
+    for (index,) in conn.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = :name"), {'name': name}):
+        conn.execute(text(f"ALTER INDEX {index} SET TABLESPACE {tablespace}"))
@@ -6,9 +6,9 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def initialize_railway_db():
-    logger.info("Initializing database...")
+    logger.info("Migrating database...")
     init_db()
-    logger.info("Database tables created")
+    logger.info("Database schema up to date")
     
     logger.info("Seeding sources...")
     seed_sources()
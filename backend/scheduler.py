@@ -0,0 +1,154 @@
+import logging
+import math
+import random
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from config import get_settings
+from models import Source
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Fetch often enough to see about this many new items per fetch
+TARGET_ITEMS_PER_FETCH = 3
+
+# items_per_hour is an exponentially weighted average over time: an observation
+# covering this many seconds carries ~63% of the weight, so a fetch shortly after
+# another barely moves the estimate
+RATE_TIMESCALE_SECONDS = 6 * 3600
+
+# +/- fraction applied to every delay so sources drift apart instead of firing together
+JITTER = 0.1
+
+# Gaps shorter than this say little about a publish rate
+MIN_OBSERVATION_SECONDS = 60
+
+# A claimed source is not due again until its fetch reports back or this runs out
+DISPATCH_LEASE = timedelta(minutes=30)
+
+MAX_DISPATCH_PER_TICK = 50
+
+
+class SourceScheduler:
+    @staticmethod
+    def update_rate(previous: Optional[float], new_items: int, elapsed_seconds: float) -> float:
+        elapsed_seconds = max(elapsed_seconds, MIN_OBSERVATION_SECONDS)
+        if previous is None:
+            # Until observed, assume the rate the default interval is sized for
+            previous = TARGET_ITEMS_PER_FETCH * 3600 / settings.scheduler_default_interval_seconds
+        observed = new_items / (elapsed_seconds / 3600)
+        weight = 1 - math.exp(-elapsed_seconds / RATE_TIMESCALE_SECONDS)
+        return weight * observed + (1 - weight) * previous
+    
+    @staticmethod
+    def clamp_interval(seconds: float) -> int:
+        return int(min(max(seconds, settings.scheduler_min_interval_seconds), settings.scheduler_max_interval_seconds))
+    
+    @staticmethod
+    def interval_for_rate(items_per_hour: Optional[float]) -> int:
+        if items_per_hour is None:
+            return settings.scheduler_default_interval_seconds
+        if items_per_hour <= 0:
+            return settings.scheduler_max_interval_seconds
+        return SourceScheduler.clamp_interval(TARGET_ITEMS_PER_FETCH / items_per_hour * 3600)
+    
+    @staticmethod
+    def jittered(seconds: float) -> timedelta:
+        return timedelta(seconds=seconds * random.uniform(1 - JITTER, 1 + JITTER))
+    
+    @staticmethod
+    def record_success(source: Source, fetched: int, new_items: int, now: Optional[datetime] = None):
+        """Fold a fetch's new-item count into the source's rate and schedule its next fetch.
+
+        The first fetch only establishes a baseline: it returns the feed's
+        backlog, not what was published since a previous fetch.
+        """
+        now = now or datetime.now()
+        
+        if source.last_fetched is not None:
+            elapsed = (now - source.last_fetched).total_seconds()
+            source.items_per_hour = SourceScheduler.update_rate(source.items_per_hour, new_items, elapsed)
+            interval = SourceScheduler.interval_for_rate(source.items_per_hour)
+            if fetched and new_items >= fetched:
+                # Every item was new, so the feed window may have dropped some: catch up faster
+                interval = SourceScheduler.clamp_interval(
+                    min(interval, (source.fetch_interval_seconds or interval) / 2)
+                )
+        else:
+            interval = SourceScheduler.interval_for_rate(source.items_per_hour)
+        
+        source.fetch_interval_seconds = interval
+        source.last_fetched = now
+        source.last_new_items = new_items
+        source.consecutive_failures = 0
+        source.last_error = None
+        source.next_fetch_at = now + SourceScheduler.jittered(interval)
+    
+    @staticmethod
+    def record_failure(source: Source, error: str, now: Optional[datetime] = None):
+        """Back off exponentially from the learned interval; last_fetched is left alone."""
+        now = now or datetime.now()
+        source.consecutive_failures = (source.consecutive_failures or 0) + 1
+        source.last_error = error[:1000]
+        
+        base = source.fetch_interval_seconds or settings.scheduler_default_interval_seconds
+        delay = min(base * 2 ** min(source.consecutive_failures, 10), settings.scheduler_max_interval_seconds)
+        source.next_fetch_at = now + SourceScheduler.jittered(delay)
+    
+    @staticmethod
+    def claim_due(db: Session, now: Optional[datetime] = None, limit: int = MAX_DISPATCH_PER_TICK) -> List[int]:
+        """Return the ids of due sources, pushing their next_fetch_at out by DISPATCH_LEASE."""
+        now = now or datetime.now()
+        due = db.execute(
+            select(Source.id)
+            .where(
+                Source.is_active == True,
+                (Source.next_fetch_at == None) | (Source.next_fetch_at <= now)
+            )
+            .order_by(Source.next_fetch_at.asc().nullsfirst())
+            .limit(limit)
+        ).scalars().all()
+        
+        if due:
+            db.execute(
+                update(Source).where(Source.id.in_(due)).values(next_fetch_at=now + DISPATCH_LEASE)
+            )
+            db.commit()
+        return list(due)
+    
+    @staticmethod
+    def schedule_state(source: Source) -> Dict:
+        return {
+            'id': source.id,
+            'name': source.name,
+            'is_active': source.is_active,
+            'fetch_interval_seconds': source.fetch_interval_seconds,
+            'next_fetch_at': source.next_fetch_at.isoformat() if source.next_fetch_at else None,
+            'last_fetched': source.last_fetched.isoformat() if source.last_fetched else None,
+            'items_per_hour': round(source.items_per_hour, 3) if source.items_per_hour is not None else None,
+            'last_new_items': source.last_new_items,
+            'consecutive_failures': source.consecutive_failures or 0,
+            'last_error': source.last_error,
+        }
+
+
+def dispatch_due_sources() -> Dict:
+    """Beat tick: queue a fetch_source_task for every source that is due."""
+    from database import SessionLocal
+    from celery_app import celery_app
+    
+    db = SessionLocal()
+    try:
+        source_ids = SourceScheduler.claim_due(db)
+    finally:
+        db.close()
+    
+    for source_id in source_ids:
+        celery_app.send_task('celery_app.fetch_source_task', args=[source_id])
+    if source_ids:
+        logger.info(f"Dispatched {len(source_ids)} due source(s)")
+    return {'dispatched': source_ids}
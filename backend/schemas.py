@@ -1,4 +1,4 @@
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, HttpUrl, Field, computed_field
 from typing import Optional, List
 from datetime import datetime
 
@@ -24,6 +24,18 @@ class ContentResponse(ContentBase):
     fetched_date: datetime
     created_at: datetime
     ai_summary: Optional[str] = None
+    thumbnail_width: Optional[int] = None
+    thumbnail_height: Optional[int] = None
+    thumbnail_blurhash: Optional[str] = None
+    thumbnail_key: Optional[str] = Field(default=None, exclude=True)
+    
+    @computed_field
+    @property
+    def thumbnail_proxy_url(self) -> Optional[str]:
+        """Append a variant such as /320.webp; see image_proxy.WIDTHS."""
+        if not self.thumbnail_key:
+            return None
+        return f"/api/thumbnails/{self.id}/{self.thumbnail_key}"
     
     class Config:
         from_attributes = True
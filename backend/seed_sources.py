@@ -1,4 +1,4 @@
-from database import SessionLocal, init_db
+from database import SessionLocal
 from models import Source
 import logging
 
@@ -7,7 +7,6 @@ logger = logging.getLogger(__name__)
 
 
 def seed_sources():
-    init_db()
     db = SessionLocal()
     
     sources = [
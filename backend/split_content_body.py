@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Data step for the content_body split, the one data migration that runs
+outside Alembic. On a database from before migrations, `migrate.py upgrade`
+creates content_body; this script copies full_content, reader_mode_content
+and ai_key_points into it in id batches, one commit per batch, so it can be
+stopped and re-run at any point. The next upgrade drops the old columns once
+every body has been copied.
+
+    python split_content_body.py
+    python split_content_body.py --fill-missing     # also copy values old code wrote to already-copied rows
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import time
+from typing import Optional
+
+from sqlalchemy import text, inspect
+from database import engine
+
+BODY_COLUMNS = ['full_content', 'reader_mode_content', 'ai_key_points']
+
+
+def legacy_columns(bind) -> list:
+    existing = {c['name'] for c in inspect(bind).get_columns('content')}
+    return [c for c in BODY_COLUMNS if c in existing]
+
+
+def uncopied_bodies(conn, columns: list) -> int:
+    """Rows with a body in content but no content_body row."""
+    return conn.execute(text(
+        "SELECT COUNT(*) FROM content c WHERE NOT EXISTS "
+        "(SELECT 1 FROM content_body b WHERE b.content_id = c.id) AND ("
+        + ' OR '.join(f"c.{c} IS NOT NULL" for c in columns) + ")"
+    )).scalar()
+
+
+def batch_end(conn, after: int, batch_size: int) -> Optional[int]:
+    """Id of the batch_size-th row after `after` (or the last id), so batches stay even on sparse ids."""
+    end = conn.execute(
+        text("SELECT id FROM content WHERE id > :after ORDER BY id LIMIT 1 OFFSET :offset"),
+        {'after': after, 'offset': batch_size - 1}
+    ).scalar()
+    if end is None:
+        end = conn.execute(text("SELECT MAX(id) FROM content WHERE id > :after"), {'after': after}).scalar()
+    return end
+
+
+def copy_bodies(batch_size: int, fill_missing: bool):
+    if 'content_body' not in inspect(engine).get_table_names():
+        print("✗ content_body does not exist; run migrate.py upgrade first")
+        sys.exit(1)
+    
+    columns = legacy_columns(engine)
+    if not columns:
+        print("⊘ content has no body columns left; nothing to copy")
+        return
+    column_list = ', '.join(columns)
+    insert = text(
+        f"INSERT INTO content_body (content_id, {column_list}) "
+        f"SELECT c.id, {', '.join(f'c.{c}' for c in columns)} FROM content c "
+        f"WHERE c.id > :after AND c.id <= :end "
+        f"AND NOT EXISTS (SELECT 1 FROM content_body b WHERE b.content_id = c.id)"
+    )
+    # Only fills empty body values; COALESCE keeps anything already written through content_body
+    fill = text(
+        "UPDATE content_body SET "
+        + ', '.join(
+            f"{c} = COALESCE({c}, (SELECT c.{c} FROM content c WHERE c.id = content_body.content_id))"
+            for c in columns
+        )
+        + " WHERE content_id > :after AND content_id <= :end AND ("
+        + ' OR '.join(f"{c} IS NULL" for c in columns) + ")"
+    )
+    
+    started = time.perf_counter()
+    copied = filled = 0
+    after = 0
+    with engine.connect() as conn:
+        while True:
+            end = batch_end(conn, after, batch_size)
+            if end is None:
+                break
+            copied += conn.execute(insert, {'after': after, 'end': end}).rowcount
+            if fill_missing:
+                filled += conn.execute(fill, {'after': after, 'end': end}).rowcount
+            conn.commit()
+            after = end
+            print(f"\r  through id {end}: {copied} copied, {filled} filled "
+                  f"({time.perf_counter() - started:.0f}s)", end='', flush=True)
+    print(f"\n✓ Copied {copied} bodies" + (f", filled {filled}" if fill_missing else ''))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move article bodies into content_body")
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--fill-missing', action='store_true',
+                        help="Also fill empty body values of copied rows from content")
+    args = parser.parse_args()
+    
+    print("Copying article bodies into content_body...")
+    copy_bodies(args.batch_size, args.fill_missing)
@@ -0,0 +1,259 @@
+import json
+import logging
+import threading
+import time
+from collections import deque, defaultdict
+from typing import Optional, Dict
+
+from config import get_settings
+from metrics import (
+    SUMMARIZER_CALL_SECONDS, SUMMARIZER_CALLS, SUMMARIZER_RETRIES, SUMMARIZER_TOKENS,
+    SUMMARIZER_COST_USD, SUMMARIZER_PARSE_FAILURES,
+)
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY = "summarizer_metrics:stats"
+LAST_RUN_KEY = "summarizer_metrics:last_run"
+
+# USD per million (prompt, completion) tokens
+MODEL_PRICING = {
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+# Paths a summary request can take
+PATHS = ('full', 'title', 'batch', 'local')
+
+LATENCY_SAMPLES = 2000
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    prompt_price, completion_price = MODEL_PRICING.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def _percentile(samples, q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _Counters:
+    def __init__(self):
+        self.started_at = time.time()
+        self.values = defaultdict(float)
+        self.latencies = defaultdict(lambda: deque(maxlen=LATENCY_SAMPLES))
+    
+    def add(self, field: str, amount: float = 1):
+        self.values[field] += amount
+    
+    def summary(self) -> Dict:
+        values = dict(self.values)
+        paths = {}
+        for path in PATHS:
+            calls = int(values.get(f'{path}:calls', 0))
+            hits = int(values.get(f'{path}:cache_hits', 0))
+            misses = int(values.get(f'{path}:cache_misses', 0))
+            if not (calls or hits or misses):
+                continue
+            latencies = self.latencies[path]
+            paths[path] = {
+                'calls': calls,
+                'errors': int(values.get(f'{path}:errors', 0)),
+                'retries': int(values.get(f'{path}:retries', 0)),
+                'parse_failures': int(values.get(f'{path}:parse_failures', 0)),
+                'cache_hits': hits,
+                'cache_misses': misses,
+                'prompt_tokens': int(values.get(f'{path}:prompt_tokens', 0)),
+                'completion_tokens': int(values.get(f'{path}:completion_tokens', 0)),
+                'latency_ms_avg': round(values.get(f'{path}:latency_ms', 0) / calls, 1) if calls else 0.0,
+                'latency_ms_p50': round(_percentile(latencies, 0.5), 1),
+                'latency_ms_p95': round(_percentile(latencies, 0.95), 1),
+            }
+        
+        models = {
+            field.split(':', 2)[1]: int(count)
+            for field, count in values.items() if field.startswith('model:') and field.endswith(':calls')
+        }
+        
+        return {
+            'started_at': self.started_at,
+            'elapsed_seconds': round(time.time() - self.started_at, 1),
+            'calls': sum(p['calls'] for p in paths.values()),
+            'prompt_tokens': sum(p['prompt_tokens'] for p in paths.values()),
+            'completion_tokens': sum(p['completion_tokens'] for p in paths.values()),
+            'cost_usd': round(values.get('cost_usd', 0.0), 6),
+            'llm_seconds': round(values.get('llm_ms', 0.0) / 1000, 2),
+            'models': models,
+            'paths': paths,
+        }
+
+
+class SummarizerMetrics:
+    """Per-call summarizer metrics: latency, tokens, cost, cache use, retries, parse failures.
+
+    Totals are kept per process and mirrored to a Redis hash so the API can
+    report what the Celery workers spent. A run (one ingest pass) gets its own
+    counters, summarized by finish_run().
+    """
+    
+    def __init__(self, redis_url: str):
+        self.redis_url = redis_url
+        self._redis = None
+        self._redis_failed_at = 0.0
+        self._lock = threading.Lock()
+        self._totals = _Counters()
+        self._run: Optional[_Counters] = None
+        self._last_run: Optional[Dict] = None
+    
+    def _get_redis(self):
+        if self._redis is not None:
+            return self._redis
+        if time.time() - self._redis_failed_at < 60:
+            return None
+        try:
+            import redis
+            client = redis.Redis.from_url(self.redis_url, socket_timeout=1, socket_connect_timeout=1)
+            client.ping()
+            self._redis = client
+            return client
+        except Exception as e:
+            logger.warning(f"Summarizer metrics are process-local only: {str(e)}")
+            self._redis_failed_at = time.time()
+            return None
+    
+    def _add(self, fields: Dict[str, float], path: Optional[str] = None, latency_ms: Optional[float] = None):
+        with self._lock:
+            for counters in (self._totals, self._run):
+                if counters is None:
+                    continue
+                for field, amount in fields.items():
+                    counters.add(field, amount)
+                if latency_ms is not None:
+                    counters.latencies[path].append(latency_ms)
+        
+        client = self._get_redis()
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                for field, amount in fields.items():
+                    pipe.hincrbyfloat(STATS_KEY, field, amount)
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"Summarizer metrics Redis error: {str(e)}")
+                self._redis = None
+                self._redis_failed_at = time.time()
+    
+    def record_call(
+        self,
+        path: str,
+        model: str,
+        latency_ms: float,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        retries: int = 0,
+        error: bool = False
+    ):
+        """One model request, including its retries. latency_ms is wall time across all attempts."""
+        cost = estimate_cost(model, prompt_tokens, completion_tokens)
+        SUMMARIZER_CALL_SECONDS.labels(path, model).observe(latency_ms / 1000)
+        SUMMARIZER_CALLS.labels(path, model, 'error' if error else 'ok').inc()
+        if retries:
+            SUMMARIZER_RETRIES.labels(path).inc(retries)
+        if prompt_tokens:
+            SUMMARIZER_TOKENS.labels(path, model, 'prompt').inc(prompt_tokens)
+        if completion_tokens:
+            SUMMARIZER_TOKENS.labels(path, model, 'completion').inc(completion_tokens)
+        if cost:
+            SUMMARIZER_COST_USD.labels(model).inc(cost)
+        
+        self._add({
+            f'{path}:calls': 1,
+            f'{path}:errors': 1 if error else 0,
+            f'{path}:retries': retries,
+            f'{path}:prompt_tokens': prompt_tokens,
+            f'{path}:completion_tokens': completion_tokens,
+            f'{path}:latency_ms': latency_ms,
+            f'model:{model}:calls': 1,
+            'llm_ms': latency_ms if path != 'local' else 0,
+            'cost_usd': cost,
+        }, path, latency_ms)
+    
+    def record_cache(self, path: str, hit: bool):
+        self._add({f'{path}:cache_hits' if hit else f'{path}:cache_misses': 1})
+    
+    def record_parse_failure(self, path: str, count: int = 1):
+        SUMMARIZER_PARSE_FAILURES.labels(path).inc(count)
+        self._add({f'{path}:parse_failures': count})
+    
+    def start_run(self):
+        with self._lock:
+            self._run = _Counters()
+    
+    def finish_run(self) -> Dict:
+        with self._lock:
+            run, self._run = self._run, None
+        if run is None:
+            return {}
+        
+        summary = run.summary()
+        summary['finished_at'] = time.time()
+        self._last_run = summary
+        
+        client = self._get_redis()
+        if client is not None:
+            try:
+                client.set(LAST_RUN_KEY, json.dumps(summary))
+            except Exception:
+                pass
+        
+        return summary
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            result = {'process': self._totals.summary(), 'last_run': self._last_run}
+        
+        client = self._get_redis()
+        if client is not None:
+            try:
+                shared = _Counters()
+                for field, amount in client.hgetall(STATS_KEY).items():
+                    shared.add(field.decode(), float(amount))
+                shared_summary = shared.summary()
+                # Latency percentiles are only known per process
+                for path in shared_summary['paths'].values():
+                    path.pop('latency_ms_p50')
+                    path.pop('latency_ms_p95')
+                shared_summary.pop('started_at')
+                shared_summary.pop('elapsed_seconds')
+                result['shared'] = shared_summary
+                
+                last_run = client.get(LAST_RUN_KEY)
+                if last_run:
+                    result['last_run'] = json.loads(last_run)
+            except Exception as e:
+                logger.warning(f"Summarizer metrics Redis error: {str(e)}")
+                self._redis = None
+                self._redis_failed_at = time.time()
+        
+        return result
+
+
+def format_run_summary(summary: Dict) -> str:
+    parts = [
+        f"{summary.get('calls', 0)} calls",
+        f"{summary.get('prompt_tokens', 0)}+{summary.get('completion_tokens', 0)} tokens",
+        f"${summary.get('cost_usd', 0.0):.4f}",
+        f"{summary.get('llm_seconds', 0.0)}s in model calls",
+    ]
+    for path, p in summary.get('paths', {}).items():
+        parts.append(
+            f"{path}: {p['calls']} calls, {p['cache_hits']}/{p['cache_hits'] + p['cache_misses']} cache hits, "
+            f"{p['retries']} retries, {p['parse_failures']} parse failures, {p['errors']} errors, "
+            f"p50 {p['latency_ms_p50']}ms p95 {p['latency_ms_p95']}ms"
+        )
+    return "; ".join(parts)
+
+
+summarizer_metrics = SummarizerMetrics(get_settings().redis_url)
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, List, Tuple, Dict
+
+from config import get_settings
+from metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "summary_cache:"
+STATS_KEY = "summary_cache:stats"
+
+
+class SummaryCache:
+    """Content-hash keyed cache for AI summaries.
+
+    Entries live in Redis with a sliding TTL (refreshed on every hit, so
+    cold entries expire first). If Redis is unreachable the cache falls back
+    to a bounded in-process LRU so ingest keeps working.
+    """
+    
+    def __init__(self, redis_url: str, ttl_seconds: int, max_local_entries: int, enabled: bool = True):
+        self.redis_url = redis_url
+        self.ttl_seconds = ttl_seconds
+        self.max_local_entries = max_local_entries
+        self.enabled = enabled
+        self._redis = None
+        self._redis_failed_at = 0.0
+        self._local: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+    
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        return re.sub(r'\s+', ' ', text or '').strip().casefold()
+    
+    @staticmethod
+    def make_key(model: str, prompt_version: str, text: str) -> str:
+        normalized = SummaryCache.normalize_text(text)
+        digest = hashlib.sha256(
+            f"{model}\x00{prompt_version}\x00{normalized}".encode('utf-8')
+        ).hexdigest()
+        return f"{KEY_PREFIX}{digest}"
+    
+    def _get_redis(self):
+        if self._redis is not None:
+            return self._redis
+        # Don't hammer a dead Redis on every lookup; retry once a minute
+        if time.time() - self._redis_failed_at < 60:
+            return None
+        try:
+            import redis
+            client = redis.Redis.from_url(self.redis_url, socket_timeout=1, socket_connect_timeout=1)
+            client.ping()
+            self._redis = client
+            return client
+        except Exception as e:
+            logger.warning(f"Summary cache falling back to in-process LRU: {str(e)}")
+            self._redis_failed_at = time.time()
+            return None
+    
+    def _drop_redis(self, e: Exception):
+        logger.warning(f"Summary cache Redis error, using in-process LRU: {str(e)}")
+        self._redis = None
+        self._redis_failed_at = time.time()
+    
+    def get(self, key: str) -> Optional[Tuple[str, List[str]]]:
+        if not self.enabled:
+            return None
+        
+        raw = None
+        client = self._get_redis()
+        if client is not None:
+            try:
+                pipe = client.pipeline()
+                pipe.get(key)
+                pipe.expire(key, self.ttl_seconds)
+                raw = pipe.execute()[0]
+            except Exception as e:
+                self._drop_redis(e)
+        
+        if raw is None:
+            with self._lock:
+                entry = self._local.get(key)
+                if entry and entry[0] > time.time():
+                    self._local.move_to_end(key)
+                    raw = entry[1]
+                elif entry:
+                    del self._local[key]
+        
+        self._record('hits' if raw is not None else 'misses')
+        CACHE_REQUESTS.labels('summary', 'hit' if raw is not None else 'miss').inc()
+        if raw is None:
+            return None
+        
+        try:
+            value = json.loads(raw)
+            return value['summary'], value.get('key_points') or []
+        except (ValueError, KeyError, TypeError):
+            return None
+    
+    def set(self, key: str, summary: str, key_points: Optional[List[str]]):
+        if not self.enabled:
+            return
+        
+        raw = json.dumps({'summary': summary, 'key_points': key_points or []})
+        
+        client = self._get_redis()
+        if client is not None:
+            try:
+                client.set(key, raw, ex=self.ttl_seconds)
+            except Exception as e:
+                self._drop_redis(e)
+        
+        with self._lock:
+            self._local[key] = (time.time() + self.ttl_seconds, raw)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_local_entries:
+                self._local.popitem(last=False)
+        
+        self._record('writes')
+    
+    def _record(self, field: str):
+        with self._lock:
+            setattr(self, f"_{field}", getattr(self, f"_{field}") + 1)
+        
+        client = self._redis
+        if client is not None:
+            try:
+                client.hincrby(STATS_KEY, field, 1)
+            except Exception:
+                pass
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            local = {
+                'hits': self._hits,
+                'misses': self._misses,
+                'writes': self._writes,
+                'local_entries': len(self._local),
+            }
+        
+        lookups = local['hits'] + local['misses']
+        local['hit_rate'] = round(local['hits'] / lookups, 4) if lookups else 0.0
+        
+        result = {
+            'enabled': self.enabled,
+            'backend': 'redis' if self._get_redis() is not None else 'local',
+            'ttl_seconds': self.ttl_seconds,
+            'process': local,
+        }
+        
+        client = self._get_redis()
+        if client is not None:
+            try:
+                shared = {k.decode(): int(v) for k, v in client.hgetall(STATS_KEY).items()}
+                shared_lookups = shared.get('hits', 0) + shared.get('misses', 0)
+                shared['hit_rate'] = round(shared.get('hits', 0) / shared_lookups, 4) if shared_lookups else 0.0
+                result['shared'] = shared
+            except Exception as e:
+                self._drop_redis(e)
+        
+        return result
+
+
+_settings = get_settings()
+
+summary_cache = SummaryCache(
+    redis_url=_settings.redis_url,
+    ttl_seconds=_settings.summary_cache_ttl_seconds,
+    max_local_entries=_settings.summary_cache_max_local_entries,
+    enabled=_settings.summary_cache_enabled,
+)
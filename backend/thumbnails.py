@@ -0,0 +1,241 @@
+import contextvars
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Tuple
+
+from config import get_settings
+from metrics import CACHE_REQUESTS
+from tracing import span, url_attributes
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "thumbnail:"
+
+# Stored for URLs without a thumbnail so they are not probed again until the negative TTL runs out
+NO_THUMBNAIL = ''
+
+CHUNK_BYTES = 4096
+# Head-only probes give up after this much HTML; og:image is almost always in the first few KB
+HEAD_MAX_BYTES = 64 * 1024
+# Body scans (ArXiv HTML has figures but no og:image) read at most this much
+BODY_MAX_BYTES = 512 * 1024
+
+HEAD_END = re.compile(rb'</head\s*>', re.IGNORECASE)
+OG_IMAGE = re.compile(rb'<meta\b[^>]*og:image["\'][^>]*>', re.IGNORECASE)
+META_IMAGE = re.compile(rb'<meta\b[^>]*(?:og:image|twitter:image)[^>]*>', re.IGNORECASE)
+BODY_IMAGE = re.compile(rb'<img\b[^>]*(?:src|data-src)\s*=\s*["\']?https?://', re.IGNORECASE)
+
+
+class ThumbnailCache:
+    """Per-URL thumbnail results, including misses, with separate TTLs.
+
+    Entries live in Redis so every worker shares them; if Redis is
+    unreachable the cache falls back to a bounded in-process LRU.
+    """
+    
+    def __init__(self, redis_url: str, ttl_seconds: int, negative_ttl_seconds: int, max_local_entries: int):
+        self.redis_url = redis_url
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_local_entries = max_local_entries
+        self._redis = None
+        self._redis_failed_at = 0.0
+        self._local: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(url: str) -> str:
+        from url_keys import url_hash
+        return f"{KEY_PREFIX}{url_hash(url)}"
+    
+    def _get_redis(self):
+        if self._redis is not None:
+            return self._redis
+        if time.time() - self._redis_failed_at < 60:
+            return None
+        try:
+            import redis
+            client = redis.Redis.from_url(self.redis_url, socket_timeout=1, socket_connect_timeout=1)
+            client.ping()
+            self._redis = client
+            return client
+        except Exception as e:
+            logger.warning(f"Thumbnail cache falling back to in-process LRU: {str(e)}")
+            self._redis_failed_at = time.time()
+            return None
+    
+    def _drop_redis(self, e: Exception):
+        logger.warning(f"Thumbnail cache Redis error, using in-process LRU: {str(e)}")
+        self._redis = None
+        self._redis_failed_at = time.time()
+    
+    def get_many(self, urls: List[str]) -> Dict[str, str]:
+        """Cached results by URL; NO_THUMBNAIL marks a cached miss, absent URLs are unknown."""
+        keys = [self.make_key(url) for url in urls]
+        found: Dict[str, str] = {}
+        
+        client = self._get_redis()
+        if client is not None and keys:
+            try:
+                for url, raw in zip(urls, client.mget(keys)):
+                    if raw is not None:
+                        found[url] = raw.decode('utf-8')
+            except Exception as e:
+                self._drop_redis(e)
+        
+        now = time.time()
+        with self._lock:
+            for url, key in zip(urls, keys):
+                if url in found:
+                    continue
+                entry = self._local.get(key)
+                if entry and entry[0] > now:
+                    self._local.move_to_end(key)
+                    found[url] = entry[1]
+                elif entry:
+                    del self._local[key]
+        
+        for url in urls:
+            CACHE_REQUESTS.labels('thumbnail', 'hit' if url in found else 'miss').inc()
+        return found
+    
+    def set_many(self, results: Dict[str, Optional[str]]):
+        if not results:
+            return
+        entries = [
+            (self.make_key(url), thumbnail or NO_THUMBNAIL,
+             self.ttl_seconds if thumbnail else self.negative_ttl_seconds)
+            for url, thumbnail in results.items()
+        ]
+        
+        client = self._get_redis()
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                for key, value, ttl in entries:
+                    pipe.set(key, value, ex=ttl)
+                pipe.execute()
+            except Exception as e:
+                self._drop_redis(e)
+        
+        now = time.time()
+        with self._lock:
+            for key, value, ttl in entries:
+                self._local[key] = (now + ttl, value)
+                self._local.move_to_end(key)
+            while len(self._local) > self.max_local_entries:
+                self._local.popitem(last=False)
+
+
+class ThumbnailResolver:
+    """Finds article thumbnails from as little of the page as possible.
+
+    A probe streams the page and stops at the og:image meta tag or at
+    </head>, then runs ImageExtractor.extract_from_html on what it read.
+    scan_body keeps reading past a head without image meta tags (up to
+    BODY_MAX_BYTES) until an absolute <img> turns up, for pages like ArXiv
+    HTML that only have figures. Batches probe concurrently on a bounded
+    pool; outbound limits still apply per host through http_client.
+    """
+    
+    def __init__(self, cache: ThumbnailCache, workers: int):
+        self.cache = cache
+        self.workers = workers
+    
+    @staticmethod
+    def probe(url: str, scan_body: bool = False) -> Optional[str]:
+        from content_fetcher import ImageExtractor, ArxivURLConverter
+        from http_client import http_client, BROWSER_HEADERS
+        
+        fetch_url = ArxivURLConverter.to_html_url(url) if ArxivURLConverter.is_arxiv_url(url) else url
+        max_bytes = BODY_MAX_BYTES if scan_body else HEAD_MAX_BYTES
+        with span('image.probe', **url_attributes(fetch_url)) as s:
+            response = http_client.get(fetch_url, timeout=5, headers=BROWSER_HEADERS, stream=True)
+            try:
+                s.set('http.response.status_code', response.status_code)
+                # Only "fetched, no image" is a cacheable miss; error statuses go to the retry path
+                response.raise_for_status()
+                
+                head = bytearray()
+                stop = 'eof'
+                meta_seen = False
+                for chunk in response.iter_content(chunk_size=CHUNK_BYTES):
+                    # Search from just before the new chunk so markers split across chunks still match
+                    search_from = max(len(head) - 512, 0)
+                    head.extend(chunk)
+                    window = bytes(head[search_from:])
+                    meta_seen = meta_seen or bool(META_IMAGE.search(window))
+                    if OG_IMAGE.search(window):
+                        stop = 'meta'
+                    elif HEAD_END.search(window) and (meta_seen or not scan_body):
+                        stop = 'head'
+                    elif scan_body and BODY_IMAGE.search(window):
+                        stop = 'img'
+                    elif len(head) >= max_bytes:
+                        stop = 'limit'
+                    if stop != 'eof':
+                        break
+            finally:
+                response.close()
+            
+            s.set('http.response.body.size', len(head))
+            s.set('thumbnail.stop', stop)
+            html = bytes(head).decode(response.encoding or 'utf-8', errors='replace')
+            return ImageExtractor.extract_from_html(html)
+    
+    def _probe_or_none(self, url: str, scan_body: bool) -> Tuple[Optional[str], bool]:
+        """(thumbnail, cacheable); failed requests, error statuses included, are not cached so they are retried next time."""
+        try:
+            return self.probe(url, scan_body), True
+        except Exception as e:
+            logger.debug(f"Could not probe thumbnail for {url}: {str(e)}")
+            return None, False
+    
+    def resolve_many(self, urls: List[str], scan_body: bool = False, use_cache: bool = True) -> Dict[str, Optional[str]]:
+        urls = list(dict.fromkeys(u for u in urls if u))
+        cached = self.cache.get_many(urls) if use_cache else {}
+        results: Dict[str, Optional[str]] = {url: value or None for url, value in cached.items()}
+        
+        missing = [url for url in urls if url not in cached]
+        if not missing:
+            return results
+        
+        with span('image.resolve_batch', urls=len(urls), cached=len(cached)):
+            if len(missing) == 1:
+                probed = [self._probe_or_none(missing[0], scan_body)]
+            else:
+                # Each probe runs in a copy of this context so its span joins the current trace
+                with ThreadPoolExecutor(max_workers=min(self.workers, len(missing))) as pool:
+                    futures = [
+                        pool.submit(contextvars.copy_context().run, self._probe_or_none, url, scan_body)
+                        for url in missing
+                    ]
+                    probed = [future.result() for future in futures]
+        
+        to_cache = {}
+        for url, (thumbnail, cacheable) in zip(missing, probed):
+            results[url] = thumbnail[:2048] if thumbnail else None
+            if cacheable:
+                to_cache[url] = results[url]
+        self.cache.set_many(to_cache)
+        return results
+    
+    def resolve(self, url: str, scan_body: bool = False, use_cache: bool = True) -> Optional[str]:
+        return self.resolve_many([url], scan_body, use_cache).get(url)
+
+
+_settings = get_settings()
+
+thumbnail_resolver = ThumbnailResolver(
+    cache=ThumbnailCache(
+        redis_url=_settings.redis_url,
+        ttl_seconds=_settings.thumbnail_cache_ttl_seconds,
+        negative_ttl_seconds=_settings.thumbnail_negative_ttl_seconds,
+        max_local_entries=_settings.thumbnail_cache_max_local_entries,
+    ),
+    workers=_settings.thumbnail_probe_workers,
+)
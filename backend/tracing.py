@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Lightweight tracing for the ingest pipeline.
+
+    with span('extract.download', **{'server.address': host}) as s:
+        response = http_client.get(url)
+        s.set('http.response.body.size', len(response.content))
+
+TRACING_EXPORTER picks the backend:
+    none   (default) spans are no-ops
+    jsonl  each run (see trace_run) is written to TRACING_DIR as JSONL, with a
+           summary of the slowest articles and hosts next to it
+    otel   spans go to the OpenTelemetry tracer provider configured for the process
+
+Summarize an existing trace file:
+    python tracing.py traces/ingest-20260101-120000-ab12cd.jsonl --top 20
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import contextvars
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional, Dict, Iterator
+from urllib.parse import urlparse
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Root span of one article; its total time ranks the slowest articles
+ARTICLE_SPAN = 'ingest.article'
+HOST_ATTRIBUTE = 'server.address'
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+_current_run = contextvars.ContextVar('current_run', default=None)
+
+
+class _NoopSpan:
+    def set(self, key: str, value):
+        pass
+    
+    def set_outcome(self, outcome: str):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    def __init__(self, name: str, run: "_Run", parent: Optional["Span"], attributes: Dict):
+        self.name = name
+        self.run = run
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes)
+        self.outcome = 'ok'
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+    
+    def set(self, key: str, value):
+        self.attributes[key] = value
+    
+    def set_outcome(self, outcome: str):
+        self.outcome = outcome
+    
+    def to_dict(self) -> Dict:
+        return {
+            'trace_id': self.run.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.started_at,
+            'duration_ms': round((time.perf_counter() - self._started) * 1000, 3),
+            'outcome': self.outcome,
+            'attributes': self.attributes,
+        }
+
+
+class _OtelSpan:
+    def __init__(self, span):
+        self._span = span
+    
+    def set(self, key: str, value):
+        if value is not None:
+            self._span.set_attribute(key, value)
+    
+    def set_outcome(self, outcome: str):
+        self._span.set_attribute('outcome', outcome)
+
+
+class _Run:
+    """One JSONL trace file; spans from every thread of the run are appended to it."""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        os.makedirs(settings.tracing_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        self.path = os.path.join(settings.tracing_dir, f"{name}-{stamp}-{self.trace_id[:6]}.jsonl")
+        self._file = open(self.path, 'a')
+        self._lock = threading.Lock()
+    
+    def write(self, record: Dict):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+    
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def _otel_tracer():
+    try:
+        from opentelemetry import trace
+        return trace.get_tracer('techfirstsearch')
+    except ImportError:
+        logger.warning("TRACING_EXPORTER=otel but opentelemetry is not installed; tracing disabled")
+        return None
+
+
+_tracer = _otel_tracer() if settings.tracing_exporter == 'otel' else None
+
+
+def url_attributes(url: Optional[str]) -> Dict:
+    return {'url.full': url, HOST_ATTRIBUTE: (urlparse(url or '').hostname or '').lower() or None}
+
+
+def current_span():
+    """The innermost open span, e.g. to record an outcome decided deep inside a stage."""
+    if _tracer is not None:
+        from opentelemetry import trace
+        return _OtelSpan(trace.get_current_span())
+    return _current_span.get() or NOOP_SPAN
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator:
+    """Time a block as a child of the current span. Exceptions mark it outcome=error."""
+    if _tracer is not None:
+        # OpenTelemetry attributes cannot be None
+        attributes = {key: value for key, value in attributes.items() if value is not None}
+        with _tracer.start_as_current_span(name, attributes=attributes) as otel_span:
+            wrapped = _OtelSpan(otel_span)
+            try:
+                yield wrapped
+            except Exception as e:
+                wrapped.set_outcome('error')
+                otel_span.set_attribute('error.type', type(e).__name__)
+                raise
+        return
+    
+    run = _current_run.get()
+    if run is None:
+        yield NOOP_SPAN
+        return
+    
+    current = Span(name, run, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.set_outcome('error')
+        current.set('error.type', type(e).__name__)
+        raise
+    finally:
+        _current_span.reset(token)
+        run.write(current.to_dict())
+
+
+@contextmanager
+def trace_run(name: str):
+    """Collect spans of one ingest run into their own JSONL file (jsonl exporter only).
+
+    Worker threads started inside the run should be given the run through
+    contextvars.copy_context() to have their spans recorded.
+    """
+    if settings.tracing_exporter != 'jsonl':
+        yield None
+        return
+    
+    run = _Run(name)
+    token = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        _current_run.reset(token)
+        run.close()
+        try:
+            summary = format_summary(summarize_trace(run.path, settings.tracing_top_n))
+            with open(run.path.replace('.jsonl', '.summary.txt'), 'w') as f:
+                f.write(summary + '\n')
+            logger.info(f"Trace written to {run.path}\n{summary}")
+        except Exception as e:
+            logger.warning(f"Failed to summarize trace {run.path}: {str(e)}")
+
+
+def summarize_trace(path: str, top_n: int = 10) -> Dict:
+    """Slowest articles, slowest hosts and per-stage totals of a trace file."""
+    with open(path) as f:
+        spans = [json.loads(line) for line in f if line.strip()]
+    
+    articles = sorted(
+        (s for s in spans if s['name'] == ARTICLE_SPAN),
+        key=lambda s: s['duration_ms'], reverse=True
+    )
+    
+    hosts = defaultdict(lambda: {'spans': 0, 'errors': 0, 'duration_ms': 0.0, 'bytes': 0})
+    stages = defaultdict(lambda: {'spans': 0, 'errors': 0, 'duration_ms': 0.0})
+    for s in spans:
+        stage = stages[s['name']]
+        stage['spans'] += 1
+        stage['errors'] += s['outcome'] == 'error'
+        stage['duration_ms'] += s['duration_ms']
+        
+        host = s['attributes'].get(HOST_ATTRIBUTE)
+        # Article spans contain their own host's child spans; count leaves only
+        if host and s['name'] != ARTICLE_SPAN:
+            entry = hosts[host]
+            entry['spans'] += 1
+            entry['errors'] += s['outcome'] == 'error'
+            entry['duration_ms'] += s['duration_ms']
+            entry['bytes'] += s['attributes'].get('http.response.body.size') or 0
+    
+    return {
+        'spans': len(spans),
+        'articles': [
+            {
+                'url': s['attributes'].get('url.full'),
+                'outcome': s['outcome'],
+                'duration_ms': s['duration_ms'],
+            }
+            for s in articles[:top_n]
+        ],
+        'hosts': sorted(
+            ({'host': host, **values} for host, values in hosts.items()),
+            key=lambda h: h['duration_ms'], reverse=True
+        )[:top_n],
+        'stages': sorted(
+            ({'stage': name, **values} for name, values in stages.items()),
+            key=lambda s: s['duration_ms'], reverse=True
+        ),
+    }
+
+
+def format_summary(summary: Dict) -> str:
+    lines = [f"{summary['spans']} spans", "", "Slowest articles:"]
+    for a in summary['articles']:
+        lines.append(f"  {a['duration_ms'] / 1000:>8.2f}s  {a['outcome']:<14} {(a['url'] or '')[:100]}")
+    
+    lines += ["", "Slowest hosts:", f"  {'total':>9}  {'spans':>6}  {'errors':>6}  {'MB':>7}  host"]
+    for h in summary['hosts']:
+        lines.append(
+            f"  {h['duration_ms'] / 1000:>8.2f}s  {h['spans']:>6}  {h['errors']:>6}  "
+            f"{h['bytes'] / 1e6:>7.2f}  {h['host']}"
+        )
+    
+    lines += ["", "Stages:", f"  {'total':>9}  {'spans':>6}  {'errors':>6}  stage"]
+    for s in summary['stages']:
+        lines.append(f"  {s['duration_ms'] / 1000:>8.2f}s  {s['spans']:>6}  {s['errors']:>6}  {s['stage']}")
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize an ingest trace")
+    parser.add_argument('path')
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+    print(format_summary(summarize_trace(args.path, args.top)))
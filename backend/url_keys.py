@@ -0,0 +1,46 @@
+import hashlib
+import logging
+from typing import Dict, Iterable
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Content
+
+logger = logging.getLogger(__name__)
+
+# Keeps IN lists well under driver parameter limits
+LOOKUP_BATCH_SIZE = 500
+
+
+def url_hash(url: str) -> int:
+    """Signed 64-bit blake2b of a (normalized) URL, the key behind Content.url_hash.
+
+    Content.url is stored normalized, so hashing it as-is matches what ingest
+    computes for an incoming normalized URL.
+    """
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'little', signed=True)
+
+
+def find_existing(db: Session, urls: Iterable[str]) -> Dict[str, int]:
+    """Map each URL that is already stored to its content id, probing only the url_hash index.
+
+    Rows are confirmed against the full URL so a hash collision reads as a
+    miss rather than a false duplicate.
+    """
+    by_hash = {url_hash(url): url for url in set(urls)}
+    hashes = list(by_hash)
+    
+    found = {}
+    for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+        rows = db.execute(
+            select(Content.url_hash, Content.url, Content.id)
+            .where(Content.url_hash.in_(hashes[start:start + LOOKUP_BATCH_SIZE]))
+        ).all()
+        for row in rows:
+            url = by_hash[row.url_hash]
+            if row.url == url:
+                found[url] = row.id
+            else:
+                logger.warning(f"url_hash collision between {url} and stored ID={row.id}")
+    return found